@@ -0,0 +1,237 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import main_china
+from main_china import (
+    get_ticker_universe, load_scan_tickers, configure_data_sources, load_daily_closes,
+    RSI_PERIOD, OVERSOLD_THRESHOLD, OVERBOUGHT_THRESHOLD, RESAMPLE_FREQUENCIES, MAX_WORKERS
+)
+from fetch_engine import run_concurrent
+from rsi_engine import build_close_matrix, rsi_matrix, rsi_state_history, new_state, provisional_rsi
+
+# --- Historical Backtest ---
+# Replays the scan rules on every past trading day and measures what followed.
+# On day t a scan sees the Daily bars up to t, so the Weekly and Monthly bars
+# it resamples end with a forming bar whose close is the close of day t. The
+# backtest evaluates exactly that: the Wilder state of the completed weeks /
+# months before t plus day t's close as a provisional bar (no look-ahead).
+#
+# Everything is computed on (dates x tickers) matrices, one chunk of tickers at
+# a time, with one pass per timeframe instead of one scan per ticker and day.
+# Signals (as in run_scan / run_china_scan_and_plot):
+#   oversold_daily     Daily RSI <= OVERSOLD_THRESHOLD
+#   oversold_dwm       Daily, Weekly and Monthly RSI <= OVERSOLD_THRESHOLD
+#   overbought_daily   Daily RSI > OVERBOUGHT_THRESHOLD
+#   overbought_dwm     Daily, Weekly and Monthly RSI > OVERBOUGHT_THRESHOLD
+# Forward returns run from the signal day's close to the close h trading days
+# later. Bars come from disk (the OHLCV cache filled by scans, or --replay), and
+# only currently listed tickers are tested, so delisted names are missing.
+#
+#   python python/backtest.py --years 10
+#   python python/backtest.py --replay market_data --horizons 5 20 60 --json backtest.json
+
+BACKTEST_YEARS = 10
+BACKTEST_HORIZONS = (1, 5, 20, 60) # Trading days
+BACKTEST_CHUNK_SIZE = 500 # Tickers per matrix
+SIGNALS = ("oversold_daily", "oversold_dwm", "overbought_daily", "overbought_dwm")
+RETURN_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def forming_bar_rsi(closes, dates, frequency, length=RSI_PERIOD):
+    """
+    RSI of the Weekly/Monthly bar forming on each day of a Daily close matrix,
+    with that day's close as the bar's close (what a scan on that day sees).
+
+    Args:
+        closes: (T, N) Daily closes, NaN where a ticker has no bar
+        dates: DatetimeIndex of the T rows
+        frequency: Pandas period alias ("W-FRI", "M")
+    """
+    periods = dates.to_period(frequency)
+    bars = pd.DataFrame(closes).groupby(periods.asi8).last() # Last Daily close per period (NaN skipped)
+    position = np.searchsorted(bars.index.to_numpy(), periods.asi8) # Bar forming on each day
+    states = rsi_state_history(bars.to_numpy(dtype=float), length)
+    empty = new_state(closes.shape[1])
+    completed = {} # State after the bars completed before each day's bar
+    for key, history in states.items():
+        history = np.vstack([empty[key][None, :], history])
+        completed[key] = history[position] # Row 0 (no completed bar) for the first period
+    return provisional_rsi(completed, closes, length)
+
+
+def signal_masks(closes, dates, length=RSI_PERIOD, oversold=OVERSOLD_THRESHOLD, overbought=OVERBOUGHT_THRESHOLD,
+                 frequencies=RESAMPLE_FREQUENCIES):
+    """Returns {signal: (T, N) bool matrix} for SIGNALS on a Daily close matrix."""
+    daily = rsi_matrix(closes, length)
+    higher = [forming_bar_rsi(closes, dates, frequency, length) for frequency in frequencies.values()]
+    with np.errstate(invalid='ignore'):
+        oversold_daily = daily <= oversold
+        overbought_daily = daily > overbought
+        return {
+            "oversold_daily": oversold_daily,
+            "oversold_dwm": oversold_daily & np.logical_and.reduce([rsi <= oversold for rsi in higher]),
+            "overbought_daily": overbought_daily,
+            "overbought_dwm": overbought_daily & np.logical_and.reduce([rsi > overbought for rsi in higher]),
+        }
+
+
+def forward_returns(closes, horizon):
+    """
+    (T, N) returns from each day's close to the close `horizon` rows later.
+    Suspended days carry the last close; NaN past a ticker's last bar.
+    """
+    filled = pd.DataFrame(closes).ffill().to_numpy()
+    n_rows = closes.shape[0]
+    exit_prices = np.full_like(filled, np.nan)
+    if horizon < n_rows:
+        exit_prices[:-horizon] = filled[horizon:]
+    last_bar = n_rows - 1 - np.argmax(~np.isnan(closes[::-1]), axis=0) # Last row with a close, per column
+    beyond = np.arange(n_rows)[:, None] + horizon > last_bar[None, :]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = exit_prices / closes - 1.0
+    returns[beyond] = np.nan
+    return returns
+
+
+class BacktestResult:
+    """Forward returns collected per signal and horizon, plus all-days baseline moments."""
+
+    def __init__(self, horizons):
+        self.horizons = tuple(horizons)
+        self.returns = {(signal, h): [] for signal in SIGNALS for h in self.horizons}
+        self.baseline = {h: np.zeros(4) for h in self.horizons} # count, sum, sum of squares, wins
+        self.tickers = 0
+        self.first_date = None
+        self.last_date = None
+
+    def add(self, closes, dates, masks, new_only=False):
+        self.tickers += closes.shape[1]
+        if len(dates):
+            self.first_date = min(self.first_date or dates[0], dates[0])
+            self.last_date = max(self.last_date or dates[-1], dates[-1])
+        if new_only: # Only the first day of a run of signal days
+            masks = {signal: mask & ~np.vstack([np.zeros_like(mask[:1]), mask[:-1]]) for signal, mask in masks.items()}
+        for h in self.horizons:
+            returns = forward_returns(closes, h)
+            valid = returns[~np.isnan(returns)]
+            self.baseline[h] += (valid.size, valid.sum(), np.square(valid).sum(), (valid > 0).sum())
+            for signal, mask in masks.items():
+                values = returns[mask]
+                self.returns[(signal, h)].append(values[~np.isnan(values)].astype(np.float32))
+
+    def summary(self):
+        """Returns {signal: {horizon: statistics}} with a "baseline" entry for all ticker-days."""
+        report = {"baseline": {}}
+        for h, (count, total, squares, wins) in self.baseline.items():
+            mean = total / count if count else float("nan")
+            report["baseline"][h] = {
+                "count": int(count), "mean": mean,
+                "std": float(np.sqrt(max(squares / count - mean * mean, 0.0))) if count else float("nan"),
+                "win_rate": wins / count if count else float("nan"),
+            }
+        for signal in SIGNALS:
+            report[signal] = {}
+            for h in self.horizons:
+                values = np.concatenate(self.returns[(signal, h)]) if self.returns[(signal, h)] else np.empty(0)
+                stats = {"count": int(values.size)}
+                if values.size:
+                    values = values.astype(float)
+                    stats.update({"mean": float(values.mean()), "std": float(values.std()),
+                                  "win_rate": float((values > 0).mean())})
+                    stats.update({f"p{q}": float(v) for q, v in zip(RETURN_PERCENTILES,
+                                                                     np.percentile(values, RETURN_PERCENTILES))})
+                report[signal][h] = stats
+        return report
+
+
+def run_backtest(tickers, start, horizons=BACKTEST_HORIZONS, length=RSI_PERIOD, oversold=OVERSOLD_THRESHOLD,
+                 overbought=OVERBOUGHT_THRESHOLD, new_only=False, chunk_size=BACKTEST_CHUNK_SIZE,
+                 max_workers=MAX_WORKERS):
+    """
+    Backtests the scan signals over the Daily bars on disk.
+
+    Args:
+        tickers: Tickers to test
+        start: First date of history to load (the RSI warm-up is part of it)
+        horizons: Forward-return horizons in trading days
+        new_only: Count only the first day of consecutive signal days
+        chunk_size: Tickers per matrix (bounds memory)
+    Returns:
+        BacktestResult
+    """
+    result = BacktestResult(horizons)
+    tickers = list(tickers)
+    for i in range(0, len(tickers), chunk_size):
+        chunk = tickers[i:i + chunk_size]
+        histories = {t: closes for t, closes, error in run_concurrent(
+            chunk, lambda t: load_daily_closes(t, start=start), max_workers=max_workers)
+            if error is None and closes is not None and len(closes) > length}
+        columns, dates, closes = build_close_matrix(histories)
+        if not columns:
+            continue
+        masks = signal_masks(closes, dates, length, oversold, overbought)
+        result.add(closes, dates, masks, new_only)
+        print(f" Backtested {min(i + chunk_size, len(tickers))}/{len(tickers)} tickers...")
+    return result
+
+
+def print_report(report, horizons):
+    base = report["baseline"]
+    for signal in ("baseline",) + SIGNALS:
+        print(f"\n{signal}")
+        for h in horizons:
+            stats = report[signal][h]
+            if not stats.get("count"):
+                print(f"  {h:>3}d  n=0")
+                continue
+            line = (f"  {h:>3}d  n={stats['count']:<9} mean={stats['mean']:+.2%} std={stats['std']:.2%} "
+                    f"win={stats['win_rate']:.1%}")
+            if signal != "baseline":
+                line += (f" p10={stats['p10']:+.2%} median={stats['p50']:+.2%} p90={stats['p90']:+.2%} "
+                         f"excess={stats['mean'] - base[h]['mean']:+.2%}")
+            print(line)
+
+
+# --- Guard for Direct Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vectorized backtest of the RSI scan signals over the bars on disk.")
+    parser.add_argument("--years", type=float, default=BACKTEST_YEARS, help="Years of Daily history to replay")
+    parser.add_argument("--horizons", type=int, nargs="+", default=list(BACKTEST_HORIZONS),
+                        help="Forward-return horizons in trading days")
+    parser.add_argument("--new-only", action="store_true", help="Count only the first day of consecutive signal days")
+    parser.add_argument("--chunk-size", type=int, default=BACKTEST_CHUNK_SIZE, help="Tickers per matrix")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Threads reading bars from disk")
+    parser.add_argument("--universe-file", help="Load the listed-symbol snapshot from a local CSV/TXT/JSON file")
+    parser.add_argument("--replay", metavar="DIR", help="Read Daily bars from a recorded local snapshot instead of the cache")
+    parser.add_argument("--json", metavar="FILE", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    if args.replay:
+        configure_data_sources("replay", local_dir=args.replay)
+        main_china.USE_OHLCV_CACHE = False # Replays read straight from the snapshot
+    if args.universe_file:
+        print(f"Loaded {len(get_ticker_universe().load_file(args.universe_file))} tickers from {args.universe_file}")
+
+    started = time.perf_counter()
+    tickers = load_scan_tickers()
+    start = pd.Timestamp.now().normalize() - pd.Timedelta(days=int(args.years * 365))
+    print(f"Backtesting {len(tickers)} tickers from {start.date()} (RSI {RSI_PERIOD}, "
+          f"oversold <= {OVERSOLD_THRESHOLD}, overbought > {OVERBOUGHT_THRESHOLD})...")
+    result = run_backtest(tickers, start, args.horizons, new_only=args.new_only,
+                          chunk_size=args.chunk_size, max_workers=args.workers)
+    report = result.summary()
+    if result.first_date is None:
+        print("No Daily bars on disk; run a full scan first (or use --replay DIR).")
+        sys.exit(1)
+    print(f"\n{result.tickers} tickers, {result.first_date.date()} to {result.last_date.date()}, "
+          f"{time.perf_counter() - started:.1f}s")
+    print_report(report, args.horizons)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"settings": vars(args), "tickers": result.tickers, "report": report}, f, indent=2)
+        print(f"\nReport written to {args.json}")
@@ -0,0 +1,472 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import queue
+import random
+import runpy
+import sys
+import tempfile
+import threading
+import time
+import types
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_sources import DataSource, period_start
+from universe import EXCHANGE_PREFIXES
+
+# --- Scan Benchmark ---
+# Runs the scanners against a synthetic A-share market instead of live vendors
+# and reports throughput, per-ticker latency, RSI compute time and peak memory.
+#
+#   python python/bench_scan.py
+#   python python/bench_scan.py --tickers 5000 --latency-ms 80 --error-rate 0.02 --workers 16
+#   python python/bench_scan.py --targets china,gui --json bench.json
+#
+# Targets (each runs in a fresh process, so memory figures are independent):
+#   main   main.py (its own ticker list; needs pandas_ta)
+#   china  main_china.run_china_scan_and_plot
+#   gui    the GUI's StockScannerApp.run_scan logic, without a window
+#
+# The synthetic source stands in for yfinance/akshare behind fetch_stock_data:
+# every request sleeps for a log-normal latency and fails with --error-rate.
+# Bars are generated deterministically from (seed, ticker) on each request, so
+# the market itself takes no memory. Caches are disabled and all files go to
+# a temporary directory.
+
+BENCH_TARGETS = ("main", "china", "gui")
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+TRADING_DAYS_PER_YEAR = 244 # A-share sessions per year
+
+
+# --- Synthetic Market ---
+def synthetic_tickers(count):
+    """Returns `count` A-share style tickers spread over the scanned exchange prefixes."""
+    prefixes = [(prefix, suffix) for suffix, codes in sorted(EXCHANGE_PREFIXES.items()) for prefix in codes]
+    count = min(count, len(prefixes) * 1000)
+    return [f"{prefixes[i % len(prefixes)][0]}{i // len(prefixes):03d}{prefixes[i % len(prefixes)][1]}"
+            for i in range(count)]
+
+
+class SyntheticMarket:
+    """Deterministic OHLCV histories for any ticker, with dead codes, new listings and gaps."""
+
+    def __init__(self, seed=0, years=10, dead_fraction=0.05, new_listing_fraction=0.03,
+                 missing_fraction=0.1, trend_fraction=0.1, end=None):
+        """
+        Args:
+            seed: Base seed; each ticker's history depends only on (seed, ticker)
+            years: Length of a full Daily history
+            dead_fraction: Tickers with no data at all (delisted or invalid codes)
+            new_listing_fraction: Tickers with only a few weeks of bars
+            missing_fraction: Tickers with suspension gaps and NaN closes
+            trend_fraction: Tickers ending in a strong down/up trend (oversold/overbought signals)
+            end: Last session (default: today)
+        """
+        self.seed = seed
+        self.bars_full = int(years * TRADING_DAYS_PER_YEAR)
+        self.dead_fraction = dead_fraction
+        self.new_listing_fraction = new_listing_fraction
+        self.missing_fraction = missing_fraction
+        self.trend_fraction = trend_fraction
+        self.end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+
+    def _rng(self, ticker):
+        return np.random.default_rng([self.seed, zlib.crc32(ticker.encode("utf-8"))])
+
+    def is_dead(self, ticker):
+        return self._rng(ticker).random() < self.dead_fraction
+
+    def daily(self, ticker):
+        """Returns the full Daily history of a ticker (empty for dead codes)."""
+        rng = self._rng(ticker)
+        if rng.random() < self.dead_fraction:
+            return pd.DataFrame()
+        n = self.bars_full
+        if rng.random() < self.new_listing_fraction:
+            n = int(rng.integers(5, 60)) # Shorter than RSI_PERIOD for some
+
+        returns = rng.normal(0.0002, rng.uniform(0.01, 0.035), n)
+        if rng.random() < self.trend_fraction and n > 60:
+            trend_bars = int(rng.integers(40, min(n, 500)))
+            returns[-trend_bars:] += rng.choice([-1, 1]) * rng.uniform(0.002, 0.006)
+        close = 10 * rng.uniform(0.5, 5) * np.exp(np.cumsum(returns))
+        open_ = np.concatenate(([close[0]], close[:-1])) * (1 + rng.normal(0, 0.003, n))
+        wick = np.abs(rng.normal(0, 0.008, (2, n)))
+        hist = pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + wick[0]),
+            "Low": np.minimum(open_, close) * (1 - wick[1]),
+            "Close": close,
+            "Volume": rng.lognormal(14, 1, n).round(),
+        }, index=pd.bdate_range(end=self.end, periods=n, name="Date"))
+
+        if rng.random() < self.missing_fraction:
+            keep = np.ones(n, dtype=bool)
+            for _ in range(int(rng.integers(1, 4))): # Trading suspensions
+                start = int(rng.integers(0, n))
+                keep[start:start + int(rng.integers(5, 60))] = False
+            hist = hist[keep].copy()
+            nan_rows = rng.random(len(hist)) < 0.005
+            hist.loc[nan_rows, "Close"] = np.nan
+        return hist
+
+    def bars(self, ticker, interval, period=None, start=None):
+        """Returns bars like a vendor would: Daily, or resampled to 1wk/1mo, from `start`/`period`."""
+        from main_china import resample_ohlcv
+        hist = self.daily(ticker)
+        if hist.empty:
+            return hist
+        if interval in ("1wk", "1mo"):
+            hist = resample_ohlcv(hist, "Weekly" if interval == "1wk" else "Monthly")
+        start = pd.Timestamp(start) if start is not None else period_start(period)
+        return hist[hist.index >= start] if start is not None else hist
+
+    def info(self, ticker):
+        """Fundamentals in the yfinance .info shape."""
+        rng = self._rng(ticker + "/info")
+        return {"marketCap": float(rng.lognormal(23, 1.2)),
+                "earningsGrowth": float(rng.normal(0.05, 0.3)),
+                "sector": str(rng.choice(["Technology", "Industrials", "Healthcare", "Utilities",
+                                          "Consumer Cyclical", "Financial Services"]))}
+
+
+class SyntheticSource(DataSource):
+    """DataSource serving a SyntheticMarket with vendor-like latency and failures."""
+    name = "synthetic"
+
+    def __init__(self, market, latency_ms=50.0, jitter=0.5, error_rate=0.0, per_ticker_ms=1.0, seed=0):
+        """
+        Args:
+            market: SyntheticMarket the bars come from
+            latency_ms: Median request latency (log-normal)
+            jitter: Sigma of the log-normal latency
+            error_rate: Probability that a request fails with a transient error
+            per_ticker_ms: Extra latency per ticker in a batch request
+        """
+        self.market = market
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.per_ticker_ms = per_ticker_ms
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def _request(self, tickers=1):
+        with self.lock:
+            self.requests += 1
+            delay_ms = self.latency_ms * math.exp(self.random.gauss(0, self.jitter))
+            failed = self.random.random() < self.error_rate
+            self.failures += failed
+        time.sleep((delay_ms + self.per_ticker_ms * (tickers - 1)) / 1000)
+        if failed:
+            raise ConnectionError("HTTP 503 (synthetic)")
+
+    def info(self, ticker):
+        self._request()
+        return self.market.info(ticker)
+
+    def fetch(self, ticker_symbol, interval, period=None, start=None):
+        self._request()
+        return self.market.bars(ticker_symbol, interval, period=period, start=start)
+
+    def fetch_batch(self, tickers, interval, period=None, start=None):
+        self._request(len(tickers))
+        frames = {}
+        for ticker_symbol in tickers:
+            hist = self.market.bars(ticker_symbol, interval, period=period, start=start)
+            if not hist.empty:
+                frames[ticker_symbol] = hist
+        return frames
+
+
+def synthetic_yfinance(source):
+    """Returns a module standing in for yfinance (download and Ticker().history), for main.py."""
+    module = types.ModuleType("yfinance")
+
+    def download(tickers, period=None, interval="1d", start=None, **kwargs):
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        frames = source.fetch_batch(tickers, interval, period=period, start=start)
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+    class Ticker:
+        def __init__(self, ticker_symbol):
+            self.ticker_symbol = ticker_symbol
+
+        def history(self, period=None, interval="1d", start=None, **kwargs):
+            return source.fetch(self.ticker_symbol, interval, period=period, start=start)
+
+        @property
+        def info(self):
+            return source.info(self.ticker_symbol)
+
+    module.download = download
+    module.Ticker = Ticker
+    return module
+
+
+# --- Measurement ---
+class Recorder:
+    """Collects per-ticker latencies and RSI compute time from instrumented functions."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {} # ticker -> seconds spent in the jobs that processed it
+        self.rsi_seconds = 0.0
+        self.rsi_calls = 0
+        self.local = threading.local()
+
+    def wrap_batches(self, run_concurrent_batches):
+        """Wraps run_concurrent_batches so each batch job's duration is charged to its tickers."""
+        def timed_run_concurrent_batches(tickers, batch_worker, batch_size, **kwargs):
+            def timed_worker(batch):
+                started = time.perf_counter()
+                try:
+                    return batch_worker(batch)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    with self.lock:
+                        for ticker in batch:
+                            self.latency[ticker] = self.latency.get(ticker, 0.0) + elapsed
+            return run_concurrent_batches(tickers, timed_worker, batch_size, **kwargs)
+        return timed_run_concurrent_batches
+
+    def wrap_rsi(self, func):
+        """Wraps an RSI function; nested RSI calls are only counted once."""
+        def timed_rsi(*args, **kwargs):
+            if getattr(self.local, "depth", 0):
+                return func(*args, **kwargs)
+            self.local.depth = 1
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                self.local.depth = 0
+                with self.lock:
+                    self.rsi_seconds += elapsed
+                    self.rsi_calls += 1
+        return timed_rsi
+
+
+class LineClock(io.TextIOBase):
+    """stdout replacement recording when lines starting with `prefix` are printed (text is discarded)."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.times = []
+
+    def write(self, text):
+        if text.startswith(self.prefix):
+            self.times.append(time.perf_counter())
+        return len(text)
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else float("nan")
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024 # Bytes on macOS, KB on Linux
+
+
+# --- Targets ---
+def _configure_china(settings, work_dir, source):
+    """Points main_china at the synthetic source and a throwaway cache directory."""
+    import main_china
+    import scan_pipeline
+    from fundamentals import FundamentalsStore
+    from universe import TickerUniverse
+
+    main_china._data_sources = [source]
+    main_china.USE_OHLCV_CACHE = False
+    main_china.USE_RSI_STATE = False
+    main_china.PLOT_OUTPUT_DIR = os.path.join(work_dir, "plots")
+    main_china.SCAN_STATS_PATH = os.path.join(work_dir, "scan_stats.json")
+    main_china.TRIGGER_INDEX_PATH = os.path.join(work_dir, "rsi_triggers.json")
+    main_china.MAX_WORKERS = settings["workers"]
+    if settings["batch_size"]:
+        main_china.BATCH_SIZE = scan_pipeline.BATCH_SIZE = settings["batch_size"]
+    main_china.USE_BATCH_DOWNLOAD = not settings["no_batch"]
+    main_china.DERIVE_FROM_DAILY = not settings["native_timeframes"]
+    main_china._fundamentals_store = FundamentalsStore(os.path.join(work_dir, "fundamentals.json"), source.info)
+
+    listing_path = os.path.join(work_dir, "universe.txt")
+    with open(listing_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(synthetic_tickers(settings["tickers"])) + "\n")
+    main_china._ticker_universe = TickerUniverse(snapshot_path=os.path.join(work_dir, "listing.json"),
+                                                 dead_path=os.path.join(work_dir, "dead_tickers.json"))
+    main_china._ticker_universe.load_file(listing_path)
+    return main_china
+
+
+def _instrument_china(recorder):
+    import main_china
+    import scan_pipeline
+    main_china.run_concurrent_batches = recorder.wrap_batches(main_china.run_concurrent_batches)
+    scan_pipeline.run_concurrent_batches = recorder.wrap_batches(scan_pipeline.run_concurrent_batches)
+    main_china.compute_latest_rsi = recorder.wrap_rsi(main_china.compute_latest_rsi)
+    main_china.add_rsi_column = recorder.wrap_rsi(main_china.add_rsi_column)
+    scan_pipeline.compute_latest_rsi = recorder.wrap_rsi(scan_pipeline.compute_latest_rsi)
+
+
+def _run_china(settings, work_dir, source, recorder):
+    main_china = _configure_china(settings, work_dir, source)
+    _instrument_china(recorder)
+    main_china.run_china_scan_and_plot(max_workers=settings["workers"])
+    return len(recorder.latency)
+
+
+def _run_gui(settings, work_dir, source, recorder):
+    _configure_china(settings, work_dir, source)
+    _instrument_china(recorder)
+    import gui_china
+    from progress_journal import ProgressJournal
+    gui_china.MAX_WORKERS = settings["workers"]
+    gui_china.SCAN_STATS_PATH = os.path.join(work_dir, "scan_stats.json")
+
+    class Value:
+        def __init__(self, value):
+            self.value = value
+
+        def get(self):
+            return self.value
+
+    # StockScannerApp.run_scan only touches these attributes, so it runs without a window
+    app = types.SimpleNamespace(scan_queue=queue.Queue(), processed_tickers=set(), is_scanning=True,
+                                is_paused=False, show_all_sectors_var=Value(True), selected_sectors=set(),
+                                journal=ProgressJournal(os.path.join(work_dir, "scan_journal.jsonl")))
+    gui_china.StockScannerApp.run_scan(app)
+    app.journal.close()
+    return len(app.processed_tickers)
+
+
+def _run_main(settings, work_dir, source, recorder):
+    try:
+        import pandas_ta
+        accessor = type(pd.DataFrame().ta) # Registered by pandas_ta
+    except (ImportError, AttributeError):
+        return None
+    # Charge each hist.ta.rsi() call to the RSI timer
+    accessor.rsi = recorder.wrap_rsi(accessor.rsi)
+    sys.modules["yfinance"] = synthetic_yfinance(source)
+
+    clock = LineClock(" Checking ")
+    with contextlib.redirect_stdout(clock):
+        runpy.run_path(MAIN_SCRIPT, run_name="__main__")
+    clock.times.append(time.perf_counter())
+    # main.py checks tickers one after another; each latency runs to the next " Checking" line
+    recorder.latency = {i: end - start for i, (start, end) in enumerate(zip(clock.times, clock.times[1:]))}
+    return len(recorder.latency)
+
+
+TARGET_RUNNERS = {"main": _run_main, "china": _run_china, "gui": _run_gui}
+
+
+def run_target(target, settings):
+    """Runs one target in this process and returns its metrics (called in a fresh worker process)."""
+    market = SyntheticMarket(seed=settings["seed"], years=settings["years"],
+                             dead_fraction=settings["dead_fraction"],
+                             missing_fraction=settings["missing_fraction"])
+    source = SyntheticSource(market, latency_ms=settings["latency_ms"], jitter=settings["jitter"],
+                             error_rate=settings["error_rate"], seed=settings["seed"])
+    recorder = Recorder()
+    rss_before = peak_rss_mb()
+
+    with tempfile.TemporaryDirectory(prefix=f"bench_{target}_") as work_dir:
+        with contextlib.redirect_stdout(io.StringIO()) if target != "main" else contextlib.nullcontext():
+            started = time.perf_counter()
+            tickers = TARGET_RUNNERS[target](settings, work_dir, source, recorder)
+            elapsed = time.perf_counter() - started
+    if tickers is None:
+        return {"target": target, "skipped": "pandas_ta is not installed"}
+
+    latencies_ms = [seconds * 1000 for seconds in recorder.latency.values()]
+    return {
+        "target": target,
+        "tickers": tickers,
+        "seconds": elapsed,
+        "tickers_per_second": tickers / elapsed if elapsed > 0 else float("nan"),
+        "latency_p50_ms": percentile(latencies_ms, 50),
+        "latency_p99_ms": percentile(latencies_ms, 99),
+        "rsi_seconds": recorder.rsi_seconds,
+        "rsi_calls": recorder.rsi_calls,
+        "requests": source.requests,
+        "failed_requests": source.failures,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_benchmark(targets=BENCH_TARGETS, **settings):
+    """Runs each target in its own spawned process and returns the list of results."""
+    results = []
+    for target in targets:
+        print(f"Running {target}...")
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results.append(pool.submit(run_target, target, settings).result())
+    return results
+
+
+def print_report(results):
+    print(f"\n{'target':<7} {'tickers':>7} {'secs':>8} {'tick/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'RSI s':>7} {'RSI ms/call':>11} {'req':>6} {'fail':>5} {'peak MB':>8}")
+    for r in results:
+        if "skipped" in r:
+            print(f"{r['target']:<7} skipped: {r['skipped']}")
+            continue
+        per_call_ms = r["rsi_seconds"] * 1000 / r["rsi_calls"] if r["rsi_calls"] else float("nan")
+        peak = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/a"
+        print(f"{r['target']:<7} {r['tickers']:>7} {r['seconds']:>8.2f} {r['tickers_per_second']:>8.1f} "
+              f"{r['latency_p50_ms']:>8.1f} {r['latency_p99_ms']:>8.1f} {r['rsi_seconds']:>7.2f} "
+              f"{per_call_ms:>11.3f} {r['requests']:>6} {r['failed_requests']:>5} {peak:>8}")
+
+
+# --- Guard for Direct Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scanners against a synthetic A-share market.")
+    parser.add_argument("--targets", default=",".join(BENCH_TARGETS), help="Comma-separated: main,china,gui")
+    parser.add_argument("--tickers", type=int, default=2000, help="Synthetic universe size (china/gui)")
+    parser.add_argument("--years", type=float, default=10, help="Years of Daily history per ticker")
+    parser.add_argument("--dead-fraction", type=float, default=0.05, help="Share of codes without any data")
+    parser.add_argument("--missing-fraction", type=float, default=0.1, help="Share of tickers with gaps and NaN closes")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Median latency per request")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Sigma of the log-normal latency")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="Probability that a request fails")
+    parser.add_argument("--workers", type=int, default=8, help="Threads fetching in parallel")
+    parser.add_argument("--batch-size", type=int, default=None, help="Tickers per batched request (default: BATCH_SIZE)")
+    parser.add_argument("--no-batch", action="store_true", help="Fetch ticker by ticker")
+    parser.add_argument("--native-timeframes", action="store_true", help="Fetch Weekly/Monthly instead of resampling Daily")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in TARGET_RUNNERS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+    results = run_benchmark(targets, tickers=args.tickers, years=args.years, dead_fraction=args.dead_fraction,
+                            missing_fraction=args.missing_fraction, latency_ms=args.latency_ms,
+                            jitter=args.jitter, error_rate=args.error_rate, workers=args.workers,
+                            batch_size=args.batch_size, no_batch=args.no_batch,
+                            native_timeframes=args.native_timeframes, seed=args.seed)
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
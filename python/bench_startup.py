@@ -0,0 +1,125 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# --- Startup Benchmark ---
+# Measures how long the scanner modules take to import, each in a fresh
+# interpreter (python -X importtime), and checks that none of them pulls in
+# the heavy libraries that are meant to be imported lazily.
+#
+#   python python/bench_startup.py
+#   python python/bench_startup.py --repeat 5 --budget-ms 1500 --top 15
+#
+# Exit code: 0 within budget, 1 over budget or a heavy library was imported.
+
+BENCH_MODULES = ("gui_china", "scan_pipeline", "main_china")
+LAZY_MODULES = ("yfinance", "akshare", "pandas_ta", "matplotlib") # Must not load at import time
+STARTUP_BUDGET_MS = 1500 # Import budget per module (median wall time)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(stderr):
+    """
+    Parses `python -X importtime` output.
+    Returns [(module, self_us, cumulative_us, depth)] in import order (depth 0 = imported directly).
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue # Header line
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2 # Nested imports are indented by two spaces
+        imports.append((name.strip(), self_us, cumulative_us, depth))
+    return imports
+
+
+def time_import(module):
+    """
+    Imports `module` in a new interpreter.
+    Returns (wall time in ms, parsed importtime rows, error output or None).
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (SCRIPT_DIR, env.get("PYTHONPATH")) if p)
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=SCRIPT_DIR, env=env, capture_output=True, text=True)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    error = None
+    if proc.returncode != 0:
+        error = "\n".join(line for line in proc.stderr.splitlines() if not line.startswith("import time:"))
+    return elapsed_ms, parse_importtime(proc.stderr), error
+
+
+def baseline_ms(repeat):
+    """Median start-up time of a bare interpreter, subtracted from the import times."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], capture_output=True)
+        samples.append((time.perf_counter() - started) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+
+def run_benchmark(modules=BENCH_MODULES, repeat=3, budget_ms=STARTUP_BUDGET_MS, top=10):
+    """
+    Benchmarks each module and prints a report. Returns True if all are within budget.
+
+    Args:
+        modules: Module names to import (from the python/ directory)
+        repeat: Fresh interpreters per module; the median is reported
+        budget_ms: Allowed import time per module, excluding interpreter start-up
+        top: Number of slowest direct imports (cumulative) listed per module
+    """
+    ok = True
+    interpreter_ms = baseline_ms(repeat)
+    print(f"Interpreter start-up: {interpreter_ms:.0f} ms (subtracted below)")
+
+    for module in modules:
+        samples = []
+        imports = []
+        error = None
+        for _ in range(repeat):
+            elapsed_ms, imports, error = time_import(module)
+            if error:
+                break
+            samples.append(max(0.0, elapsed_ms - interpreter_ms))
+        if error:
+            print(f"\n{module}: import failed\n{error}")
+            ok = False
+            continue
+
+        median_ms = sorted(samples)[len(samples) // 2]
+        within = median_ms <= budget_ms
+        print(f"\n{module}: {median_ms:.0f} ms (budget {budget_ms} ms) {'OK' if within else 'OVER BUDGET'}")
+        ok = ok and within
+
+        loaded = {row[0].split(".")[0] for row in imports}
+        eager = [name for name in LAZY_MODULES if name in loaded]
+        if eager:
+            print(f"  Imported eagerly (should be lazy): {', '.join(eager)}")
+            ok = False
+
+        direct = [row for row in imports if row[3] == 1] # Imported by the benchmarked module itself
+        for name, _, cumulative_us, _ in sorted(direct, key=lambda row: -row[2])[:top]:
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    return ok
+
+
+# --- Guard for Direct Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time benchmark of the scanner modules.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module (median is reported)")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="Import budget per module in ms")
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports listed per module")
+    parser.add_argument("modules", nargs="*", default=list(BENCH_MODULES), help="Modules to benchmark")
+    args = parser.parse_args()
+    sys.exit(0 if run_benchmark(args.modules, max(1, args.repeat), args.budget_ms, args.top) else 1)
@@ -0,0 +1,200 @@
+import os
+import re
+import threading
+from datetime import datetime
+import pandas as pd
+
+# --- Data Sources ---
+# Every source returns bars in the same shape: a DataFrame indexed by Date with
+# Open/High/Low/Close/Volume columns (empty if the source has no data).
+# fetch_stock_data_remote in main_china.py tries the configured sources in order.
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+YFINANCE_PERIODS = {"1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max"} # Others are sent as a start date
+
+
+def period_start(period):
+    """Returns the first date covered by a yfinance-style period string (None for 'max')."""
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period or "")
+    if not match:
+        return None
+    days_per_unit = {"d": 1, "wk": 7, "mo": 31, "y": 365}
+    days = int(match.group(1)) * days_per_unit[match.group(2)]
+    return pd.Timestamp(datetime.now().date()) - pd.Timedelta(days=days)
+
+
+class DataSource:
+    """Interface for a bar source."""
+    name = "base"
+
+    def fetch(self, ticker_symbol, interval, period=None, start=None):
+        """Returns bars for `period` (or from `start`, which takes precedence)."""
+        raise NotImplementedError
+
+    def fetch_batch(self, tickers, interval, period=None, start=None):
+        """Returns {ticker: bars} for many tickers; sources without a batch API loop over fetch()."""
+        frames = {}
+        for ticker_symbol in tickers:
+            hist = self.fetch(ticker_symbol, interval, period=period, start=start)
+            if hist is not None and not hist.empty:
+                frames[ticker_symbol] = hist
+        return frames
+
+    def _call(self, guard, func, *args, **kwargs):
+        return guard.call(func, *args, **kwargs) if guard is not None else func(*args, **kwargs)
+
+
+class YFinanceSource(DataSource):
+    """Yahoo Finance via yfinance (600000.SS / 000001.SZ symbols)."""
+    name = "yfinance"
+
+    def __init__(self, guard=None):
+        self.guard = guard
+
+    def fetch(self, ticker_symbol, interval, period=None, start=None):
+        import yfinance as yf
+        ticker_data = yf.Ticker(ticker_symbol)
+        if start is None and period not in YFINANCE_PERIODS:
+            start = period_start(period) # e.g. "210d" windows sized to the RSI warm-up
+        if start is not None:
+            return self._call(self.guard, ticker_data.history,
+                              start=pd.Timestamp(start).strftime('%Y-%m-%d'), interval=interval)
+        return self._call(self.guard, ticker_data.history, period=period, interval=interval)
+
+    def fetch_batch(self, tickers, interval, period=None, start=None):
+        """Downloads many tickers in one yf.download request and splits the response."""
+        import yfinance as yf
+        tickers = list(tickers)
+        if start is None and period not in YFINANCE_PERIODS:
+            start = period_start(period)
+        kwargs = {"start": pd.Timestamp(start).strftime('%Y-%m-%d')} if start is not None else {"period": period}
+        data = self._call(self.guard, yf.download, tickers, interval=interval, group_by="ticker",
+                          auto_adjust=True, threads=False, progress=False, **kwargs)
+        frames = {}
+        if data is None or data.empty:
+            return frames
+        if not isinstance(data.columns, pd.MultiIndex):
+            data = pd.concat({tickers[0]: data}, axis=1) # Single-ticker response
+        for ticker_symbol in tickers:
+            if ticker_symbol not in data.columns.get_level_values(0):
+                continue
+            hist = data[ticker_symbol].dropna(how="all")
+            if not hist.empty:
+                frames[ticker_symbol] = hist
+        return frames
+
+
+class AkshareSource(DataSource):
+    """Eastmoney A-share history via akshare (forward-adjusted, 'qfq')."""
+    name = "akshare"
+    PERIODS = {"1d": "daily", "1wk": "weekly", "1mo": "monthly"}
+    COLUMNS = {'日期': 'Date', '开盘': 'Open', '收盘': 'Close', '最高': 'High', '最低': 'Low', '成交量': 'Volume'}
+
+    def __init__(self, guard=None, adjust="qfq"):
+        self.guard = guard
+        self.adjust = adjust
+
+    def fetch(self, ticker_symbol, interval, period=None, start=None):
+        import akshare as ak
+        parts = ticker_symbol.split('.')
+        if len(parts) != 2 or parts[1].upper() not in ("SS", "SZ"):
+            raise ValueError(f"Invalid ticker format for akshare: {ticker_symbol}")
+        ak_period = self.PERIODS.get(interval)
+        if not ak_period:
+            raise ValueError(f"Unsupported interval for akshare: {interval}")
+
+        if start is None:
+            start = period_start(period)
+        start_date = pd.Timestamp(start).strftime('%Y%m%d') if start is not None else "19900101"
+        end_date = datetime.now().strftime('%Y%m%d')
+        # stock_zh_a_hist takes the bare 6-digit code (e.g. 600000)
+        hist = self._call(self.guard, ak.stock_zh_a_hist, symbol=parts[0], period=ak_period,
+                          start_date=start_date, end_date=end_date, adjust=self.adjust)
+        if hist is None or hist.empty:
+            return pd.DataFrame()
+        hist = hist.rename(columns=self.COLUMNS)
+        hist['Date'] = pd.to_datetime(hist['Date'])
+        hist = hist.set_index('Date')
+        return hist[[col for col in OHLCV_COLUMNS if col in hist.columns]]
+
+
+class LocalFileSource(DataSource):
+    """
+    Replays bars from a directory laid out as <root>/<interval>/<ticker>.parquet
+    or .csv (as written by RecordingSource). No network access.
+    """
+    name = "local"
+
+    def __init__(self, root):
+        self.root = root
+
+    def path_for(self, ticker_symbol, interval, extension):
+        return os.path.join(self.root, interval, f"{ticker_symbol}.{extension}")
+
+    def read(self, ticker_symbol, interval):
+        """Returns the full stored history, or an empty DataFrame."""
+        parquet_path = self.path_for(ticker_symbol, interval, "parquet")
+        if os.path.exists(parquet_path):
+            hist = pd.read_parquet(parquet_path)
+        else:
+            csv_path = self.path_for(ticker_symbol, interval, "csv")
+            if not os.path.exists(csv_path):
+                return pd.DataFrame()
+            hist = pd.read_csv(csv_path, index_col=0)
+        hist.index = pd.to_datetime(hist.index)
+        hist.index.name = 'Date'
+        return hist
+
+    def fetch(self, ticker_symbol, interval, period=None, start=None):
+        hist = self.read(ticker_symbol, interval)
+        if start is None:
+            start = period_start(period)
+        if start is not None and not hist.empty:
+            index = hist.index.tz_localize(None) if hist.index.tz is not None else hist.index
+            hist = hist[index >= pd.Timestamp(start)]
+        return hist
+
+
+class RecordingSource(DataSource):
+    """
+    Proxy that forwards to a live source and saves every non-empty response
+    into a LocalFileSource directory, merging with what was recorded before.
+    """
+
+    def __init__(self, inner, root, file_format="csv"):
+        self.inner = inner
+        self.name = inner.name
+        self.store = LocalFileSource(root)
+        self.file_format = file_format # "csv" (no extra dependency) or "parquet"
+        self.lock = threading.Lock()
+
+    def record(self, ticker_symbol, interval, hist):
+        with self.lock:
+            recorded = self.store.read(ticker_symbol, interval)
+            hist = hist[[col for col in OHLCV_COLUMNS if col in hist.columns]].copy()
+            if not recorded.empty:
+                hist.index = pd.to_datetime(hist.index)
+                if hist.index.tz is not None:
+                    hist.index = hist.index.tz_localize(None)
+                if recorded.index.tz is not None:
+                    recorded.index = recorded.index.tz_localize(None)
+                hist = pd.concat([recorded, hist])
+                hist = hist[~hist.index.duplicated(keep='last')].sort_index()
+            path = self.store.path_for(ticker_symbol, interval, self.file_format)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_format == "parquet":
+                hist.to_parquet(path)
+            else:
+                hist.to_csv(path)
+
+    def fetch(self, ticker_symbol, interval, period=None, start=None):
+        hist = self.inner.fetch(ticker_symbol, interval, period=period, start=start)
+        if hist is not None and not hist.empty:
+            self.record(ticker_symbol, interval, hist)
+        return hist
+
+    def fetch_batch(self, tickers, interval, period=None, start=None):
+        frames = self.inner.fetch_batch(tickers, interval, period=period, start=start)
+        for ticker_symbol, hist in frames.items():
+            self.record(ticker_symbol, interval, hist)
+        return frames
@@ -0,0 +1,252 @@
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# --- Concurrent Fetch Engine ---
+# Shared by the CLI scan (main_china.py) and the GUI scan (gui_china.py).
+# Tickers are handed to a bounded thread pool; results come back in
+# completion order so callers can stream them (e.g. onto the GUI queue).
+
+
+class RateLimiter:
+    """Token bucket limiting how many calls per second go to one data source."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then consumes it."""
+        if self.rate <= 0:
+            return  # Rate of 0 means unlimited
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+    def set_rate(self, rate):
+        """Changes the refill rate (used by SourceGuard to adapt to throttling)."""
+        with self.lock:
+            self.rate = float(rate)
+
+
+# --- Source Guard: adaptive rate limit, retry/backoff, circuit breaker ---
+class SourceUnavailable(Exception):
+    """Raised instead of calling a source whose circuit breaker is open."""
+
+
+def is_transient_error(error):
+    """True for throttling (429) and server-side (5xx) errors worth retrying."""
+    for obj in (error, getattr(error, "response", None)):
+        status = getattr(obj, "status_code", None) or getattr(obj, "status", None)
+        if isinstance(status, int):
+            return status == 429 or 500 <= status < 600
+    text = f"{type(error).__name__} {error}".lower()
+    if "too many requests" in text or "rate limit" in text or "ratelimit" in text:
+        return True
+    return re.search(r"\b(429|5\d\d)\b", text) is not None or isinstance(error, (TimeoutError, ConnectionError))
+
+
+class SourceGuard:
+    """
+    Wraps calls to one data source with an adaptive token bucket, retries with
+    exponential backoff and jitter on transient errors, and a circuit breaker
+    that fails fast while the source is down so callers can use another source.
+    """
+
+    def __init__(self, name, rate, max_retries=3, base_delay=1.0, max_delay=30.0,
+                 failure_threshold=5, reset_timeout=60.0):
+        self.name = name
+        self.max_rate = float(rate)
+        self.min_rate = min(self.max_rate, 0.2) if self.max_rate > 0 else 0
+        self.limiter = RateLimiter(rate)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.state = "closed" # closed -> open -> half-open -> closed
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.listeners = [] # Callables receiving state-change messages (e.g. the GUI log)
+
+    def set_max_rate(self, rate):
+        """Changes the rate ceiling, e.g. to split a source's budget across several processes."""
+        with self.lock:
+            self.max_rate = float(rate)
+            self.min_rate = min(self.max_rate, 0.2) if self.max_rate > 0 else 0
+            self.limiter.set_rate(self.max_rate)
+
+    def _emit(self, message):
+        for listener in list(self.listeners) or [print]:
+            try:
+                listener(message)
+            except Exception:
+                pass
+
+    def available(self):
+        """True if a call may go to the source now (closed, or the half-open trial slot is free)."""
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half-open"
+                self.trial_in_flight = False
+                message = f"[{self.name}] circuit half-open, sending a trial request"
+            elif self.state == "half-open" and not self.trial_in_flight:
+                message = None
+            else:
+                return False
+            self.trial_in_flight = True
+        if message:
+            self._emit(message)
+        return True
+
+    def _record_success(self):
+        with self.lock:
+            recovered = self.state != "closed"
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.trial_in_flight = False
+            if self.max_rate > 0 and self.limiter.rate < self.max_rate:
+                self.limiter.set_rate(min(self.max_rate, self.limiter.rate + self.max_rate * 0.05))
+        if recovered:
+            self._emit(f"[{self.name}] circuit closed, source healthy again")
+
+    def _record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.max_rate > 0:
+                self.limiter.set_rate(max(self.min_rate, self.limiter.rate * 0.5)) # Back off the request rate
+            tripped = self.state == "half-open" or (
+                self.state == "closed" and self.consecutive_failures >= self.failure_threshold)
+            if tripped:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.trial_in_flight = False
+            rate = self.limiter.rate
+        if tripped:
+            self._emit(f"[{self.name}] circuit OPEN after {self.consecutive_failures} failures, "
+                       f"routing around it for {self.reset_timeout:.0f}s (rate now {rate:.2f}/s)")
+
+    def call(self, func, *args, **kwargs):
+        """Calls func through the guard. Raises SourceUnavailable while the circuit is open."""
+        if not self.available():
+            raise SourceUnavailable(f"{self.name} circuit is open")
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_transient_error(e):
+                    with self.lock:
+                        self.trial_in_flight = False
+                    raise # Bad symbol etc.: not a sign of source trouble
+                self._record_failure()
+                if attempt == self.max_retries or self.state == "open":
+                    raise
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                time.sleep(delay * random.uniform(0.5, 1.5)) # Jitter spreads retries from many workers
+                continue
+            self._record_success()
+            return result
+
+    def status(self):
+        """One-line summary of the guard's state for logs."""
+        with self.lock:
+            return f"{self.name}: {self.state}, {self.limiter.rate:.2f} req/s, {self.consecutive_failures} consecutive failures"
+
+
+def run_concurrent(tickers, worker, max_workers=8, should_stop=None, is_paused=None):
+    """
+    Runs worker(ticker) for every ticker on a bounded thread pool.
+    Yields (ticker, result, error) tuples in completion order.
+
+    Args:
+        tickers: Iterable of ticker symbols
+        worker: Callable taking a ticker symbol and returning its result
+        max_workers: Number of worker threads (and roughly the number of tickers in flight)
+        should_stop: Optional callable; when it returns True no new tickers are started
+                     and pending ones are cancelled
+        is_paused: Optional callable; while it returns True no new tickers are started
+    """
+    should_stop = should_stop or (lambda: False)
+    is_paused = is_paused or (lambda: False)
+    max_workers = max(1, int(max_workers))
+    max_in_flight = max_workers * 2  # Keep the pool busy without queueing the whole universe
+    ticker_iter = iter(tickers)
+    exhausted = False
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch") as executor:
+        in_flight = {}
+        try:
+            while True:
+                # Top up the in-flight window unless paused or cancelled
+                while not exhausted and len(in_flight) < max_in_flight:
+                    if should_stop() or is_paused():
+                        break
+                    try:
+                        ticker = next(ticker_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    in_flight[executor.submit(worker, ticker)] = ticker
+
+                if not in_flight:
+                    if exhausted or should_stop():
+                        return
+                    time.sleep(0.1)  # Paused with nothing running
+                    continue
+
+                done, _ = wait(list(in_flight), timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ticker = in_flight.pop(future)
+                    try:
+                        yield ticker, future.result(), None
+                    except Exception as e:
+                        yield ticker, None, e
+
+                if should_stop():
+                    for future in list(in_flight):
+                        if future.cancel():
+                            in_flight.pop(future)
+                    exhausted = True
+        finally:
+            # Consumer stopped early (or stop requested): drop anything not yet started
+            for future in in_flight:
+                future.cancel()
+
+
+def run_concurrent_batches(tickers, batch_worker, batch_size, **kwargs):
+    """
+    Like run_concurrent, but hands tickers to batch_worker in groups of batch_size
+    (e.g. for batched downloads). batch_worker returns {ticker: result}, with an
+    Exception as the value for tickers that failed individually.
+    Yields per-ticker (ticker, result, error) tuples.
+    """
+    tickers = list(tickers)
+    batch_size = max(1, int(batch_size))
+    batches = [tuple(tickers[i:i + batch_size]) for i in range(0, len(tickers), batch_size)]
+    for batch, results, error in run_concurrent(batches, batch_worker, **kwargs):
+        for ticker in batch:
+            if error is not None:
+                yield ticker, None, error
+                continue
+            result = results.get(ticker)
+            if isinstance(result, Exception):
+                yield ticker, None, result
+            else:
+                yield ticker, result, None
@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from fetch_engine import run_concurrent
+
+# --- Fundamentals Store ---
+# Caches the few `.info` fields the scanners use (market cap, earnings growth,
+# sector) with a TTL and persists them between runs. Fundamentals change
+# quarterly, so one lookup per ticker per TTL is enough.
+
+FUNDAMENTAL_FIELDS = ("marketCap", "earningsGrowth", "sector")
+
+
+class FundamentalsStore:
+    """Persistent, TTL-based cache of per-ticker fundamentals."""
+
+    def __init__(self, path, fetch_info, ttl_days=30, save_every=50):
+        """
+        Args:
+            path: JSON file the store is persisted to
+            fetch_info: Callable taking a ticker and returning its full info dict
+            ttl_days: Age after which an entry is fetched again
+            save_every: Persist after this many new entries (plus on save())
+        """
+        self.path = path
+        self.fetch_info = fetch_info
+        self.ttl_seconds = ttl_days * 86400
+        self.save_every = save_every
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock() # One writer at a time per process
+        self.unsaved = 0
+        self.entries = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read fundamentals cache {self.path}: {e}")
+            return {}
+
+    def save(self):
+        """
+        Writes the store to disk (atomically), keeping newer entries saved by other processes.
+        Each save writes its own temporary file, so concurrent threads and processes never
+        share a half-written file.
+        """
+        with self.save_lock:
+            with self.lock:
+                entries = dict(self.entries)
+                self.unsaved = 0
+            for ticker, entry in self._load().items():
+                if entry.get("fetched_at", 0) > entries.get(ticker, {}).get("fetched_at", 0):
+                    entries[ticker] = entry
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def _is_fresh(self, entry):
+        return entry is not None and time.time() - entry.get("fetched_at", 0) < self.ttl_seconds
+
+    def get(self, ticker):
+        """Returns {marketCap, earningsGrowth, sector} for a ticker, fetching it if missing or expired."""
+        with self.lock:
+            entry = self.entries.get(ticker)
+        if self._is_fresh(entry):
+            return entry
+        try:
+            info = self.fetch_info(ticker) or {}
+        except Exception as e:
+            print(f"Could not fetch fundamentals for {ticker}: {e}")
+            return entry or {} # Serve an expired entry rather than nothing
+        entry = {field: info.get(field) for field in FUNDAMENTAL_FIELDS}
+        entry["fetched_at"] = time.time()
+        with self.lock:
+            self.entries[ticker] = entry
+            self.unsaved += 1
+            should_save = self.unsaved >= self.save_every
+        if should_save:
+            try:
+                self.save()
+            except Exception as e:
+                print(f"Could not save fundamentals cache {self.path}: {e}") # Kept in memory; retried on the next save
+        return entry
+
+    def prefetch(self, tickers, max_workers=8):
+        """Fills missing or expired entries for many tickers concurrently."""
+        with self.lock:
+            missing = [t for t in tickers if not self._is_fresh(self.entries.get(t))]
+        for _ in run_concurrent(missing, self.get, max_workers=max_workers):
+            pass
+        self.save()
+        return len(missing)
@@ -3,8 +3,6 @@ from tkinter import ttk, scrolledtext, filedialog
 import threading
 import queue
 import time
-import pandas as pd
-import yfinance as yf
 import json
 import os
 
@@ -14,9 +12,13 @@ import os
 # For now, assume functions are importable or copy necessary parts.
 try:
     from main_china import (
-        generate_specific_prefix_tickers, fetch_stock_data,
-        RSI_PERIOD, OVERSOLD_THRESHOLD, OVERBOUGHT_THRESHOLD, TIME_PERIODS
+        get_ticker_universe, load_scan_tickers, OVERSOLD_THRESHOLD, OVERBOUGHT_THRESHOLD,
+        MAX_WORKERS, get_fundamentals_store, SOURCE_GUARDS, warm_up_imports,
+        get_scan_stats, SCAN_STATS_PATH, update_trigger_index, BUILD_TRIGGER_INDEX
     )
+    from scan_pipeline import run_staged_scan
+    from result_table import TableModel
+    from progress_journal import ProgressJournal
     print("Successfully imported logic from main_china.py")
 except ImportError as e:
     print(f"Error importing from main_china.py: {e}")
@@ -209,6 +211,112 @@ SECTORS = {
 # Recommended sectors for trade war conditions
 RECOMMENDED_SECTORS = ["consumer-cyclical", "utilities", "healthcare"]
 
+# --- UI Update Configuration ---
+QUEUE_POLL_MS = 100 # How often the queue is drained while idle
+QUEUE_TICK_BUDGET_MS = 30 # Max time spent draining the queue per tick, so the window stays responsive
+LOG_MAX_LINES = 5000 # Oldest log lines are dropped beyond this (ring buffer)
+WARM_UP_DELAY_MS = 500 # Delay before yfinance/akshare are imported in the background
+STATS_REFRESH_MS = 1000 # How often the "Scan Stats" tab is refreshed while scanning
+
+# --- Progress Journal Configuration ---
+# Scan progress is appended to this journal as each ticker finishes and replayed on startup.
+PROGRESS_JOURNAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "scan_journal.jsonl")
+JOURNAL_COMPACT_EVERY = 5000 # Journal lines before it is rewritten as one snapshot
+ROW_MESSAGE_TYPES = { # save_progress table key -> queue message adding a row to that table
+    "oversold_signals": "add_row",
+    "filtered_oversold_signals": "add_filtered_row",
+    "overbought_signals": "add_overbought_row",
+    "filtered_overbought_signals": "add_filtered_overbought_row",
+}
+
+# --- Virtualized Result Table ---
+class VirtualTable:
+    """
+    Shows a window of a TableModel in a Treeview. The Treeview only ever holds
+    as many items as fit on screen; scrolling re-fills them from the model.
+    """
+
+    def __init__(self, tree, scrollbar, model=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.model = model or TableModel()
+        self.offset = 0 # Index of the first visible row
+        self.visible_rows = int(tree.cget("height") or 10)
+        scrollbar.config(command=self.yview)
+        tree.config(yscrollcommand="")
+        tree.bind("<Configure>", self._on_resize)
+        tree.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 if e.delta > 0 else 1, "units"))
+        tree.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units")) # X11 wheel
+        tree.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+        for column in tree["columns"]:
+            tree.heading(column, command=lambda c=column: self.sort_by(c))
+
+    def __len__(self):
+        return len(self.model)
+
+    def _on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible_rows = max(1, event.height // row_height - 1) # Minus the heading row
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.refresh()
+
+    def yview(self, *args):
+        """Scrollbar / mouse wheel callback ('moveto', fraction) or ('scroll', n, 'units'|'pages')."""
+        total = self.model.visible_count()
+        if args and args[0] == "moveto":
+            self.offset = int(float(args[1]) * total)
+        elif args and args[0] == "scroll":
+            step = int(args[1]) * (self.visible_rows if args[2] == "pages" else 1)
+            self.offset += step
+        self.refresh()
+
+    def sort_by(self, column):
+        self.model.sort(column)
+        self.offset = 0
+        self.refresh()
+
+    def set_filter(self, text):
+        self.model.set_filter(text)
+        self.offset = 0
+        self.refresh()
+
+    def add_rows(self, records):
+        """Adds rows to the model and redraws if any were new. Returns the number added."""
+        added = self.model.add_rows(records)
+        if added:
+            self.refresh()
+        return added
+
+    def load(self, records):
+        self.model.load_records(records)
+        self.offset = 0
+        self.refresh()
+
+    def clear(self):
+        self.model.clear()
+        self.offset = 0
+        self.refresh()
+
+    def refresh(self):
+        """Redraws the visible window, reusing the Treeview's items."""
+        total = self.model.visible_count()
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        rows = self.model.rows(self.offset, self.offset + self.visible_rows)
+        items = self.tree.get_children()
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+        for i, row in enumerate(rows):
+            values = tuple(("Yes" if value else "No") if isinstance(value, bool) else value for value in row)
+            if i < len(items):
+                self.tree.item(items[i], values=values)
+            else:
+                self.tree.insert("", tk.END, values=values)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + len(rows)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
 # --- GUI Application Class ---
 class StockScannerApp(tk.Tk):
     def __init__(self):
@@ -222,6 +330,8 @@ class StockScannerApp(tk.Tk):
         self.is_paused = False
         self.processed_tickers = set()  # Track processed tickers for resume functionality
         self.selected_sectors = set()  # Track selected sectors for filtering
+        self.journal = ProgressJournal(PROGRESS_JOURNAL_PATH, compact_every=JOURNAL_COMPACT_EVERY)
+        self.stats_refresh_job = None
 
         # --- Configure Grid ---
         self.grid_columnconfigure(0, weight=1)
@@ -246,6 +356,12 @@ class StockScannerApp(tk.Tk):
         self.load_button = ttk.Button(control_frame, text="Load Progress", command=self.load_progress)
         self.load_button.pack(side=tk.LEFT, padx=5)
 
+        # Filters all four result tables by ticker or sector
+        ttk.Label(control_frame, text="Filter:").pack(side=tk.LEFT, padx=(15, 2))
+        self.table_filter_var = tk.StringVar()
+        self.table_filter_var.trace_add("write", lambda *args: self.apply_table_filter())
+        ttk.Entry(control_frame, textvariable=self.table_filter_var, width=12).pack(side=tk.LEFT)
+
         # --- Log Frame ---
         log_frame = ttk.LabelFrame(self, text="Log Output", padding="10")
         log_frame.grid(row=1, column=0, rowspan=2, padx=10, pady=5, sticky="nsew")
@@ -255,6 +371,7 @@ class StockScannerApp(tk.Tk):
         self.log_area = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, height=20)  # Increased height
         self.log_area.grid(row=0, column=0, sticky="nsew")
         self.log_area.config(state=tk.DISABLED)
+        self.log_line_count = 0
 
         # --- Settings Notebook ---
         settings_notebook = ttk.Notebook(self)
@@ -303,6 +420,13 @@ class StockScannerApp(tk.Tk):
         recommended_button = ttk.Button(sector_tab, text="贸易战推荐板块", command=self.apply_recommended_sectors)
         recommended_button.pack(side=tk.BOTTOM, pady=10, fill=tk.X)
         
+        # --- Scan Stats Tab (per-stage timings, refreshed while scanning) ---
+        stats_tab = ttk.Frame(settings_notebook)
+        settings_notebook.add(stats_tab, text="Scan Stats")
+        self.stats_text = scrolledtext.ScrolledText(stats_tab, wrap=tk.NONE, height=8, font=("Courier", 9))
+        self.stats_text.pack(fill="both", expand=True)
+        self.stats_text.config(state=tk.DISABLED)
+
         # --- Other Settings Tab (placeholder for future settings) ---
         other_settings_tab = ttk.Frame(settings_notebook)
         settings_notebook.add(other_settings_tab, text="Other Settings")
@@ -438,8 +562,29 @@ class StockScannerApp(tk.Tk):
         self.stdout_redirector = StdoutRedirector(self.log_area)
         # sys.stdout = self.stdout_redirector # Commented out for now, use explicit logging
 
+        # --- Virtualized Views: rows live in TableModels, the Treeviews only show the visible window ---
+        self.results_view = VirtualTable(self.results_table, table_scrollbar)
+        self.filtered_view = VirtualTable(self.filtered_table, filtered_table_scrollbar)
+        self.overbought_view = VirtualTable(self.overbought_table, overbought_table_scrollbar)
+        self.filtered_overbought_view = VirtualTable(self.filtered_overbought_table, filtered_overbought_table_scrollbar)
+        self.table_views = [self.results_view, self.filtered_view, self.overbought_view, self.filtered_overbought_view]
+
+        # Queue message type -> table it adds a row to
+        self.row_tables = {
+            "add_row": self.results_view,
+            "add_filtered_row": self.filtered_view,
+            "add_overbought_row": self.overbought_view,
+            "add_filtered_overbought_row": self.filtered_overbought_view,
+        }
+
         # --- Start queue processor ---
-        self.after(100, self.process_queue)
+        self.after(QUEUE_POLL_MS, self.process_queue)
+
+        # --- Resume an interrupted scan ---
+        self.resume_from_journal()
+
+        # --- Load yfinance/akshare in the background once the window is up ---
+        self.after(WARM_UP_DELAY_MS, warm_up_imports)
 
     def toggle_sector_filters(self):
         """Show or hide sector checkboxes based on the 'Show All Sectors' option."""
@@ -486,13 +631,29 @@ class StockScannerApp(tk.Tk):
         self.log("2. 电力 - 基础设施，稳定增长")
         self.log("3. 创新药 - 高壁垒，进口替代")
 
+    def apply_table_filter(self):
+        """Shows only result rows whose ticker or sector contains the filter text."""
+        for view in self.table_views:
+            view.set_filter(self.table_filter_var.get())
+
     def log(self, message):
         """Appends a message to the log area."""
+        self._append_log([message])
+
+    def _append_log(self, lines):
+        """Appends many lines with a single insert, dropping the oldest beyond LOG_MAX_LINES."""
+        if not lines:
+            return
+        text = "\n".join(lines) + "\n"
         self.log_area.config(state=tk.NORMAL)
-        self.log_area.insert(tk.END, message + "\n")
+        self.log_area.insert(tk.END, text)
+        self.log_line_count += text.count("\n")
+        if self.log_line_count > LOG_MAX_LINES:
+            excess = self.log_line_count - LOG_MAX_LINES
+            self.log_area.delete("1.0", f"{excess + 1}.0")
+            self.log_line_count = LOG_MAX_LINES
         self.log_area.see(tk.END) # Scroll to the end
         self.log_area.config(state=tk.DISABLED)
-        self.update_idletasks() # Ensure GUI updates
 
     def start_scan_thread(self):
         """Starts the stock scanning process in a separate thread."""
@@ -513,148 +674,139 @@ class StockScannerApp(tk.Tk):
         self.scan_button.config(text="Scanning...", state=tk.DISABLED)
         self.pause_button.config(state=tk.NORMAL, text="Pause Scan")
         
+        # A finished scan is never resumed: Start Scan begins a new one
+        if self.journal.complete:
+            self.processed_tickers = set()
+
         # Clear tables only if starting a new scan (not resuming)
         if not self.processed_tickers:
-            for i in self.results_table.get_children():
-                self.results_table.delete(i)
-            for i in self.filtered_table.get_children():
-                self.filtered_table.delete(i)
-            for i in self.overbought_table.get_children():
-                self.overbought_table.delete(i)
-            for i in self.filtered_overbought_table.get_children():
-                self.filtered_overbought_table.delete(i)
+            for view in self.table_views:
+                view.clear()
             self.scan_results_data.clear()
+            self.journal.reset(self.selected_sectors)
+        else:
+            self.journal.set_sectors(self.selected_sectors)
 
         self.scan_thread = threading.Thread(target=self.run_scan, daemon=True)
         self.scan_thread.start()
+        self.refresh_stats_panel()
+
+    def refresh_stats_panel(self):
+        """Shows the current scan statistics in the "Scan Stats" tab while a scan runs."""
+        if self.stats_refresh_job is not None:
+            self.after_cancel(self.stats_refresh_job) # Keep a single refresh loop
+            self.stats_refresh_job = None
+        self.stats_text.config(state=tk.NORMAL)
+        self.stats_text.delete("1.0", tk.END)
+        self.stats_text.insert(tk.END, "\n".join(get_scan_stats().summary_lines()))
+        self.stats_text.config(state=tk.DISABLED)
+        if self.is_scanning:
+            self.stats_refresh_job = self.after(STATS_REFRESH_MS, self.refresh_stats_panel)
 
     def run_scan(self):
         """The actual scanning logic run in the background thread."""
         try:
-            sh_prefixes = [600, 601, 603, 688]
-            SHANGHAI_TICKERS = generate_specific_prefix_tickers(sh_prefixes, ".SS", range_len=1000)
-            sz_prefixes = [0, 1, 2, 3, 300]
-            SHENZHEN_TICKERS = generate_specific_prefix_tickers(sz_prefixes, ".SZ", range_len=1000)
-            TICKERS = SHANGHAI_TICKERS + SHENZHEN_TICKERS
+            universe = get_ticker_universe()
+            TICKERS = load_scan_tickers()
+            self.scan_queue.put(("log", f"Loaded {len(TICKERS)} live tickers (source: {universe.source}, {len(universe.dead)} known dead codes skipped)."))
 
             # Filter out already processed tickers
             TICKERS = [t for t in TICKERS if t not in self.processed_tickers]
-
-            self.scan_queue.put(("log", f"Generated {len(SHANGHAI_TICKERS)} Shanghai tickers."))
-            self.scan_queue.put(("log", f"Generated {len(SHENZHEN_TICKERS)} Shenzhen tickers."))
-            self.scan_queue.put(("log", f"Scanning {len(TICKERS)} remaining tickers..."))
-            self.scan_queue.put(("log", f"Looking for Daily RSI <= {OVERSOLD_THRESHOLD}..."))
-
-            processed_count = 0
-            found_count = 0
+            stats = get_scan_stats()
+            stats.reset(len(TICKERS))
+
+            # Route data-source circuit breaker events into the log
+            def log_source_event(message):
+                self.scan_queue.put(("log", message))
+            for guard in SOURCE_GUARDS.values():
+                guard.listeners = [log_source_event]
+
+            # Read Tk state once here; worker threads must not touch Tk variables
+            show_all_sectors = self.show_all_sectors_var.get()
+            selected_sectors = set(self.selected_sectors)
+
+            self.scan_queue.put(("log", f"Scanning {len(TICKERS)} remaining tickers with {MAX_WORKERS} workers..."))
+            # Rows are only emitted for Daily RSI <= OVERSOLD_THRESHOLD or > OVERBOUGHT_THRESHOLD,
+            # so Weekly/Monthly data is only fetched for the tickers that pass the Daily screen.
+            self.scan_queue.put(("log", f"Stage 1/2: screening Daily RSI (<= {OVERSOLD_THRESHOLD} or > {OVERBOUGHT_THRESHOLD})..."))
+            screened_count = 0
+            survivor_count = 0
             fetch_errors = 0
-
-            for ticker_symbol in TICKERS:
-                if not self.is_scanning:
-                     self.scan_queue.put(("log", "Scan cancelled."))
-                     break
-
-                # Handle pausing
-                while self.is_paused and self.is_scanning:
-                    time.sleep(0.1)  # Sleep briefly to prevent CPU hogging
-                    continue
-
-                processed_count += 1
-                self.processed_tickers.add(ticker_symbol)  # Track processed ticker
-
-                if processed_count % 50 == 0:
-                    progress_msg = f" Processed {processed_count}/{len(TICKERS)}... Found {found_count} signals. Errors: {fetch_errors}"
-                    self.scan_queue.put(("log", progress_msg))
-                
-                ticker_timeframe_results = {
-                    "Daily": {"rsi": None, "oversold": False},
-                    "Weekly": {"rsi": None, "oversold": False},
-                    "Monthly": {"rsi": None, "oversold": False}
-                }
-                data_fetch_failed_daily = False
-
-                for name in ["Daily", "Weekly", "Monthly"]:
-                    params = TIME_PERIODS[name]
-                    hist = fetch_stock_data(ticker_symbol, period=params["period"], interval=params["interval"])
-
-                    if hist is None or hist.empty:
-                        if name == "Daily": data_fetch_failed_daily = True
-                        continue
-                    
-                    if len(hist) < RSI_PERIOD:
-                        if name == "Daily": data_fetch_failed_daily = True
-                        continue
-
-                    hist.index = pd.to_datetime(hist.index)
-                    hist['Close'] = pd.to_numeric(hist['Close'], errors='coerce')
-                    hist.dropna(subset=['Close'], inplace=True)
-                    if hist.empty:
-                        if name == "Daily": data_fetch_failed_daily = True
-                        continue
-                    
-                    hist.ta.rsi(length=RSI_PERIOD, append=True)
-                    rsi_col = f'RSI_{RSI_PERIOD}'
-                    if rsi_col not in hist.columns or hist[rsi_col].isnull().all():
-                        if name == "Daily": data_fetch_failed_daily = True
+            checked_count = 0
+            found_count = 0
+            stage2_started = False
+
+            for event, ticker_symbol, result, error in run_staged_scan(
+                    TICKERS, selected_sectors, show_all_sectors, max_workers=MAX_WORKERS,
+                    should_stop=lambda: not self.is_scanning, is_paused=lambda: self.is_paused):
+                if event == "screened":
+                    screened_count += 1
+                    if screened_count % 50 == 0:
+                        self.scan_queue.put(("log", f" Stage 1: screened {screened_count}/{len(TICKERS)}... Survivors: {survivor_count}. Errors: {fetch_errors}"))
+                    if screened_count % 500 == 0:
+                        self.scan_queue.put(("log", " Sources: " + " | ".join(g.status() for g in SOURCE_GUARDS.values())))
+
+                    if error is not None:
+                        fetch_errors += 1
+                        self.processed_tickers.add(ticker_symbol)
+                        stats.advance()
+                        self.journal.record(ticker_symbol)
+                        self.scan_queue.put(("log", f"  Error processing {ticker_symbol}: {error}"))
                         continue
-                        
-                    hist.dropna(subset=[rsi_col], inplace=True)
-                    if hist.empty:
-                        if name == "Daily": data_fetch_failed_daily = True
+                    if result["fetch_error"]:
+                        fetch_errors += 1
+                    if result["no_data"] and not result["fetch_error"]:
+                        universe.mark_dead(ticker_symbol) # Every source answered without data
+                    if result["survivor"]:
+                        survivor_count += 1 # Marked processed once stage 2 is done
+                    else:
+                        self.processed_tickers.add(ticker_symbol)
+                        stats.advance()
+                        self.journal.record(ticker_symbol)
+
+                elif event == "stage2":
+                    stage2_started = True
+                    self.scan_queue.put(("log", f"Stage 1 done: screened {screened_count}/{len(TICKERS)}, "
+                                                f"{survivor_count} survivors, {fetch_errors} errors."))
+                    self.scan_queue.put(("log", f"Stage 2/2: checking Weekly/Monthly for {survivor_count} survivors..."))
+
+                elif event == "checked":
+                    checked_count += 1
+                    self.processed_tickers.add(ticker_symbol)  # Track processed ticker
+                    stats.advance()
+                    if checked_count % 50 == 0:
+                        self.scan_queue.put(("log", f" Stage 2: checked {checked_count}/{survivor_count}... Found {found_count} oversold signals."))
+
+                    if error is not None:
+                        self.journal.record(ticker_symbol)
+                        self.scan_queue.put(("log", f"  Error processing {ticker_symbol}: {error}"))
                         continue
+                    self.journal.record(ticker_symbol, result["rows"])
+                    if result["oversold"]:
+                        found_count += 1
+                    for line in result["log"]:
+                        self.scan_queue.put(("log", line))
+                    for key, row in result["rows"].items():
+                        self.scan_queue.put((ROW_MESSAGE_TYPES[key], row))
+
+            if stage2_started:
+                self.scan_queue.put(("log", f"Stage 2 done: checked {checked_count}/{survivor_count} survivors, "
+                                            f"found {found_count} oversold signals."))
+            else:
+                self.scan_queue.put(("log", f"Stage 1 done: screened {screened_count}/{len(TICKERS)}, "
+                                            f"{survivor_count} survivors, {fetch_errors} errors."))
 
-                    latest_rsi = hist[rsi_col].iloc[-1]
-                    ticker_timeframe_results[name]["rsi"] = latest_rsi
-                    ticker_timeframe_results[name]["oversold"] = latest_rsi <= OVERSOLD_THRESHOLD
-                
-                if data_fetch_failed_daily or ticker_timeframe_results["Daily"]["rsi"] is None:
-                    continue
-
-                if ticker_timeframe_results["Daily"]["oversold"]:
-                    found_count += 1
-                    self.scan_queue.put(("log", f"  -> Found signal: {ticker_symbol}"))
-                    
-                    # Prepare payload for immediate table update
-                    ticker_data = yf.Ticker(ticker_symbol)
-                    info = ticker_data.info
-                    market_cap = info.get('marketCap', 0)
-                    market_cap_billion = market_cap / 100000000
-                    earnings_growth = info.get('earningsGrowth', 0)
-                    sector = info.get('sector', '')
-                    
-                    row_data = {
-                        "ticker": ticker_symbol,
-                        "daily": ticker_timeframe_results["Daily"]["oversold"],
-                        "weekly": ticker_timeframe_results["Weekly"]["oversold"],
-                        "monthly": ticker_timeframe_results["Monthly"]["oversold"],
-                        "market_cap": market_cap_billion,
-                        "earnings_growth": earnings_growth,
-                        "sector": sector
-                    }
-                    # Put 'add_row' message onto the queue
-                    self.scan_queue.put(("add_row", row_data))
-
-                    # Check if the stock meets the filter criteria
-                    show_all_sectors = self.show_all_sectors_var.get()
-                    if filter_stock_by_market_cap_and_earnings(ticker_data, self.selected_sectors, show_all_sectors):
-                        self.scan_queue.put(("add_filtered_row", row_data))
-
-                # Check for overbought conditions
-                if ticker_timeframe_results["Daily"]["rsi"] > OVERBOUGHT_THRESHOLD:
-                    self.scan_queue.put(("log", f"  -> Found overbought signal: {ticker_symbol}"))
-                    row_data = {
-                        "ticker": ticker_symbol,
-                        "daily": ticker_timeframe_results["Daily"]["rsi"] > OVERBOUGHT_THRESHOLD,
-                        "weekly": ticker_timeframe_results["Weekly"]["rsi"] > OVERBOUGHT_THRESHOLD,
-                        "monthly": ticker_timeframe_results["Monthly"]["rsi"] > OVERBOUGHT_THRESHOLD,
-                        "market_cap": market_cap_billion,
-                        "earnings_growth": earnings_growth,
-                        "sector": sector
-                    }
-                    self.scan_queue.put(("add_overbought_row", row_data))
-                    show_all_sectors = self.show_all_sectors_var.get()
-                    if filter_stock_by_market_cap_and_earnings(ticker_data, self.selected_sectors, show_all_sectors):
-                        self.scan_queue.put(("add_filtered_overbought_row", row_data))
+            if not self.is_scanning:
+                self.scan_queue.put(("log", "Scan cancelled."))
+            else:
+                self.journal.mark_complete() # The next launch starts a fresh scan
+            universe.save_dead()
+            get_fundamentals_store().save()
+            self.scan_queue.put(("log", f"Scan stats saved to {stats.dump(SCAN_STATS_PATH)}"))
+            if BUILD_TRIGGER_INDEX and self.is_scanning:
+                index = update_trigger_index(load_scan_tickers(), max_workers=MAX_WORKERS)
+                if index is not None:
+                    self.scan_queue.put(("log", f"Trigger index updated for {len(index.tables['Daily'])} tickers."))
 
             # --- Scan Finished --- 
             self.scan_queue.put(("scan_complete", None)) 
@@ -666,131 +818,51 @@ class StockScannerApp(tk.Tk):
             self.scan_queue.put(("scan_complete", None))
 
     def process_queue(self):
-        """Processes messages from the background thread."""
+        """
+        Processes messages from the background thread. Each tick drains the queue
+        for at most QUEUE_TICK_BUDGET_MS, then writes all log lines with one insert
+        and all new rows table by table.
+        """
+        log_lines = []
+        new_rows = {msg_type: [] for msg_type in self.row_tables}
+        scan_complete = False
+        deadline = time.monotonic() + QUEUE_TICK_BUDGET_MS / 1000
         try:
-            while True:
-                message = self.scan_queue.get_nowait()
-                msg_type = message[0]
-                payload = message[1]
-
+            while time.monotonic() < deadline:
+                msg_type, payload = self.scan_queue.get_nowait()
                 if msg_type == "log":
-                    self.log(payload)
-                    
-                elif msg_type == "add_row":
-                    # Handle inserting a single row into the table
-                    try:
-                        if payload and isinstance(payload, dict):
-                             ticker = payload.get("ticker")
-                             if ticker and not self.results_table.exists(ticker): # Check if ticker ID already exists
-                                 daily_status = "Yes" if payload.get("daily", False) else "No"
-                                 weekly_status = "Yes" if payload.get("weekly", False) else "No"
-                                 monthly_status = "Yes" if payload.get("monthly", False) else "No"
-                                 market_cap = payload.get("market_cap", 0)
-                                 earnings_growth = payload.get("earnings_growth", 0)
-                                 sector = payload.get("sector", "")
-                                 values_tuple = (ticker, daily_status, weekly_status, monthly_status, market_cap, earnings_growth, sector)
-                                 self.log(f"    Adding row: {values_tuple}")
-                                 self.results_table.insert("", tk.END, iid=ticker, values=values_tuple)
-                             elif ticker and self.results_table.exists(ticker):
-                                 self.log(f"    Skipping duplicate ticker: {ticker}")
-                        else:
-                            self.log(f"Warning: Received invalid payload for add_row: {payload}")
-                    except Exception as e_add_row:
-                        self.log(f"*** ERROR adding row: {e_add_row} ***")
-                        self.log(f"    Payload was: {payload}")
-                        import traceback
-                        self.log(traceback.format_exc())
-
-                elif msg_type == "add_filtered_row":
-                    # Handle inserting a single row into the filtered table
-                    try:
-                        if payload and isinstance(payload, dict):
-                             ticker = payload.get("ticker")
-                             if ticker and not self.filtered_table.exists(ticker): # Check if ticker ID already exists
-                                 daily_status = "Yes" if payload.get("daily", False) else "No"
-                                 weekly_status = "Yes" if payload.get("weekly", False) else "No"
-                                 monthly_status = "Yes" if payload.get("monthly", False) else "No"
-                                 market_cap = payload.get("market_cap", 0)
-                                 earnings_growth = payload.get("earnings_growth", 0)
-                                 sector = payload.get("sector", "")
-                                 values_tuple = (ticker, daily_status, weekly_status, monthly_status, market_cap, earnings_growth, sector)
-                                 self.log(f"    Adding filtered row: {values_tuple}")
-                                 self.filtered_table.insert("", tk.END, iid=ticker, values=values_tuple)
-                             elif ticker and self.filtered_table.exists(ticker):
-                                 self.log(f"    Skipping duplicate filtered ticker: {ticker}")
-                        else:
-                            self.log(f"Warning: Received invalid payload for add_filtered_row: {payload}")
-                    except Exception as e_add_filtered_row:
-                        self.log(f"*** ERROR adding filtered row: {e_add_filtered_row} ***")
-                        self.log(f"    Payload was: {payload}")
-                        import traceback
-                        self.log(traceback.format_exc())
-
-                elif msg_type == "add_overbought_row":
-                    # Handle inserting a single row into the overbought table
-                    try:
-                        if payload and isinstance(payload, dict):
-                             ticker = payload.get("ticker")
-                             if ticker and not self.overbought_table.exists(ticker): # Check if ticker ID already exists
-                                 daily_status = "Yes" if payload.get("daily", False) else "No"
-                                 weekly_status = "Yes" if payload.get("weekly", False) else "No"
-                                 monthly_status = "Yes" if payload.get("monthly", False) else "No"
-                                 market_cap = payload.get("market_cap", 0)
-                                 earnings_growth = payload.get("earnings_growth", 0)
-                                 sector = payload.get("sector", "")
-                                 values_tuple = (ticker, daily_status, weekly_status, monthly_status, market_cap, earnings_growth, sector)
-                                 self.log(f"    Adding overbought row: {values_tuple}")
-                                 self.overbought_table.insert("", tk.END, iid=ticker, values=values_tuple)
-                             elif ticker and self.overbought_table.exists(ticker):
-                                 self.log(f"    Skipping duplicate overbought ticker: {ticker}")
-                        else:
-                            self.log(f"Warning: Received invalid payload for add_overbought_row: {payload}")
-                    except Exception as e_add_overbought_row:
-                        self.log(f"*** ERROR adding overbought row: {e_add_overbought_row} ***")
-                        self.log(f"    Payload was: {payload}")
-                        import traceback
-                        self.log(traceback.format_exc())
-
-                elif msg_type == "add_filtered_overbought_row":
-                    # Handle inserting a single row into the filtered overbought table
-                    try:
-                        if payload and isinstance(payload, dict):
-                             ticker = payload.get("ticker")
-                             if ticker and not self.filtered_overbought_table.exists(ticker): # Check if ticker ID already exists
-                                 daily_status = "Yes" if payload.get("daily", False) else "No"
-                                 weekly_status = "Yes" if payload.get("weekly", False) else "No"
-                                 monthly_status = "Yes" if payload.get("monthly", False) else "No"
-                                 market_cap = payload.get("market_cap", 0)
-                                 earnings_growth = payload.get("earnings_growth", 0)
-                                 sector = payload.get("sector", "")
-                                 values_tuple = (ticker, daily_status, weekly_status, monthly_status, market_cap, earnings_growth, sector)
-                                 self.log(f"    Adding filtered overbought row: {values_tuple}")
-                                 self.filtered_overbought_table.insert("", tk.END, iid=ticker, values=values_tuple)
-                             elif ticker and self.filtered_overbought_table.exists(ticker):
-                                 self.log(f"    Skipping duplicate filtered overbought ticker: {ticker}")
-                        else:
-                            self.log(f"Warning: Received invalid payload for add_filtered_overbought_row: {payload}")
-                    except Exception as e_add_filtered_overbought_row:
-                        self.log(f"*** ERROR adding filtered overbought row: {e_add_filtered_overbought_row} ***")
-                        self.log(f"    Payload was: {payload}")
-                        import traceback
-                        self.log(traceback.format_exc())
-
+                    log_lines.append(payload)
+                elif msg_type in new_rows:
+                    if payload and isinstance(payload, dict) and payload.get("ticker"):
+                        new_rows[msg_type].append(payload)
+                    else:
+                        log_lines.append(f"Warning: Received invalid payload for {msg_type}: {payload}")
                 elif msg_type == "scan_complete":
-                    self.log("Received scan_complete message.") 
-                    self.is_scanning = False
-                    self.is_paused = False
-                    self.scan_button.config(text="Start Scan", state=tk.NORMAL)
-                    self.pause_button.config(state=tk.DISABLED, text="Pause Scan")
-                    self.log("\n--- Scan Complete --- Final table state shown.")
-                    
-                    final_count = len(self.results_table.get_children())
-                    self.log(f"Total signals in table: {final_count}")
-                    
+                    scan_complete = True
+                    break # Flush everything queued before it first
         except queue.Empty:
-            pass # No messages in queue
+            pass # No more messages in queue
+
+        try:
+            for msg_type, rows in new_rows.items():
+                if rows:
+                    self.row_tables[msg_type].add_rows(rows) # Duplicate tickers are skipped
+            self._append_log(log_lines)
+            if scan_complete:
+                self.log("Received scan_complete message.") 
+                self.is_scanning = False
+                self.is_paused = False
+                self.scan_button.config(text="Start Scan", state=tk.NORMAL)
+                self.pause_button.config(state=tk.DISABLED, text="Pause Scan")
+                self.log("\n--- Scan Complete --- Final table state shown.")
+                self.refresh_stats_panel()
+                
+                final_count = len(self.results_view)
+                self.log(f"Total signals in table: {final_count}")
         finally:
-            self.after(100, self.process_queue) # Reschedule
+            # Come straight back if the budget ran out with messages still waiting
+            backlog = not self.scan_queue.empty()
+            self.after(1 if backlog else QUEUE_POLL_MS, self.process_queue) # Reschedule
 
     def save_progress(self):
         """Save the current mining progress to a file."""
@@ -806,10 +878,10 @@ class StockScannerApp(tk.Tk):
             # Collect data from all tables
             data = {
                 "processed_tickers": list(self.processed_tickers),
-                "oversold_signals": self._get_table_data(self.results_table),
-                "filtered_oversold_signals": self._get_table_data(self.filtered_table),
-                "overbought_signals": self._get_table_data(self.overbought_table),
-                "filtered_overbought_signals": self._get_table_data(self.filtered_overbought_table),
+                "oversold_signals": self.results_view.model.records(),
+                "filtered_oversold_signals": self.filtered_view.model.records(),
+                "overbought_signals": self.overbought_view.model.records(),
+                "filtered_overbought_signals": self.filtered_overbought_view.model.records(),
                 "selected_sectors": list(self.selected_sectors)
             }
 
@@ -836,25 +908,8 @@ class StockScannerApp(tk.Tk):
             with open(file_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
 
-            # Clear existing tables
-            for table in [self.results_table, self.filtered_table, 
-                         self.overbought_table, self.filtered_overbought_table]:
-                for item in table.get_children():
-                    table.delete(item)
-
-            # Restore processed tickers
-            self.processed_tickers = set(data.get("processed_tickers", []))
-
-            # Restore selected sectors
-            self.selected_sectors = set(data.get("selected_sectors", []))
-            for sector_key, var in self.sector_vars.items():
-                var.set(sector_key in self.selected_sectors)
-
-            # Restore table data
-            self._restore_table_data(self.results_table, data.get("oversold_signals", []))
-            self._restore_table_data(self.filtered_table, data.get("filtered_oversold_signals", []))
-            self._restore_table_data(self.overbought_table, data.get("overbought_signals", []))
-            self._restore_table_data(self.filtered_overbought_table, data.get("filtered_overbought_signals", []))
+            self._apply_progress(data)
+            self.journal.replace(data) # Continue journaling from the loaded state
 
             self.log(f"Progress loaded from {file_path}")
             self.log(f"Loaded {len(self.processed_tickers)} processed tickers")
@@ -864,35 +919,35 @@ class StockScannerApp(tk.Tk):
             import traceback
             self.log(traceback.format_exc())
 
-    def _get_table_data(self, table):
-        """Extract data from a table widget."""
-        data = []
-        for item in table.get_children():
-            values = table.item(item)['values']
-            data.append({
-                'ticker': values[0],
-                'daily': values[1] == "Yes",
-                'weekly': values[2] == "Yes",
-                'monthly': values[3] == "Yes",
-                'market_cap': float(values[4]) if values[4] else 0,
-                'earnings_growth': float(values[5]) if values[5] else 0,
-                'sector': values[6] if len(values) > 6 else ""
-            })
-        return data
-
-    def _restore_table_data(self, table, data):
-        """Restore data to a table widget."""
-        for item in data:
-            values = (
-                item['ticker'],
-                "Yes" if item['daily'] else "No",
-                "Yes" if item['weekly'] else "No",
-                "Yes" if item['monthly'] else "No",
-                item['market_cap'],
-                item['earnings_growth'],
-                item.get('sector', '')
-            )
-            table.insert("", tk.END, iid=item['ticker'], values=values)
+    def _apply_progress(self, data):
+        """Restores processed tickers, selected sectors and the tables from a save_progress dict."""
+        # Restore processed tickers
+        self.processed_tickers = set(data.get("processed_tickers", []))
+
+        # Restore selected sectors
+        self.selected_sectors = set(data.get("selected_sectors", []))
+        for sector_key, var in self.sector_vars.items():
+            var.set(sector_key in self.selected_sectors)
+
+        # Restore table data
+        self.results_view.load(data.get("oversold_signals", []))
+        self.filtered_view.load(data.get("filtered_oversold_signals", []))
+        self.overbought_view.load(data.get("overbought_signals", []))
+        self.filtered_overbought_view.load(data.get("filtered_overbought_signals", []))
+
+    def resume_from_journal(self):
+        """Restores the progress of the last (possibly interrupted) scan from the journal."""
+        try:
+            data = self.journal.load()
+        except Exception as e:
+            self.log(f"Error reading progress journal: {e}")
+            return
+        if self.journal.complete:
+            self.log("The last scan finished; Start Scan begins a new scan.")
+        elif data["processed_tickers"]:
+            self._apply_progress(data)
+            self.log(f"Resumed {len(self.processed_tickers)} processed tickers from {PROGRESS_JOURNAL_PATH}. "
+                     f"Start Scan continues where it stopped.")
 
     def toggle_pause(self):
         """Toggle between pause and resume states."""
@@ -922,54 +977,6 @@ class StdoutRedirector:
         pass # Required for file-like object
 
 
-def filter_stock_by_market_cap_and_earnings(ticker_data, selected_sectors=None, show_all_sectors=False):
-    """
-    Filter stocks based on market cap (100-300亿), earnings growth, and sector.
-    Returns True if the stock meets the criteria, False otherwise.
-    
-    Args:
-        ticker_data: yfinance Ticker object
-        selected_sectors: Set of selected sector keys
-        show_all_sectors: Boolean indicating whether to show all sectors without filtering
-    """
-    try:
-        info = ticker_data.info
-        market_cap = info.get('marketCap', 0)
-        # Convert market cap to 亿 (100 million)
-        market_cap_billion = market_cap / 100000000
-        if not (100 <= market_cap_billion <= 300):
-            return False
-        # Check for earnings growth (assuming 'earningsGrowth' is available)
-        earnings_growth = info.get('earningsGrowth', 0)
-        if earnings_growth <= 0:
-            return False
-            
-        # Skip sector filtering if show_all_sectors is True
-        if show_all_sectors:
-            return True
-            
-        # Check sector if sectors are selected
-        if selected_sectors:
-            sector = info.get('sector', '').lower()
-            # Map sector to yfinance sector key
-            sector_mapping = {
-                'consumer cyclical': 'consumer-cyclical',
-                'consumer defensive': 'consumer-defensive',
-                'financial services': 'financial-services',
-                'communication services': 'communication-services',
-                'basic materials': 'basic-materials',
-                'real estate': 'real-estate'
-            }
-            sector_key = sector_mapping.get(sector, sector.replace(' ', '-'))
-            if sector_key not in selected_sectors:
-                return False
-                
-        return True
-    except Exception as e:
-        print(f"Error filtering stock: {e}")
-        return False
-
-
 # --- Main Execution ---
 if __name__ == "__main__":
     # It might be necessary to adjust main_china.py to prevent
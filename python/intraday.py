@@ -0,0 +1,234 @@
+import csv
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import main_china
+from main_china import (
+    get_ticker_universe, load_scan_tickers, configure_data_sources, get_rsi_state_store, load_daily_closes,
+    SOURCE_GUARDS, RSI_PERIOD, OVERSOLD_THRESHOLD, OVERBOUGHT_THRESHOLD, MAX_WORKERS, TRIGGER_INDEX_PATH
+)
+from fetch_engine import run_concurrent
+from rsi_engine import new_state, advance_state, provisional_rsi
+from rsi_state import ADJUSTMENT_TOLERANCE
+from trading_calendar import provisional_session_day, next_session_day
+from trigger_index import TriggerIndex
+from universe import code_to_ticker
+
+# --- Intraday Daily RSI Refresh ---
+# During the session only today's last price changes, so instead of fetching
+# every history again this takes one whole-market spot snapshot (one akshare
+# call, or a local file standing in for it) and applies each price as the
+# provisional bar on top of the Daily bars that are already on disk (the OHLCV
+# cache, or the --replay snapshot). Nothing is downloaded per ticker.
+#
+# Per ticker, the stored RSI state (rsi_state.sqlite) is reused when it matches
+# the cached bars, so only the few bars after it are read. All tickers are then
+# advanced and evaluated together: one pass over a (dates x tickers) matrix and
+# one provisional_rsi() call for the whole market.
+#
+# When the trigger index of the last scan (cache/rsi_triggers.json) is for the
+# same session (a scan after the close builds it for the next one), the snapshot is first compared against its trigger prices and
+# only the tickers that cross a threshold (plus any the index does not cover)
+# are recomputed. --full, or --csv, recomputes every ticker.
+#
+#   python python/intraday.py
+#   python python/intraday.py --spot-file spot.csv --csv intraday.csv
+
+SPOT_CODE_COLUMNS = ("代码", "code", "ticker", "symbol")
+SPOT_PRICE_COLUMNS = ("最新价", "price", "last", "close")
+TRIGGER_TOLERANCE = 1e-6 # Relative slack on the index probe; the candidates' RSI is recomputed exactly
+
+
+# --- Spot Snapshot ---
+def parse_spot_frame(frame):
+    """
+    Converts a spot table to a Series of last prices indexed by ticker.
+    Accepts akshare's stock_zh_a_spot_em() columns (代码, 最新价) or code/ticker and price columns.
+    Rows without a positive price (suspended stocks) are dropped.
+    """
+    code_column = next((c for c in SPOT_CODE_COLUMNS if c in frame.columns), None)
+    price_column = next((c for c in SPOT_PRICE_COLUMNS if c in frame.columns), None)
+    if code_column is None or price_column is None:
+        raise ValueError(f"Spot snapshot needs a code column {SPOT_CODE_COLUMNS} and a price column {SPOT_PRICE_COLUMNS}")
+    tickers = frame[code_column].map(code_to_ticker)
+    prices = pd.to_numeric(frame[price_column], errors='coerce')
+    spot = pd.Series(prices.to_numpy(dtype=float), index=tickers.to_numpy())
+    spot = spot[spot.index.notna() & (spot > 0)]
+    return spot[~spot.index.duplicated(keep='last')]
+
+
+def fetch_spot_snapshot():
+    """Downloads the spot quotes of every A-share in one akshare request."""
+    import akshare as ak
+    return parse_spot_frame(SOURCE_GUARDS["akshare"].call(ak.stock_zh_a_spot_em))
+
+
+def load_spot_file(path):
+    """Loads a spot snapshot from a CSV file or a JSON {ticker or code: price} file."""
+    if path.lower().endswith(".json"):
+        with open(path, 'r', encoding='utf-8') as f:
+            quotes = json.load(f)
+        frame = pd.DataFrame({"code": list(quotes), "price": list(quotes.values())})
+    else:
+        frame = pd.read_csv(path, dtype=str)
+    return parse_spot_frame(frame)
+
+
+# --- Committed Daily Bars ---
+def committed_state(ticker_symbol, session_day, length=RSI_PERIOD):
+    """
+    Returns (state, closes) for one ticker: a 1-element RSI state and the closes
+    before `session_day` it still has to be advanced by. The stored state is used
+    when its last close matches the cached bar; otherwise the full history is used.
+    """
+    session_day = pd.Timestamp(session_day)
+    if main_china.USE_RSI_STATE:
+        state, last_ts = get_rsi_state_store().get(ticker_symbol, "Daily", length)
+        if state is not None:
+            closes = load_daily_closes(ticker_symbol, start=last_ts)
+            stored_close = state["last_close"][0]
+            if (len(closes) and closes.index[0] == last_ts
+                    and abs(closes.iloc[0] - stored_close) <= ADJUSTMENT_TOLERANCE * abs(stored_close)):
+                tail = closes.iloc[1:]
+                return state, tail[tail.index < session_day]
+    closes = load_daily_closes(ticker_symbol)
+    return new_state(1), closes[closes.index < session_day]
+
+
+def intraday_daily_rsi(spot, tickers=None, session_day=None, length=RSI_PERIOD, max_workers=MAX_WORKERS):
+    """
+    Computes the Daily RSI of every ticker with `spot` as today's provisional close.
+
+    Args:
+        spot: Series of last prices indexed by ticker
+        tickers: Tickers to evaluate (default: every ticker in the snapshot)
+        session_day: Date of the provisional bar (default: provisional_session_day())
+    Returns:
+        (results, missing): DataFrame indexed by ticker with price, prev_close and
+        rsi columns, and the tickers without enough bars on disk
+    """
+    session_day = pd.Timestamp(session_day or provisional_session_day())
+    tickers = [t for t in (tickers if tickers is not None else spot.index) if t in spot.index]
+
+    states, tails = {}, {}
+    for ticker_symbol, result, error in run_concurrent(
+            tickers, lambda t: committed_state(t, session_day, length), max_workers=max_workers):
+        if error is None:
+            states[ticker_symbol], tails[ticker_symbol] = result
+
+    order = [t for t in tickers if t in states]
+    stacked = {key: np.concatenate([states[t][key] for t in order]) if order else new_state(0)[key]
+               for key in new_state(0)}
+    frame = pd.DataFrame({t: tails[t] for t in order if len(tails[t])})
+    if not frame.empty:
+        closes = frame.sort_index().reindex(columns=order).to_numpy(dtype=float)
+        _, stacked = advance_state(stacked, closes, length) # One pass for the whole market
+
+    prices = spot.reindex(order).to_numpy(dtype=float)
+    rsi = provisional_rsi(stacked, prices, length)
+    results = pd.DataFrame({"price": prices, "prev_close": stacked["last_close"], "rsi": rsi},
+                           index=pd.Index(order, name="ticker"))
+    missing = sorted(set(tickers) - set(results.index[results["rsi"].notna()]))
+    return results.dropna(subset=["rsi"]), missing
+
+
+def load_current_trigger_index(session_day):
+    """Returns the saved trigger index if it was built for `session_day`, else None."""
+    index = TriggerIndex.load(TRIGGER_INDEX_PATH)
+    if index is None:
+        return None
+    if index.is_current(session_day):
+        return index
+    if index.is_current(next_session_day()):
+        print(f"Trigger index is for the next session ({index.session_day.date()}), which has not opened yet; "
+              f"recomputing every ticker")
+    else:
+        print(f"Trigger index is for {index.session_day.date()}, not {pd.Timestamp(session_day).date()}; "
+              f"recomputing every ticker (a scan rebuilds it)")
+    return None
+
+
+def run_intraday_refresh(spot_file=None, csv_output=None, max_workers=MAX_WORKERS, full=False):
+    """
+    Takes a spot snapshot, recomputes Daily RSI for the live universe and prints the signals. Returns an exit code.
+
+    Args:
+        full: Recompute every ticker instead of only the trigger index crossers
+    """
+    started = time.perf_counter()
+    spot = load_spot_file(spot_file) if spot_file else fetch_spot_snapshot()
+    print(f"Spot snapshot: {len(spot)} quotes ({'file ' + spot_file if spot_file else 'akshare'}) "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    universe = get_ticker_universe()
+    tickers = load_scan_tickers()
+    session_day = provisional_session_day()
+    index = None if full or csv_output else load_current_trigger_index(session_day)
+    candidates = tickers
+    if index is not None:
+        quoted = spot[spot.index.isin(tickers)]
+        oversold, overbought = index.crossers(quoted, tolerance=TRIGGER_TOLERANCE)
+        uncovered = [t for t in quoted.index if t not in index.tables["Daily"].index]
+        candidates = sorted(set(oversold) | set(overbought) | set(uncovered))
+        print(f"Trigger index: {len(oversold) + len(overbought)} of {len(quoted)} quotes cross a threshold, "
+              f"{len(uncovered)} not indexed")
+
+    computed = time.perf_counter()
+    results, missing = intraday_daily_rsi(spot, candidates, session_day=session_day, max_workers=max_workers)
+    no_quote = len(set(tickers) - set(spot.index))
+    print(f"Daily RSI for {len(results)} tickers in {time.perf_counter() - computed:.1f}s "
+          f"({no_quote} without a quote, {len(missing)} without enough bars on disk; a full scan fills the cache)")
+
+    # Weekly/Monthly flags: the spot price is also the close of the forming week and month
+    flags = {}
+    if index is not None:
+        for timeframe in ("Weekly", "Monthly"):
+            for side, crossed in zip(("oversold", "overbought"), index.crossers(spot, timeframe)):
+                for ticker_symbol in crossed:
+                    flags.setdefault((ticker_symbol, side), []).append(timeframe)
+
+    oversold = results[results["rsi"] <= OVERSOLD_THRESHOLD].sort_values("rsi")
+    overbought = results[results["rsi"] > OVERBOUGHT_THRESHOLD].sort_values("rsi", ascending=False)
+    for side, title, rows in (("oversold", f"Oversold (Daily RSI <= {OVERSOLD_THRESHOLD})", oversold),
+                              ("overbought", f"Overbought (Daily RSI > {OVERBOUGHT_THRESHOLD})", overbought)):
+        print(f"\n{title}: {len(rows)}")
+        for ticker_symbol, row in rows.iterrows():
+            also = flags.get((ticker_symbol, side))
+            print(f"- {ticker_symbol}: RSI {row['rsi']:.2f}, price {row['price']:.2f} (prev close {row['prev_close']:.2f})"
+                  + (f", also {side} {'/'.join(also)}" if also else ""))
+
+    if csv_output:
+        with open(csv_output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["ticker", "price", "prev_close", "rsi"])
+            for ticker_symbol, row in results.sort_index().iterrows():
+                writer.writerow([ticker_symbol, row["price"], row["prev_close"], round(row["rsi"], 4)])
+        print(f"\nResults written to {csv_output}")
+    print(f"\nIntraday refresh done in {time.perf_counter() - started:.1f}s "
+          f"(universe source: {universe.source}).")
+    return 0
+
+
+# --- Guard for Direct Execution ---
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Intraday Daily RSI refresh from one whole-market spot snapshot.")
+    parser.add_argument("--spot-file", help="Read the spot snapshot from a CSV/JSON file instead of akshare")
+    parser.add_argument("--csv", help="Also write every ticker's price and Daily RSI as CSV")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Threads reading cached bars")
+    parser.add_argument("--universe-file", help="Load the listed-symbol snapshot from a local CSV/TXT/JSON file")
+    parser.add_argument("--replay", metavar="DIR", help="Read Daily bars from a recorded local snapshot instead of the cache")
+    parser.add_argument("--full", action="store_true", help="Recompute every ticker instead of probing the trigger index")
+    args = parser.parse_args()
+
+    if args.replay:
+        configure_data_sources("replay", local_dir=args.replay)
+        main_china.USE_OHLCV_CACHE = False # Replays read straight from the snapshot
+    if args.universe_file:
+        print(f"Loaded {len(get_ticker_universe().load_file(args.universe_file))} tickers from {args.universe_file}")
+    sys.exit(run_intraday_refresh(spot_file=args.spot_file, csv_output=args.csv, max_workers=args.workers,
+                                  full=args.full))
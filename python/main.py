@@ -21,11 +21,36 @@ TICKERS = [
 
 RSI_PERIOD = 14
 OVERSOLD_THRESHOLD = 30
+# Shortest yfinance periods holding the ~108 bars a 14-period RSI needs to converge (see main_china.history_period)
 TIME_PERIODS = {
-    "Daily": {"interval": "1d", "period": "1y"},
+    "Daily": {"interval": "1d", "period": "6mo"},
     "Weekly": {"interval": "1wk", "period": "5y"},
-    "Monthly": {"interval": "1mo", "period": "max"} # Use max available for monthly
+    "Monthly": {"interval": "1mo", "period": "10y"}
 }
+BATCH_SIZE = 50 # Tickers per yf.download request
+
+# --- Batched Download ---
+def download_histories(tickers, period, interval):
+    """Downloads many tickers per request with yf.download. Returns {ticker: DataFrame}."""
+    histories = {}
+    for i in range(0, len(tickers), BATCH_SIZE):
+        batch = tickers[i:i + BATCH_SIZE]
+        try:
+            data = yf.download(batch, period=period, interval=interval, group_by="ticker",
+                               auto_adjust=True, threads=False, progress=False)
+        except Exception as e:
+            print(f"  Batch download failed for {len(batch)} tickers ({interval}): {e}")
+            continue
+        if data is None or data.empty:
+            continue
+        if not isinstance(data.columns, pd.MultiIndex):
+            data = pd.concat({batch[0]: data}, axis=1) # Single-ticker response
+        for ticker_symbol in batch:
+            if ticker_symbol in data.columns.get_level_values(0):
+                hist = data[ticker_symbol].dropna(how="all")
+                if not hist.empty:
+                    histories[ticker_symbol] = hist
+    return histories
 
 # List to store stocks that meet the criteria
 oversold_stocks = []
@@ -33,6 +58,10 @@ oversold_stocks = []
 # --- Main Logic ---
 print(f"Scanning {len(TICKERS)} tickers...")
 
+# Download each timeframe for all tickers in a few batched requests
+batched_histories = {name: download_histories(TICKERS, params["period"], params["interval"])
+                     for name, params in TIME_PERIODS.items()}
+
 for ticker_symbol in TICKERS:
     print(f" Checking {ticker_symbol}...")
     try:
@@ -40,8 +69,10 @@ for ticker_symbol in TICKERS:
         is_oversold_all = True # Assume oversold on all timeframes initially
 
         for name, params in TIME_PERIODS.items():
-            # Fetch historical data
-            hist = ticker_data.history(period=params["period"], interval=params["interval"])
+            # Use the batched download; fall back to a per-symbol request if the ticker was missing
+            hist = batched_histories[name].get(ticker_symbol)
+            if hist is None:
+                hist = ticker_data.history(period=params["period"], interval=params["interval"])
 
             if hist.empty:
                 print(f"  Could not fetch {name} data for {ticker_symbol}. Skipping timeframe.")
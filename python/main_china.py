@@ -1,10 +1,23 @@
-import yfinance as yf
-import pandas_ta as ta
 import pandas as pd
-import matplotlib.pyplot as plt
-import time
-import akshare as ak # Import akshare
-from datetime import datetime
+import math
+import os
+import threading
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from fetch_engine import SourceGuard, run_concurrent_batches
+from ohlcv_cache import OHLCVCache
+from universe import TickerUniverse
+from rsi_engine import add_rsi_column, warmup_bars
+from rsi_state import RSIStateStore
+from fundamentals import FundamentalsStore
+from rsi_plots import trim_for_plot, render_rsi_plot
+from scan_stats import ScanStats
+from trigger_index import TriggerIndex
+from trading_calendar import next_session_day, refresh_trade_calendar
+from data_sources import (
+    period_start, YFinanceSource, AkshareSource, LocalFileSource, RecordingSource
+)
 
 # --- Configuration ---
 # Generate potential Chinese stock tickers based on known prefixes
@@ -33,264 +46,763 @@ def generate_specific_prefix_tickers(prefixes, suffix, range_len=1000):
              all_tickers.append(f"{i:06d}{suffix}")
     return all_tickers
 
-# Shanghai Stock Exchange (.SS)
-sh_prefixes = [600, 601, 603, 688]
-SHANGHAI_TICKERS = generate_specific_prefix_tickers(sh_prefixes, ".SS", range_len=1000) # Generate 1000 tickers for each prefix
-
-# Shenzhen Stock Exchange (.SZ)
-sz_prefixes = [0, 1, 2, 3, 300] # 0 maps to 000xxx, 1 to 001xxx, etc. 300 maps to 300xxx
-# Adjust range_len for 300 prefix if needed, assuming 1000 for now
-SHENZHEN_TICKERS = generate_specific_prefix_tickers(sz_prefixes, ".SZ", range_len=1000)
-
-TICKERS = SHANGHAI_TICKERS + SHENZHEN_TICKERS
-
-print(f"Generated {len(SHANGHAI_TICKERS)} Shanghai tickers.")
-print(f"Generated {len(SHENZHEN_TICKERS)} Shenzhen tickers.")
-
 RSI_PERIOD = 14
 OVERSOLD_THRESHOLD = 30
 OVERBOUGHT_THRESHOLD = 70 # Define overbought threshold
+
+# --- History Window Configuration ---
+# Histories are requested only as far back as the RSI needs to converge:
+# rsi_engine.warmup_bars(RSI_PERIOD, RSI_CONVERGENCE_TOLERANCE) bars, converted
+# to calendar days per interval.
+RSI_CONVERGENCE_TOLERANCE = 1e-3 # Weight left on the bars before the window (~0.1 RSI point at most)
+CALENDAR_DAYS_PER_BAR = {"1d": 365 / 242, "1wk": 7, "1mo": 365 / 12} # About 242 A-share sessions a year
+HISTORY_WINDOW_MARGIN = 1.1 # Extra days for holidays
+LISTING_SLACK_BARS = 5 # A first bar this close to the window start means the ticker is older than the window
+MAX_HISTORY_EXTENSIONS = 2 # Times a window is widened when suspensions left too few bars in it
+
+def history_period(interval, length=RSI_PERIOD, tolerance=RSI_CONVERGENCE_TOLERANCE):
+    """Shortest history window that gives a converged RSI, as a period string (e.g. '180d')."""
+    days = warmup_bars(length, tolerance) * CALENDAR_DAYS_PER_BAR[interval] * HISTORY_WINDOW_MARGIN
+    return f"{math.ceil(days)}d"
+
 TIME_PERIODS = {
-    "Daily": {"interval": "1d", "period": "1y"},
-    "Weekly": {"interval": "1wk", "period": "5y"},
-    "Monthly": {"interval": "1mo", "period": "max"}
+    "Daily": {"interval": "1d", "period": history_period("1d")},
+    "Weekly": {"interval": "1wk", "period": history_period("1wk")},
+    "Monthly": {"interval": "1mo", "period": history_period("1mo")}
 }
 
-# Dictionary to store historical data for plotting oversold stocks
-oversold_stocks_data = {}
+# --- Derived Timeframe Configuration ---
+# When enabled, each ticker downloads one long Daily history and the Weekly and
+# Monthly bars are resampled locally instead of being fetched separately.
+DERIVE_FROM_DAILY = True
+DAILY_HISTORY_PERIOD = history_period("1mo") # Daily bars reaching back as far as the Monthly RSI needs
+RESAMPLE_FREQUENCIES = {"Weekly": "W-FRI", "Monthly": "M"} # Pandas period aliases
+
+# --- Batch Download Configuration ---
+USE_BATCH_DOWNLOAD = True # Request many tickers per yfinance call (yf.download)
+BATCH_SIZE = 50 # Tickers per batched request
+
+# --- Concurrency Configuration ---
+MAX_WORKERS = 8 # Number of tickers fetched in parallel
+SOURCE_RATE_LIMITS = { # Max requests per second for each data source (0 = unlimited)
+    "yfinance": 5,
+    "akshare": 3
+}
+SOURCE_MAX_RETRIES = 3 # Retries (with exponential backoff and jitter) on 429/5xx errors
+SOURCE_FAILURE_THRESHOLD = 5 # Consecutive transient failures that trip a source's circuit breaker
+SOURCE_RESET_TIMEOUT = 60 # Seconds a tripped source is skipped before a trial request
+SOURCE_GUARDS = {
+    source: SourceGuard(source, rate, max_retries=SOURCE_MAX_RETRIES,
+                        failure_threshold=SOURCE_FAILURE_THRESHOLD, reset_timeout=SOURCE_RESET_TIMEOUT)
+    for source, rate in SOURCE_RATE_LIMITS.items()
+}
+
+# --- OHLCV Cache Configuration ---
+USE_OHLCV_CACHE = True # Serve histories from disk and only fetch bars after the last cached date
+OHLCV_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "ohlcv.sqlite")
+OHLCV_CACHE_MAX_ROWS = 20_000_000 # Size cap; least-recently-used series are evicted beyond it
+OHLCV_CACHE_MAX_IDLE_DAYS = 30 # Series not read for this long are evicted (e.g. delisted tickers)
+CACHE_ADJUST = "qfq" # Adjustment basis of cached bars (yfinance auto_adjust and akshare qfq)
+ADJUSTMENT_TOLERANCE = 1e-4 # Relative change of an already-cached close that means the history was re-adjusted
+
+# --- Incremental RSI Configuration ---
+USE_RSI_STATE = True # Persist RSI smoothing state so re-scans only process new bars
+RSI_STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "rsi_state.sqlite")
+
+# --- Data Source Configuration ---
+# "live": yfinance, then akshare as fallback.
+# "replay": bars are read from LOCAL_DATA_DIR only (offline, deterministic, disk speed).
+DATA_SOURCE_MODE = "live"
+LOCAL_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "market_data")
+RECORD_RESPONSES = False # In live mode, also save every response under LOCAL_DATA_DIR for later replay
+
+# --- Fundamentals Configuration ---
+FUNDAMENTALS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "fundamentals.json")
+FUNDAMENTALS_TTL_DAYS = 30 # Market cap / earnings growth / sector are refreshed after this many days
+
+# --- Plot Configuration ---
+PLOT_WORKERS = 2 # Processes rendering plots while the scan keeps fetching
+PLOT_OUTPUT_DIR = None # Directory for the .png files (None = working directory)
+
+# --- Scan Statistics Configuration ---
+COLLECT_SCAN_STATS = True # Per-stage counters and latency histograms (see scan_stats.py)
+SCAN_STATS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "scan_stats.json")
+
+# --- Trigger Index Configuration ---
+BUILD_TRIGGER_INDEX = True # After a scan, store the price that would cross each RSI threshold (see trigger_index.py)
+TRIGGER_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "rsi_triggers.json")
+
+# --- Startup Configuration ---
+# yfinance and akshare are imported on first use (see data_sources.py), so importing
+# this module stays fast. warm_up_imports() loads them in the background instead.
+WARM_UP_MODULES = ("yfinance", "akshare")
+
+_ohlcv_cache = None
+_ohlcv_cache_lock = threading.Lock()
+
+_scan_stats = None
+_scan_stats_lock = threading.Lock()
+
+def get_scan_stats():
+    """Returns the shared per-stage scan statistics."""
+    global _scan_stats
+    with _scan_stats_lock:
+        if _scan_stats is None:
+            _scan_stats = ScanStats(enabled=COLLECT_SCAN_STATS)
+        return _scan_stats
+
+def get_ohlcv_cache():
+    """Returns the shared on-disk OHLCV cache, opening it on first use."""
+    global _ohlcv_cache
+    with _ohlcv_cache_lock:
+        if _ohlcv_cache is None:
+            _ohlcv_cache = OHLCVCache(OHLCV_CACHE_PATH, max_rows=OHLCV_CACHE_MAX_ROWS,
+                                      max_idle_days=OHLCV_CACHE_MAX_IDLE_DAYS)
+        return _ohlcv_cache
 
 # --- Helper Function for Data Fetching ---
+# An empty history carries why it is empty in hist.attrs["fetch_status"]. Only
+# FETCH_NO_DATA (every source answered, none had bars) means the code may be
+# dead; errors, timeouts and open circuit breakers are FETCH_FAILED.
+FETCH_NO_DATA = "no_data"
+FETCH_FAILED = "failed"
+
+def empty_history(status):
+    """Returns an empty history tagged with its fetch status."""
+    hist = pd.DataFrame()
+    hist.attrs["fetch_status"] = status
+    return hist
+
+def fetch_status(hist):
+    """Returns 'ok', FETCH_NO_DATA or FETCH_FAILED for a history from the fetch functions."""
+    if hist is not None and not hist.empty:
+        return "ok"
+    if hist is None:
+        return FETCH_FAILED
+    return hist.attrs.get("fetch_status", FETCH_FAILED) # Untagged: assume the worst, never "dead"
+
 def fetch_stock_data(ticker_symbol, period, interval):
-    """Fetches stock data first using yfinance, then akshare as fallback."""
-    print(f"    Attempting yfinance for {ticker_symbol} ({interval})...")
-    try:
-        # 1. Try yfinance
-        ticker_data_yf = yf.Ticker(ticker_symbol)
-        hist = ticker_data_yf.history(period=period, interval=interval)
-        if not hist.empty:
-            print(f"      yfinance SUCCESS for {ticker_symbol} ({interval})")
+    """
+    Returns bars for the requested period. With USE_OHLCV_CACHE the history is
+    served from disk and only the bars after the last cached date are fetched.
+    """
+    if not USE_OHLCV_CACHE:
+        return fetch_stock_data_remote(ticker_symbol, period, interval)
+
+    stats = get_scan_stats()
+    with stats.time("cache", f"plan/{interval}"):
+        action, anchor = _plan_cache_fetch(ticker_symbol, period, interval)
+    stats.count(f"cache.{action}")
+    if action == "fresh":
+        print(f"    Cache HIT for {ticker_symbol} ({interval})")
+        with stats.time("cache", f"load/{interval}"):
+            return _load_cached(ticker_symbol, period, interval)
+
+    start = anchor[0] if action == "topup" else None
+    bars = fetch_stock_data_remote(ticker_symbol, period, interval, start=start)
+    hist = _store_fetched(ticker_symbol, period, interval, action, anchor, bars)
+    if hist is None:
+        # A split or dividend re-adjusted the history: refetch everything
+        print(f"    Adjustment changed for {ticker_symbol} ({interval}), refetching full history")
+        bars = fetch_stock_data_remote(ticker_symbol, period, interval)
+        hist = _store_fetched(ticker_symbol, period, interval, "full", None, bars)
+    if hist.empty:
+        return empty_history(fetch_status(bars))
+    return hist
+
+def _covers_from(period):
+    """Cache window key for a period ('' = full history)."""
+    start = period_start(period)
+    return start.strftime('%Y-%m-%d') if start is not None else ''
+
+def _load_cached(ticker_symbol, period, interval):
+    return get_ohlcv_cache().load(ticker_symbol, interval, CACHE_ADJUST, period_start(period))
+
+def _plan_cache_fetch(ticker_symbol, period, interval):
+    """
+    Decides what a cached series needs. Returns (action, anchor) where action is
+    'fresh' (serve from disk), 'full' (download the whole period) or 'topup'
+    (download from anchor = (date, close) of the second-to-last cached bar; the
+    last one may have been an unfinished intraday/week/month bar).
+    """
+    cache = get_ohlcv_cache()
+    meta = cache.meta(ticker_symbol, interval, CACHE_ADJUST)
+    # Nothing cached, or the cached window does not reach back far enough
+    if meta is None or meta["covers_from"] > _covers_from(period):
+        return "full", None
+    if cache.is_fresh(meta):
+        return "fresh", None
+    tail = cache.tail(ticker_symbol, interval, CACHE_ADJUST, 2)
+    if tail.empty:
+        return "full", None
+    return "topup", (tail.index[0], tail['Close'].iloc[0])
+
+def _store_fetched(ticker_symbol, period, interval, action, anchor, bars):
+    """
+    Stores freshly fetched bars according to the plan and returns the served
+    history. Returns None if the anchor bar's close changed, i.e. the history
+    was re-adjusted and a full download is needed.
+    """
+    cache = get_ohlcv_cache()
+    covers_from = _covers_from(period)
+    if bars is None or bars.empty:
+        if action == "topup":
+            print(f"    Top-up FAILED for {ticker_symbol} ({interval}), serving cached data")
+            return _load_cached(ticker_symbol, period, interval)
+        return pd.DataFrame()
+
+    if action == "full":
+        cache.store(ticker_symbol, interval, CACHE_ADJUST, bars, covers_from=covers_from, replace=True)
+        return _load_cached(ticker_symbol, period, interval)
+
+    bars = cache.normalize(bars)
+    anchor_date, anchor_close = anchor
+    if anchor_date in bars.index:
+        fresh_close = bars.loc[anchor_date, 'Close']
+        if abs(fresh_close - anchor_close) > ADJUSTMENT_TOLERANCE * abs(anchor_close):
+            return None
+    cache.store(ticker_symbol, interval, CACHE_ADJUST, bars, covers_from=covers_from)
+    return _load_cached(ticker_symbol, period, interval)
+
+def extend_short_history(ticker_symbol, period, interval, hist, extensions=MAX_HISTORY_EXTENSIONS):
+    """
+    Widens the history window when the ticker is older than the window but
+    suspensions left fewer bars in it than the RSI warm-up needs. Tickers listed
+    inside the window keep the bars they have.
+    """
+    start = period_start(period)
+    if hist is None or hist.empty or start is None or extensions <= 0:
+        return hist
+    days_per_bar = CALENDAR_DAYS_PER_BAR.get(interval)
+    if days_per_bar is None:
+        return hist
+    window_days = (pd.Timestamp.now().normalize() - start).days
+    expected = window_days / days_per_bar / HISTORY_WINDOW_MARGIN
+    index = pd.to_datetime(hist.index)
+    first_bar = (index.tz_localize(None) if index.tz is not None else index).min()
+    listed_inside = first_bar > start + pd.Timedelta(days=LISTING_SLACK_BARS * days_per_bar)
+    if len(hist) >= expected or listed_inside:
+        return hist
+    longer = f"{math.ceil(window_days * expected / len(hist) * HISTORY_WINDOW_MARGIN)}d"
+    print(f"    Only {len(hist)} bars for {ticker_symbol} ({interval}) in {period}, widening to {longer}")
+    get_scan_stats().count("history.extended")
+    wider = fetch_stock_data(ticker_symbol, longer, interval)
+    if wider is None or len(wider) <= len(hist):
+        return hist
+    return extend_short_history(ticker_symbol, longer, interval, wider, extensions - 1)
+
+# --- Batched Data Fetching ---
+def download_batch(tickers, interval, period=None, start=None):
+    """
+    Downloads many tickers with the primary source's batch API (one yfinance
+    multi-ticker request). Returns {ticker: DataFrame} for the tickers present.
+    """
+    return get_data_sources()[0].fetch_batch(list(tickers), interval, period=period, start=start)
+
+def fetch_stock_data_batch(tickers, period, interval):
+    """
+    Batched version of fetch_stock_data. Stale or missing series are requested
+    BATCH_SIZE tickers at a time; tickers absent from a batch response fall back
+    to per-ticker retrieval through every source. Returns {ticker: DataFrame}.
+    """
+    tickers = list(tickers)
+    results = {}
+    stats = get_scan_stats()
+    if USE_OHLCV_CACHE:
+        with stats.time("cache", f"plan/{interval}"):
+            plans = {t: _plan_cache_fetch(t, period, interval) for t in tickers}
+    else:
+        plans = {t: ("full", None) for t in tickers}
+
+    for ticker, (action, _) in plans.items():
+        stats.count(f"cache.{action}")
+        if action == "fresh":
+            with stats.time("cache", f"load/{interval}"):
+                results[ticker] = _load_cached(ticker, period, interval)
+    full = [t for t, (action, _) in plans.items() if action == "full"]
+    topup = [t for t, (action, _) in plans.items() if action == "topup"]
+
+    batches = [(full[i:i + BATCH_SIZE], None) for i in range(0, len(full), BATCH_SIZE)]
+    for i in range(0, len(topup), BATCH_SIZE):
+        chunk = topup[i:i + BATCH_SIZE]
+        batches.append((chunk, min(plans[t][1][0] for t in chunk))) # One start date covers every anchor
+
+    batch_label = f"{get_data_sources()[0].name}/{interval}"
+    for chunk, start in batches:
+        stats.count("batch.requests")
+        try:
+            with stats.time("batch", batch_label):
+                frames = download_batch(chunk, interval, period=period, start=start)
+            print(f"    Batch returned {len(frames)}/{len(chunk)} tickers ({interval})")
+        except Exception as e:
+            print(f"    Batch FAILED (error: {e}) for {len(chunk)} tickers ({interval})")
+            stats.count("batch.failed")
+            frames = {}
+        stats.count("batch.missing", len(chunk) - len(frames)) # These fall back to per-ticker fetches
+        for ticker, bars in frames.items():
+            if not USE_OHLCV_CACHE:
+                results[ticker] = bars
+                continue
+            action, anchor = plans[ticker]
+            hist = _store_fetched(ticker, period, interval, action, anchor, bars)
+            if hist is not None and not hist.empty:
+                results[ticker] = hist
+
+    # Fall back to per-ticker retrieval (yfinance, then akshare) for anything missing
+    for ticker in tickers:
+        if ticker not in results:
+            results[ticker] = fetch_stock_data(ticker, period, interval)
+    return results
+
+def daily_window(timeframes=None):
+    """Daily history period the timeframes need in derived mode (Daily alone needs far less)."""
+    if timeframes is not None and all(name == "Daily" for name in timeframes):
+        return TIME_PERIODS["Daily"]["period"]
+    return DAILY_HISTORY_PERIOD
+
+def prefetch_histories(tickers, timeframes=None):
+    """
+    Fetches every history the scan needs for a group of tickers with batched
+    requests. Returns {ticker: {interval: DataFrame}} for use by TimeframeData.
+    `timeframes` limits the fetch to some of TIME_PERIODS (default: all of them).
+    """
+    if not USE_BATCH_DOWNLOAD:
+        return {}
+    if DERIVE_FROM_DAILY:
+        requests = [(daily_window(timeframes), "1d")]
+    else:
+        requests = [(TIME_PERIODS[name]["period"], TIME_PERIODS[name]["interval"])
+                    for name in (timeframes or TIME_PERIODS)]
+    prefetched = {ticker: {} for ticker in tickers}
+    for period, interval in requests:
+        for ticker, hist in fetch_stock_data_batch(tickers, period, interval).items():
+            prefetched[ticker][interval] = hist
+    return prefetched
+
+def fetch_stock_data_remote(ticker_symbol, period, interval, start=None):
+    """
+    Fetches bars from the configured data sources in order (by default yfinance,
+    then akshare as fallback). If `start` is given it overrides `period`.
+    """
+    stats = get_scan_stats()
+    stats.count("remote.requests")
+    failed = False # Any source raised (network, 429/5xx, open circuit): not proof of a dead code
+    for attempt, source in enumerate(get_data_sources()):
+        if attempt == 1:
+            stats.count("remote.fallback") # The first source failed or had no data
+        print(f"    Attempting {source.name} for {ticker_symbol} ({interval})...")
+        try:
+            with stats.time("fetch", f"{source.name}/{interval}"):
+                hist = source.fetch(ticker_symbol, interval, period=period, start=start)
+        except Exception as e:
+            print(f"      {source.name} FAILED (error: {e}) for {ticker_symbol} ({interval})")
+            stats.count(f"fetch.{source.name}.error")
+            failed = True
+            continue
+        if hist is not None and not hist.empty:
+            print(f"      {source.name} SUCCESS for {ticker_symbol} ({interval})")
+            stats.count(f"fetch.{source.name}.ok")
             return hist
+        print(f"      {source.name} FAILED (empty) for {ticker_symbol} ({interval})")
+        stats.count(f"fetch.{source.name}.empty")
+    stats.count("remote.failed")
+    return empty_history(FETCH_FAILED if failed else FETCH_NO_DATA) # Return empty if every source failed
+
+# --- Local Daily Bars ---
+def load_daily_closes(ticker_symbol, start=None):
+    """Daily closes available without a network request: the OHLCV cache, or the replay snapshot."""
+    if USE_OHLCV_CACHE:
+        hist = get_ohlcv_cache().load(ticker_symbol, "1d", CACHE_ADJUST, start or period_start(DAILY_HISTORY_PERIOD))
+    else:
+        source = get_data_sources()[0]
+        if source.name != "local":
+            return pd.Series(dtype=float) # Live sources would mean one request per ticker
+        hist = source.fetch(ticker_symbol, "1d", period=DAILY_HISTORY_PERIOD, start=start)
+    if hist is None or hist.empty:
+        return pd.Series(dtype=float)
+    closes = pd.to_numeric(hist['Close'], errors='coerce').dropna()
+    index = pd.to_datetime(closes.index)
+    closes.index = (index.tz_localize(None) if index.tz is not None else index).normalize()
+    return closes[~closes.index.duplicated(keep='last')]
+
+# --- Data Sources ---
+_data_sources = None
+
+def build_data_sources(mode=None, local_dir=None, record=None):
+    """Builds the ordered list of data sources fetch_stock_data_remote tries."""
+    mode = mode or DATA_SOURCE_MODE
+    local_dir = local_dir or LOCAL_DATA_DIR
+    record = RECORD_RESPONSES if record is None else record
+    if mode == "replay":
+        return [LocalFileSource(local_dir)]
+    sources = [YFinanceSource(SOURCE_GUARDS["yfinance"]), AkshareSource(SOURCE_GUARDS["akshare"], adjust=CACHE_ADJUST)]
+    if record:
+        sources = [RecordingSource(source, local_dir) for source in sources]
+    return sources
+
+def get_data_sources():
+    """Returns the configured data sources, building them on first use."""
+    global _data_sources
+    if _data_sources is None:
+        _data_sources = build_data_sources()
+    return _data_sources
+
+def configure_data_sources(mode="live", local_dir=None, record=False):
+    """Switches data sources, e.g. to replay a recorded market snapshot."""
+    global _data_sources
+    _data_sources = build_data_sources(mode, local_dir, record)
+    return _data_sources
+
+# --- Fundamentals ---
+_fundamentals_store = None
+_fundamentals_lock = threading.Lock()
+
+def fetch_ticker_info(ticker_symbol):
+    """Fetches a ticker's yfinance .info dict (through the yfinance source guard)."""
+    import yfinance as yf
+    with get_scan_stats().time("info", "yfinance"):
+        return SOURCE_GUARDS["yfinance"].call(lambda: yf.Ticker(ticker_symbol).info)
+
+def get_fundamentals_store():
+    """Returns the shared fundamentals cache, loading it on first use."""
+    global _fundamentals_store
+    with _fundamentals_lock:
+        if _fundamentals_store is None:
+            _fundamentals_store = FundamentalsStore(FUNDAMENTALS_PATH, fetch_ticker_info,
+                                                    ttl_days=FUNDAMENTALS_TTL_DAYS)
+        return _fundamentals_store
+
+# --- Startup ---
+def warm_up_imports(modules=WARM_UP_MODULES):
+    """
+    Imports the data source libraries on a daemon thread, so a window can come up
+    first and the first scan doesn't wait for them. Returns the thread.
+
+    Args:
+        modules: Module names to import (default: WARM_UP_MODULES)
+    """
+    def worker():
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception as e: # Missing optional source; fetches will report it
+                print(f"Warm-up import of {name} failed: {e}")
+
+    thread = threading.Thread(target=worker, name="import-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+# --- Ticker Universe ---
+_ticker_universe = None
+
+def get_ticker_universe():
+    """Returns the shared listed-symbol universe, loading it on first use."""
+    global _ticker_universe
+    if _ticker_universe is None:
+        _ticker_universe = TickerUniverse()
+    return _ticker_universe
+
+def generate_all_prefix_tickers():
+    """Brute-force candidate codes, used only when no listing is available."""
+    # Shanghai: 600xxx-688xxx. Shenzhen: 0 maps to 000xxx, 1 to 001xxx, etc. 300 maps to 300xxx
+    sh_tickers = generate_specific_prefix_tickers([600, 601, 603, 688], ".SS", range_len=1000)
+    sz_tickers = generate_specific_prefix_tickers([0, 1, 2, 3, 300], ".SZ", range_len=1000)
+    return sh_tickers + sz_tickers
+
+def load_scan_tickers(refresh=False):
+    """Returns the live tickers to scan: listed symbols minus known-dead codes."""
+    refresh_trade_calendar() # Holidays for the cache staleness checks (monthly, cached)
+    return get_ticker_universe().live(generate_all_prefix_tickers, refresh=refresh)
+
+# --- Derived Timeframes ---
+def resample_ohlcv(daily_hist, timeframe):
+    """
+    Resamples daily OHLCV bars into Weekly or Monthly bars.
+    Bars are grouped by calendar week/month but labelled with the last trading
+    day actually present, so holiday-shortened weeks and months end on the real
+    last session rather than on a calendar boundary.
+    """
+    if daily_hist is None or daily_hist.empty:
+        return pd.DataFrame()
+    index = pd.to_datetime(daily_hist.index)
+    naive_index = index.tz_localize(None) if index.tz is not None else index
+    groups = naive_index.to_period(RESAMPLE_FREQUENCIES[timeframe]).asi8 # Integer period ordinals
+
+    agg = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+    agg = {col: func for col, func in agg.items() if col in daily_hist.columns}
+    bars = daily_hist.groupby(groups, sort=True).agg(agg)
+    last_dates = pd.Series(index, index=groups).groupby(level=0, sort=True).last()
+    bars.index = pd.DatetimeIndex(last_dates, name="Date")
+    return bars
+
+class TimeframeData:
+    """Lazily fetches the Daily/Weekly/Monthly histories of one ticker."""
+
+    def __init__(self, ticker_symbol, derive_from_daily=None, prefetched=None, timeframes=None):
+        """
+        Args:
+            prefetched: {interval: DataFrame} from prefetch_histories (called with the same timeframes)
+            timeframes: Timeframes that will be requested (default: all); ["Daily"] fetches
+                        only the Daily window in derived mode
+        """
+        self.ticker_symbol = ticker_symbol
+        self.derive_from_daily = DERIVE_FROM_DAILY if derive_from_daily is None else derive_from_daily
+        self.prefetched = prefetched or {}
+        self.daily_period = daily_window(timeframes)
+        self.daily_hist = None # Single Daily download shared by all timeframes (derived mode)
+
+    def _fetch(self, period, interval):
+        if interval in self.prefetched:
+            hist = self.prefetched[interval]
+            hist = hist.copy() if hist is not None else pd.DataFrame()
         else:
-            print(f"      yfinance FAILED (empty) for {ticker_symbol} ({interval}), trying akshare...")
-
-    except Exception as e_yf:
-        print(f"      yfinance FAILED (error: {e_yf}) for {ticker_symbol} ({interval}), trying akshare...")
-
-    # 2. Try akshare if yfinance failed
-    try:
-        # Convert yfinance ticker symbol (e.g., 600000.SS) to akshare symbol (e.g., sh600000)
-        parts = ticker_symbol.split('.')
-        if len(parts) != 2:
-             print(f"      akshare FAILED: Invalid ticker format for akshare: {ticker_symbol}")
-             return pd.DataFrame() # Return empty DataFrame
-        
-        num = parts[0]
-        exch = parts[1].lower()
-        if exch not in ["ss", "sz"]:
-             print(f"      akshare FAILED: Unknown exchange for akshare: {exch}")
-             return pd.DataFrame()
-        
-        ak_symbol = f"{exch}{num}"
-        
-        # Convert yfinance period/interval to akshare parameters
-        # akshare uses start_date and end_date, and period ('daily', 'weekly', 'monthly')
-        end_date = datetime.now().strftime('%Y%m%d')
-        # Rough mapping from yfinance periods to start dates (adjust as needed)
-        if period == "1y":
-            start_date = (datetime.now() - pd.Timedelta(days=365)).strftime('%Y%m%d')
-        elif period == "5y":
-            start_date = (datetime.now() - pd.Timedelta(days=365*5)).strftime('%Y%m%d')
-        elif period == "max":
-            start_date = "19900101" # Or an earlier date if needed
-        else:
-             start_date = (datetime.now() - pd.Timedelta(days=30)).strftime('%Y%m%d') # Default fallback
-
-        ak_period_map = {"1d": "daily", "1wk": "weekly", "1mo": "monthly"}
-        ak_period = ak_period_map.get(interval)
-        
-        if not ak_period:
-             print(f"      akshare FAILED: Unsupported interval for akshare: {interval}")
-             return pd.DataFrame()
+            hist = fetch_stock_data(self.ticker_symbol, period=period, interval=interval)
+        return extend_short_history(self.ticker_symbol, period, interval, hist)
+
+    def get(self, name):
+        """Returns a fresh DataFrame for the given timeframe (empty if unavailable)."""
+        if not self.derive_from_daily:
+            params = TIME_PERIODS[name]
+            return self._fetch(params["period"], params["interval"])
+
+        if self.daily_hist is None:
+            self.daily_hist = self._fetch(self.daily_period, "1d")
+            if self.daily_hist is None:
+                self.daily_hist = pd.DataFrame()
+        if self.daily_hist.empty:
+            return self.daily_hist.copy() # Keeps the fetch status of the empty download
+        if name == "Daily":
+            return self.daily_hist.copy()
+        with get_scan_stats().time("resample", name):
+            return resample_ohlcv(self.daily_hist, name)
+
+# --- RSI State ---
+_rsi_state_store = None
+_rsi_state_lock = threading.Lock()
+
+def get_rsi_state_store():
+    """Returns the shared incremental RSI state store, opening it on first use."""
+    global _rsi_state_store
+    with _rsi_state_lock:
+        if _rsi_state_store is None:
+            _rsi_state_store = RSIStateStore(RSI_STATE_PATH)
+        return _rsi_state_store
+
+def compute_latest_rsi(ticker_symbol, timeframe, hist):
+    """
+    Returns the RSI at the last bar of a cleaned history (NaN if unavailable).
+    With USE_RSI_STATE only bars newer than the stored state are processed.
+    """
+    with get_scan_stats().time("rsi", timeframe):
+        if USE_RSI_STATE:
+            return get_rsi_state_store().latest_rsi(ticker_symbol, timeframe, hist, RSI_PERIOD)
+        rsi = add_rsi_column(hist.copy(), RSI_PERIOD)[f'RSI_{RSI_PERIOD}'].dropna()
+        return rsi.iloc[-1] if not rsi.empty else float('nan')
+
+# --- Per-Ticker Scan ---
+def scan_ticker(ticker_symbol, prefetched=None):
+    """
+    Fetches D/W/M data for one ticker and checks the oversold condition.
+    Returns a dict with keys 'fetch_error' (bool), 'no_data' (bool: every source
+    answered without Daily bars), 'oversold_all' (bool) and 'history'
+    ({timeframe: DataFrame with RSI column}).
+    """
+    is_oversold_all = True
+    history_data = {} # Store history for this ticker temporarily
+    fetch_error = False
+    no_data = False
+    timeframe_data = TimeframeData(ticker_symbol, prefetched=prefetched)
+
+    for name in TIME_PERIODS:
+        # Use the helper to get data (one download per ticker in derived mode)
+        hist = timeframe_data.get(name)
+
+        if hist is None or hist.empty:
+            # Don't print error here for direct run, handled by fetch_stock_data logging
+            is_oversold_all = False
+            no_data = name == "Daily" and fetch_status(hist) == FETCH_NO_DATA
+            fetch_error = not no_data # Mark failure for this ticker
+            break
+
+        # --- RSI Calculation ---
+        if len(hist) < RSI_PERIOD:
+            is_oversold_all = False
+            break
+
+        with get_scan_stats().time("clean", name):
+            hist.index = pd.to_datetime(hist.index)
+            hist['Close'] = pd.to_numeric(hist['Close'], errors='coerce')
+            hist.dropna(subset=['Close'], inplace=True)
+
+        if hist.empty:
+            is_oversold_all = False
+            break
+
+        latest_rsi = compute_latest_rsi(ticker_symbol, name, hist)
+        if pd.isna(latest_rsi):
+            is_oversold_all = False
+            break
+        history_data[name] = hist # Store history for potential plotting
+
+        # --- Log RSI Status ---
+        status = "Neutral"
+        if latest_rsi <= OVERSOLD_THRESHOLD:
+            status = f"Oversold (<= {OVERSOLD_THRESHOLD})"
+        elif latest_rsi >= OVERBOUGHT_THRESHOLD:
+            status = f"Overbought (>= {OVERBOUGHT_THRESHOLD})"
+
+        # Print status for the current timeframe when run directly
+        print(f"    {ticker_symbol} - {name} RSI: {latest_rsi:.2f} ({status})")
+
+        # --- Check if Oversold Condition Met for This Timeframe ---
+        if latest_rsi > OVERSOLD_THRESHOLD:
+            is_oversold_all = False # Mark as not meeting the 'oversold on all' criteria
+            break # Stop checking other timeframes
+
+    # Full RSI series are only needed for plotting the stocks that made it
+    if is_oversold_all:
+        rsi_col = f'RSI_{RSI_PERIOD}'
+        for hist in history_data.values():
+            add_rsi_column(hist, RSI_PERIOD)
+            hist.dropna(subset=[rsi_col], inplace=True)
 
-        print(f"    Attempting akshare for {ak_symbol} ({ak_period})...")
-        # Fetch data using stock_zh_a_hist
-        hist_ak = ak.stock_zh_a_hist(symbol=ak_symbol, period=ak_period, start_date=start_date, end_date=end_date, adjust="qfq")
-        
-        if not hist_ak.empty:
-            print(f"      akshare SUCCESS for {ak_symbol} ({ak_period})")
-            # Standardize columns and index to match yfinance output
-            hist_ak.rename(columns={
-                '日期': 'Date', 
-                '开盘': 'Open', 
-                '收盘': 'Close', 
-                '最高': 'High', 
-                '最低': 'Low', 
-                '成交量': 'Volume'
-                # Add other columns if needed, e.g., '成交额', '振幅', '涨跌幅', '涨跌额', '换手率'
-            }, inplace=True)
-            hist_ak['Date'] = pd.to_datetime(hist_ak['Date'])
-            hist_ak.set_index('Date', inplace=True)
-            # Select only the columns yfinance usually provides for consistency
-            yf_cols = ['Open', 'High', 'Low', 'Close', 'Volume']
-            return hist_ak[[col for col in yf_cols if col in hist_ak.columns]]
-        else:
-            print(f"      akshare FAILED (empty) for {ak_symbol} ({ak_period})")
-            return pd.DataFrame() # Return empty if akshare also fails
-            
-    except Exception as e_ak:
-        print(f"      akshare FAILED (error: {e_ak}) for {ak_symbol} ({ak_period})")
-        return pd.DataFrame() # Return empty if akshare fails
+    return {"fetch_error": fetch_error, "no_data": no_data, "oversold_all": is_oversold_all, "history": history_data}
+
+def scan_ticker_batch(tickers):
+    """Scans a group of tickers whose histories are downloaded in batched requests. Returns {ticker: result}."""
+    prefetched = prefetch_histories(tickers)
+    results = {}
+    for ticker_symbol in tickers:
+        try:
+            results[ticker_symbol] = scan_ticker(ticker_symbol, prefetched.get(ticker_symbol))
+        except Exception as e:
+            results[ticker_symbol] = e
+    return results
+
+# --- Trigger Index ---
+def update_trigger_index(tickers, max_workers=MAX_WORKERS):
+    """
+    Rebuilds the RSI trigger price index from the Daily bars on disk and saves it.
+    Weekly/Monthly triggers need the long Daily window, which the staged scan
+    only downloads for its survivors. Returns the index, or None if no ticker
+    has bars on disk.
+    """
+    index = TriggerIndex.build(tickers, load_daily_closes, next_session_day(), RSI_PERIOD,
+                               OVERSOLD_THRESHOLD, OVERBOUGHT_THRESHOLD, RESAMPLE_FREQUENCIES,
+                               min_bars=warmup_bars(RSI_PERIOD, RSI_CONVERGENCE_TOLERANCE),
+                               max_workers=max_workers)
+    if index.tables["Daily"].empty:
+        return None
+    index.save(TRIGGER_INDEX_PATH)
+    return index
 
 # --- Main Execution Function ---
-def run_china_scan_and_plot():
-    # --- Configuration (Ticker Generation inside the function now) ---
-    # Shanghai Stock Exchange (.SS)
-    sh_prefixes = [600, 601, 603, 688]
-    SHANGHAI_TICKERS = generate_specific_prefix_tickers(sh_prefixes, ".SS", range_len=1000) # Generate 1000 tickers for each prefix
+def run_china_scan_and_plot(max_workers=MAX_WORKERS):
+    # --- Configuration (Ticker Universe inside the function now) ---
+    universe = get_ticker_universe()
+    TICKERS = load_scan_tickers()
+    print(f"Loaded {len(TICKERS)} live tickers (source: {universe.source}, {len(universe.dead)} known dead codes skipped).")
 
-    # Shenzhen Stock Exchange (.SZ)
-    sz_prefixes = [0, 1, 2, 3, 300] # 0 maps to 000xxx, 1 to 001xxx, etc. 300 maps to 300xxx
-    SHENZHEN_TICKERS = generate_specific_prefix_tickers(sz_prefixes, ".SZ", range_len=1000)
-
-    TICKERS = SHANGHAI_TICKERS + SHENZHEN_TICKERS
-
-    print(f"Generated {len(SHANGHAI_TICKERS)} Shanghai tickers.")
-    print(f"Generated {len(SHENZHEN_TICKERS)} Shenzhen tickers.")
-
-    # Dictionary to store historical data for plotting oversold stocks
-    oversold_stocks_data = {}
+    oversold_tickers = [] # Only the symbols are kept; plots are rendered as signals arrive
+    intervals = {name: params["interval"] for name, params in TIME_PERIODS.items()}
+    rsi_col = f'RSI_{RSI_PERIOD}'
 
     # --- Main Logic ---
-    print(f"Scanning approximately {len(TICKERS)} potential Chinese tickers (using yfinance + akshare fallback)...")
+    print(f"Scanning approximately {len(TICKERS)} potential Chinese tickers (using yfinance + akshare fallback, {max_workers} workers)...")
 
     processed_count = 0
     found_count = 0
     fetch_errors = 0
+    stats = get_scan_stats()
+    stats.reset(len(TICKERS))
 
-    for ticker_symbol in TICKERS:
-        processed_count += 1
-        # Optional: time.sleep(0.1)
-        if processed_count % 100 == 0:
-            print(f" Processed {processed_count}/{len(TICKERS)} tickers... Found {found_count} oversold so far. Fetch errors: {fetch_errors}")
-
-        # --- Data Fetching Loop ---
-        is_oversold_all = True
-        history_data = {} # Store history for this ticker temporarily
-        data_fetched_successfully = True
-
-        for name, params in TIME_PERIODS.items():
-            # Use the helper function to get data
-            hist = fetch_stock_data(ticker_symbol, period=params["period"], interval=params["interval"])
-            
-            if hist is None or hist.empty:
-                # Don't print error here for direct run, handled by fetch_stock_data logging
-                # print(f"  Could not fetch {name} data for {ticker_symbol} from either source. Skipping ticker.")
-                is_oversold_all = False
-                data_fetched_successfully = False # Mark failure for this ticker
+    # Plot workers are spawned (not forked) so they never inherit the fetch threads' locks
+    plot_pool = ProcessPoolExecutor(max_workers=PLOT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    plot_jobs = {}
+    try:
+        # Results arrive in completion order, not ticker order
+        batch_size = BATCH_SIZE if USE_BATCH_DOWNLOAD else 1
+        for ticker_symbol, result, error in run_concurrent_batches(TICKERS, scan_ticker_batch, batch_size,
+                                                                   max_workers=max_workers):
+            processed_count += 1
+            stats.advance()
+            if processed_count % 100 == 0:
+                print(f" Processed {processed_count}/{len(TICKERS)} tickers... Found {found_count} oversold so far. Fetch errors: {fetch_errors}")
+
+            if error is not None:
+                print(f"  Error processing {ticker_symbol}: {error}")
                 fetch_errors += 1
-                break 
-                
-            # --- RSI Calculation ---
-            if len(hist) < RSI_PERIOD:
-                # print(f"  Insufficient {name} data ({len(hist)} points) for {ticker_symbol} after fetching. Skipping timeframe.")
-                is_oversold_all = False
-                break
-
-            hist.index = pd.to_datetime(hist.index)
-            hist['Close'] = pd.to_numeric(hist['Close'], errors='coerce')
-            hist.dropna(subset=['Close'], inplace=True) 
-
-            if hist.empty:
-                # print(f"  No valid 'Close' data for {name} - {ticker_symbol}. Skipping timeframe.")
-                is_oversold_all = False
-                break
+                continue
 
-            hist.ta.rsi(length=RSI_PERIOD, append=True)
-
-            rsi_col = f'RSI_{RSI_PERIOD}'
-            if rsi_col not in hist.columns or hist[rsi_col].isnull().all():
-                # print(f"  Could not calculate {name} RSI for {ticker_symbol}. Skipping timeframe.")
-                is_oversold_all = False
-                break
-
-            hist.dropna(subset=[rsi_col], inplace=True)
-            if hist.empty:
-                # print(f"  Not enough data after RSI calculation for {name} - {ticker_symbol}. Skipping timeframe.")
-                is_oversold_all = False
-                break
-
-            latest_rsi = hist[rsi_col].iloc[-1]
-            history_data[name] = hist # Store history for potential plotting
-
-            # --- Log RSI Status --- 
-            status = "Neutral"
-            if latest_rsi <= OVERSOLD_THRESHOLD:
-                status = f"Oversold (<= {OVERSOLD_THRESHOLD})"
-            elif latest_rsi >= OVERBOUGHT_THRESHOLD:
-                status = f"Overbought (>= {OVERBOUGHT_THRESHOLD})"
-            
-            # Print status for the current timeframe when run directly
-            print(f"    {ticker_symbol} - {name} RSI: {latest_rsi:.2f} ({status})")
-            
-            # --- Check if Oversold Condition Met for This Timeframe --- 
-            if latest_rsi > OVERSOLD_THRESHOLD:
-                # print(f"      -> Not oversold on {name}. Skipping remaining timeframes for {ticker_symbol}.")
-                is_oversold_all = False # Mark as not meeting the 'oversold on all' criteria
-                break # Stop checking other timeframes 
-
-        # --- Check if Oversold on All Timeframes --- 
-        if data_fetched_successfully and is_oversold_all:
-            print(f"\n *** {ticker_symbol} is oversold on Daily, Weekly, and Monthly charts! Adding to results. ***\n")
-            oversold_stocks_data[ticker_symbol] = history_data
-            found_count += 1
-
-    # --- Output Results & Plotting ---
-    print(f"\n--- Scan Complete --- Processed {processed_count} tickers.")
-
-    if oversold_stocks_data:
-        print(f"Found {len(oversold_stocks_data)} stocks/instruments oversold on Daily, Weekly, and Monthly charts:")
-        oversold_tickers = list(oversold_stocks_data.keys())
-        for ticker_symbol in oversold_tickers:
-            print(f"- {ticker_symbol}")
-
-        print("\nGenerating RSI plots for oversold stocks...")
-        # Use matplotlib (ensure imported)
-        import matplotlib.pyplot as plt 
-        for ticker_symbol, history_dict in oversold_stocks_data.items():
-            fig, axes = plt.subplots(len(TIME_PERIODS), 1, figsize=(12, 8), sharex=False)
-            fig.suptitle(f'RSI ({RSI_PERIOD}) for {ticker_symbol} (Oversold on D/W/M)', fontsize=16)
-            rsi_col = f'RSI_{RSI_PERIOD}'
-
-            for i, (name, hist) in enumerate(history_dict.items()):
-                ax = axes[i]
-                if rsi_col not in hist.columns: continue # Skip if RSI col missing
-
-                ax.plot(hist.index, hist[rsi_col], label=f'{name} RSI')
-                ax.axhline(OVERSOLD_THRESHOLD, color='red', linestyle='--', linewidth=1, label=f'Oversold ({OVERSOLD_THRESHOLD})')
-                ax.axhline(OVERBOUGHT_THRESHOLD, color='green', linestyle=':', linewidth=1, label=f'Overbought ({OVERBOUGHT_THRESHOLD})') 
-                ax.set_title(f'{name} Chart ({TIME_PERIODS[name]["interval"]})')
-                ax.set_ylabel('RSI')
-                ax.legend()
-                ax.grid(True)
-                plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
-
-            plt.tight_layout(rect=[0, 0.03, 1, 0.95]) 
-            plot_filename = f"{ticker_symbol}_rsi_plot.png"
-            try:
-                plt.savefig(plot_filename)
-                print(f" Saved plot: {plot_filename}")
-            except Exception as e:
-                print(f" Could not save plot {plot_filename}: {e}")
-            plt.close(fig) 
-
-        print("\nPlotting complete. Check for .png files in the script directory.")
+            if result["fetch_error"]:
+                fetch_errors += 1
+            elif result["no_data"]:
+                universe.mark_dead(ticker_symbol) # Every source answered without Daily data
+
+            # --- Check if Oversold on All Timeframes ---
+            if not result["fetch_error"] and result["oversold_all"]:
+                print(f"\n *** {ticker_symbol} is oversold on Daily, Weekly, and Monthly charts! Adding to results. ***\n")
+                oversold_tickers.append(ticker_symbol)
+                found_count += 1
+                # Hand only the RSI series to a plot worker; the OHLCV history is dropped here
+                plot_jobs[ticker_symbol] = plot_pool.submit(
+                    render_rsi_plot, ticker_symbol, trim_for_plot(result["history"], rsi_col), RSI_PERIOD,
+                    OVERSOLD_THRESHOLD, OVERBOUGHT_THRESHOLD, intervals, PLOT_OUTPUT_DIR)
+
+        universe.save_dead()
+
+        # --- Output Results & Plotting ---
+        print(f"\n--- Scan Complete --- Processed {processed_count} tickers.")
+        for line in stats.summary_lines():
+            print(f" {line}")
+        print(f"Scan stats saved to {stats.dump(SCAN_STATS_PATH)}")
+        if BUILD_TRIGGER_INDEX:
+            index = update_trigger_index(TICKERS, max_workers=max_workers)
+            if index is not None:
+                print(f"Trigger index for {len(index.tables['Daily'])} tickers saved to {TRIGGER_INDEX_PATH}")
+
+        if oversold_tickers:
+            print(f"Found {len(oversold_tickers)} stocks/instruments oversold on Daily, Weekly, and Monthly charts:")
+            for ticker_symbol in oversold_tickers:
+                print(f"- {ticker_symbol}")
+
+            print("\nWaiting for RSI plots of oversold stocks...")
+            for ticker_symbol, job in plot_jobs.items():
+                try:
+                    print(f" Saved plot: {job.result()}")
+                except Exception as e:
+                    print(f" Could not save plot for {ticker_symbol}: {e}")
+
+            print("\nPlotting complete. Check for .png files in the script directory.")
 
-    else:
-        print("No Chinese stocks found to be oversold on all three timeframes within the scanned range.")
+        else:
+            print("No Chinese stocks found to be oversold on all three timeframes within the scanned range.")
+    finally:
+        plot_pool.shutdown(wait=True, cancel_futures=True)
 
 # --- Guard for Direct Execution ---
 if __name__ == "__main__":
     # This block only runs when main_china.py is executed directly
-    run_china_scan_and_plot()
+    import argparse
+    parser = argparse.ArgumentParser(description="Scan Chinese A-shares for Daily/Weekly/Monthly oversold RSI.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Number of tickers fetched in parallel")
+    parser.add_argument("--refresh-universe", action="store_true", help="Re-download the listed-symbol snapshot from akshare")
+    parser.add_argument("--universe-file", help="Load the listed-symbol snapshot from a local CSV/TXT/JSON file")
+    parser.add_argument("--replay", metavar="DIR", help="Read bars only from a recorded local snapshot (no network, no cache)")
+    parser.add_argument("--record", metavar="DIR", help="Save every live response under DIR for later --replay")
+    args = parser.parse_args()
+
+    if args.replay:
+        configure_data_sources("replay", local_dir=args.replay)
+        USE_OHLCV_CACHE = False # Replays read straight from the snapshot
+        USE_BATCH_DOWNLOAD = False
+    elif args.record:
+        configure_data_sources("live", local_dir=args.record, record=True)
+
+    if args.universe_file:
+        print(f"Loaded {len(get_ticker_universe().load_file(args.universe_file))} tickers from {args.universe_file}")
+    elif args.refresh_universe:
+        print(f"Refreshed listing: {len(get_ticker_universe().refresh())} tickers")
+    run_china_scan_and_plot(max_workers=args.workers)
 
 # (Remove original main logic from the bottom of the file if it exists outside the function) 
\ No newline at end of file
@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+
+from trading_calendar import last_completed_session, session_close
+
+# --- Persistent OHLCV Cache ---
+# Stores full bar histories in SQLite, keyed by (ticker, interval, adjust), so
+# later scans only fetch the bars after the last cached date.
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    adjust TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (ticker, interval, adjust, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS series (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    adjust TEXT NOT NULL,
+    covers_from TEXT,     -- start of the requested window ('' = full history)
+    first_date TEXT,
+    last_date TEXT,
+    rows INTEGER,
+    checked_at REAL,      -- unix time of the last successful remote check
+    last_access REAL,     -- unix time of the last read, used for eviction
+    PRIMARY KEY (ticker, interval, adjust)
+);
+"""
+
+
+class OHLCVCache:
+    """SQLite-backed bar store with calendar-based staleness and size-capped eviction."""
+
+    def __init__(self, path, max_rows=20_000_000, max_idle_days=30):
+        self.path = path
+        self.max_rows = max_rows
+        self.max_idle_days = max_idle_days
+        self.write_lock = threading.Lock()
+        self.local = threading.local()
+        self.stores_since_evict = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL") # Readers don't block the writer
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        """Returns this thread's connection (sqlite connections are per-thread)."""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self.local.conn = conn
+        return conn
+
+    # --- Reads ---
+    def meta(self, ticker, interval, adjust):
+        """Returns the series metadata dict, or None if nothing is cached."""
+        row = self._conn().execute(
+            "SELECT covers_from, first_date, last_date, rows, checked_at FROM series "
+            "WHERE ticker=? AND interval=? AND adjust=?", (ticker, interval, adjust)).fetchone()
+        if row is None:
+            return None
+        return {"covers_from": row[0], "first_date": row[1], "last_date": row[2],
+                "rows": row[3], "checked_at": row[4]}
+
+    def load(self, ticker, interval, adjust, start=None):
+        """Returns cached bars (optionally from `start`) as a DataFrame indexed by Date."""
+        conn = self._conn()
+        query = ("SELECT date, open, high, low, close, volume FROM bars "
+                 "WHERE ticker=? AND interval=? AND adjust=?")
+        params = [ticker, interval, adjust]
+        if start is not None:
+            query += " AND date >= ?"
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        query += " ORDER BY date"
+        df = pd.read_sql_query(query, conn, params=params)
+        with self.write_lock:
+            conn.execute("UPDATE series SET last_access=? WHERE ticker=? AND interval=? AND adjust=?",
+                         (time.time(), ticker, interval, adjust))
+            conn.commit()
+        df.columns = ['Date'] + OHLCV_COLUMNS
+        df['Date'] = pd.to_datetime(df['Date'])
+        return df.set_index('Date')
+
+    def tail(self, ticker, interval, adjust, n):
+        """Returns the last n cached bars."""
+        df = pd.read_sql_query(
+            "SELECT date, open, high, low, close, volume FROM bars WHERE ticker=? AND interval=? AND adjust=? "
+            "ORDER BY date DESC LIMIT ?", self._conn(), params=[ticker, interval, adjust, n])
+        df.columns = ['Date'] + OHLCV_COLUMNS
+        df['Date'] = pd.to_datetime(df['Date'])
+        return df.set_index('Date').sort_index()
+
+    def is_fresh(self, meta, now=None):
+        """
+        A series is fresh if it was checked against the source after the close of
+        the most recent completed session, so nothing new can have been published.
+        """
+        if not meta or meta["checked_at"] is None:
+            return False
+        last_close = session_close(last_completed_session(now))
+        return meta["checked_at"] >= last_close.timestamp()
+
+    # --- Writes ---
+    def store(self, ticker, interval, adjust, df, covers_from='', replace=False):
+        """
+        Upserts bars into the cache. With replace=True the existing history is
+        dropped first (e.g. after a split or dividend changed the adjustment).
+        """
+        df = self.normalize(df)
+        conn = self._conn()
+        key = (ticker, interval, adjust)
+        rows = [(ticker, interval, adjust, d.strftime('%Y-%m-%d'), *vals)
+                for d, vals in zip(df.index, df[OHLCV_COLUMNS].itertuples(index=False, name=None))]
+        with self.write_lock:
+            if replace:
+                conn.execute("DELETE FROM bars WHERE ticker=? AND interval=? AND adjust=?", key)
+            conn.executemany("INSERT OR REPLACE INTO bars VALUES (?,?,?,?,?,?,?,?,?)", rows)
+            first, last, count = conn.execute(
+                "SELECT MIN(date), MAX(date), COUNT(*) FROM bars WHERE ticker=? AND interval=? AND adjust=?",
+                key).fetchone()
+            old = conn.execute("SELECT covers_from FROM series WHERE ticker=? AND interval=? AND adjust=?",
+                               key).fetchone()
+            if old is not None and not replace:
+                covers_from = min(old[0], covers_from) # '' (full history) sorts first
+            now = time.time()
+            conn.execute("INSERT OR REPLACE INTO series VALUES (?,?,?,?,?,?,?,?,?)",
+                         (*key, covers_from, first, last, count, now, now))
+            conn.commit()
+            self.stores_since_evict += 1
+        if self.stores_since_evict >= 200:
+            self.evict()
+
+    def evict(self):
+        """Drops idle series, then least-recently-used ones until under max_rows."""
+        with self.write_lock:
+            conn = self._conn()
+            self.stores_since_evict = 0
+            cutoff = time.time() - self.max_idle_days * 86400
+            victims = conn.execute("SELECT ticker, interval, adjust FROM series WHERE last_access < ?",
+                                   (cutoff,)).fetchall()
+            total = conn.execute("SELECT COALESCE(SUM(rows), 0) FROM series").fetchone()[0]
+            if total > self.max_rows:
+                excess = total - int(self.max_rows * 0.9) # Evict down to 90% to avoid thrashing
+                for ticker, interval, adjust, rows in conn.execute(
+                        "SELECT ticker, interval, adjust, rows FROM series ORDER BY last_access"):
+                    if excess <= 0:
+                        break
+                    victims.append((ticker, interval, adjust))
+                    excess -= rows
+            for key in set(victims):
+                conn.execute("DELETE FROM bars WHERE ticker=? AND interval=? AND adjust=?", key)
+                conn.execute("DELETE FROM series WHERE ticker=? AND interval=? AND adjust=?", key)
+            conn.commit()
+        return len(victims)
+
+    @staticmethod
+    def normalize(df):
+        """Returns OHLCV columns indexed by naive (exchange-local) dates."""
+        df = df[[col for col in OHLCV_COLUMNS if col in df.columns]].copy()
+        for col in OHLCV_COLUMNS:
+            if col not in df.columns:
+                df[col] = float('nan')
+        index = pd.to_datetime(df.index)
+        if index.tz is not None:
+            index = index.tz_convert('Asia/Shanghai').tz_localize(None)
+        df.index = index.normalize()
+        df.index.name = 'Date'
+        df = df[~df.index.duplicated(keep='last')]
+        return df[OHLCV_COLUMNS].sort_index()
@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+
+# --- Scan Progress Journal ---
+# Append-only JSONL log of scan progress, written by the scan thread as each
+# ticker finishes (one line per ticker, holding any result rows it produced),
+# so an interrupted scan can resume exactly where it stopped. Every
+# compact_every lines the journal is rewritten as a single snapshot line.
+#
+# Line types:
+#   {"snapshot": <state>}                        full state (first line after compaction)
+#   {"ticker": "600000.SS", "rows": {key: row}}  a processed ticker and its rows
+#   {"sectors": [...]}                           selected sectors changed
+#   {"complete": true}                           the scan finished (a restart begins a new scan)
+#
+# <state> uses the save_progress schema of gui_china.py.
+
+PROGRESS_TABLES = ("oversold_signals", "filtered_oversold_signals",
+                   "overbought_signals", "filtered_overbought_signals")
+
+
+def empty_progress(selected_sectors=()):
+    """Returns an empty state in the save_progress schema."""
+    state = {"processed_tickers": []}
+    state.update({key: [] for key in PROGRESS_TABLES})
+    state["selected_sectors"] = list(selected_sectors)
+    return state
+
+
+class ProgressJournal:
+    """Crash-safe, append-only store of scan progress."""
+
+    def __init__(self, path, compact_every=5000, fsync_interval=1.0):
+        """
+        Args:
+            path: JSONL file the journal is written to
+            compact_every: Rewrite the journal as one snapshot after this many appended lines
+            fsync_interval: Seconds between fsyncs (lines are always flushed to the OS immediately)
+        """
+        self.path = path
+        self.compact_every = compact_every
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.file = None
+        self.appended = 0
+        self.last_fsync = 0.0
+        self._set_state(empty_progress())
+
+    def _set_state(self, state):
+        self.processed = set(state.get("processed_tickers", []))
+        self.tables = {key: {row["ticker"]: row for row in state.get(key, []) if row.get("ticker")}
+                       for key in PROGRESS_TABLES}
+        self.sectors = list(state.get("selected_sectors", []))
+        self.complete = False
+
+    def _snapshot(self):
+        state = {"processed_tickers": sorted(self.processed)}
+        state.update({key: list(rows.values()) for key, rows in self.tables.items()})
+        state["selected_sectors"] = list(self.sectors)
+        return state
+
+    def state(self):
+        """Returns the current progress in the save_progress schema."""
+        with self.lock:
+            return self._snapshot()
+
+    def _apply(self, entry):
+        if "snapshot" in entry:
+            self._set_state(entry["snapshot"])
+        elif "ticker" in entry:
+            self.processed.add(entry["ticker"])
+            for key, row in (entry.get("rows") or {}).items():
+                if key in self.tables:
+                    self.tables[key][entry["ticker"]] = row
+        elif "sectors" in entry:
+            self.sectors = list(entry["sectors"])
+        elif "complete" in entry:
+            self.complete = bool(entry["complete"])
+
+    def load(self):
+        """Replays the journal from disk and returns the recovered state."""
+        damaged = False
+        lines = 0
+        with self.lock:
+            self._set_state(empty_progress())
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        lines += 1
+                        if not line.endswith("\n"):
+                            damaged = True # Torn last write from a crash
+                            continue
+                        try:
+                            self._apply(json.loads(line))
+                        except (ValueError, TypeError, KeyError, AttributeError):
+                            damaged = True
+            self.appended = lines
+        if damaged or lines > self.compact_every:
+            self.compact() # Drop the damaged tail before appending after it
+        return self.state()
+
+    def _write(self, entry):
+        """Appends one line (caller holds the lock)."""
+        if self.file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.file = open(self.path, 'a', encoding='utf-8')
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+        now = time.monotonic()
+        if now - self.last_fsync >= self.fsync_interval:
+            os.fsync(self.file.fileno())
+            self.last_fsync = now
+        self.appended += 1
+
+    def record(self, ticker, rows=None):
+        """
+        Records a processed ticker together with the result rows it produced.
+
+        Args:
+            ticker: Ticker symbol
+            rows: Optional {table key: row dict} (keys from PROGRESS_TABLES)
+        """
+        entry = {"ticker": ticker}
+        if rows:
+            entry["rows"] = rows
+        with self.lock:
+            self._apply(entry)
+            self._write(entry)
+            should_compact = self.appended >= self.compact_every
+        if should_compact:
+            self.compact()
+
+    def set_sectors(self, selected_sectors):
+        entry = {"sectors": list(selected_sectors)}
+        with self.lock:
+            self._apply(entry)
+            self._write(entry)
+
+    def mark_complete(self):
+        """Records that the scan finished, so it is not resumed on the next start."""
+        entry = {"complete": True}
+        with self.lock:
+            self._apply(entry)
+            self._write(entry)
+            if self.file is not None:
+                os.fsync(self.file.fileno())
+
+    def replace(self, state):
+        """Replaces the whole journal with `state` (new scan, or progress loaded from a file)."""
+        with self.lock:
+            self._set_state(state)
+        self.compact()
+
+    def reset(self, selected_sectors=()):
+        """Starts an empty journal for a new scan."""
+        self.replace(empty_progress(selected_sectors))
+
+    def compact(self):
+        """Rewrites the journal as a single snapshot line (atomically)."""
+        with self.lock:
+            state = self._snapshot()
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({"snapshot": state}, ensure_ascii=False) + "\n")
+                if self.complete:
+                    f.write(json.dumps({"complete": True}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.appended = 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.file.close()
+                self.file = None
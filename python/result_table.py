@@ -0,0 +1,135 @@
+import bisect
+
+# --- Result Table Model ---
+# Holds scan result rows outside of Tk, one list per column, plus a view index
+# (the row numbers that pass the filter, in sort order). The GUI's Treeviews
+# only display a window of that index, so adding, sorting, saving and loading
+# rows never creates one Tk item per row.
+
+RESULT_COLUMNS = ("ticker", "daily", "weekly", "monthly", "market_cap", "earnings_growth", "sector")
+BOOL_COLUMNS = ("daily", "weekly", "monthly")
+NUMBER_COLUMNS = ("market_cap", "earnings_growth")
+
+
+def _clean_record(record):
+    """Coerces a row dict to the save_progress schema types."""
+    row = {}
+    for column in RESULT_COLUMNS:
+        value = record.get(column)
+        if column in BOOL_COLUMNS:
+            row[column] = bool(value)
+        elif column in NUMBER_COLUMNS:
+            try:
+                row[column] = float(value) if value not in (None, "") else 0.0
+            except (TypeError, ValueError):
+                row[column] = 0.0
+        else:
+            row[column] = "" if value is None else str(value)
+    return row
+
+
+class TableModel:
+    """Columnar store of result rows keyed by ticker, with sort and filter indexes."""
+
+    def __init__(self, columns=RESULT_COLUMNS, key="ticker"):
+        self.columns = tuple(columns)
+        self.key = key
+        self.clear()
+
+    def clear(self):
+        self.data = {column: [] for column in self.columns}
+        self.positions = {} # key -> row number
+        self.order = [] # Row numbers passing the filter (ascending by sort_column when sorted)
+        self.sort_keys = [] # sort_column value of each entry in self.order, for bisect
+        self.sort_column = None
+        self.sort_reverse = False
+        self.filter_text = ""
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def visible_count(self):
+        return len(self.order)
+
+    def _matches(self, row):
+        if not self.filter_text:
+            return True
+        return any(self.filter_text in self.data[column][row].lower()
+                   for column in (self.key, "sector") if column in self.data)
+
+    def add_rows(self, records):
+        """Appends rows whose key is not present yet. Returns the number added."""
+        new_rows = []
+        for record in records:
+            row = _clean_record(record)
+            if not row[self.key] or row[self.key] in self.positions:
+                continue
+            position = len(self.positions)
+            self.positions[row[self.key]] = position
+            for column in self.columns:
+                self.data[column].append(row[column])
+            new_rows.append(position)
+
+        if self.sort_column is not None and len(new_rows) > 64:
+            self._rebuild() # One sort beats many list inserts
+            return len(new_rows)
+        for position in new_rows:
+            if not self._matches(position):
+                continue
+            if self.sort_column is None:
+                self.order.append(position)
+            else:
+                sort_key = self.data[self.sort_column][position]
+                index = bisect.bisect_right(self.sort_keys, sort_key)
+                self.sort_keys.insert(index, sort_key)
+                self.order.insert(index, position)
+        return len(new_rows)
+
+    def _rebuild(self):
+        rows = [row for row in range(len(self.positions)) if self._matches(row)]
+        if self.sort_column is None:
+            self.order, self.sort_keys = rows, []
+            return
+        values = self.data[self.sort_column]
+        rows.sort(key=values.__getitem__)
+        self.order = rows
+        self.sort_keys = [values[row] for row in rows] # Ascending; reversed on read
+
+    def sort(self, column, reverse=None):
+        """Sorts the view by a column; calling it again on the same column flips the direction."""
+        if reverse is None:
+            reverse = not self.sort_reverse if column == self.sort_column else False
+        resort = column != self.sort_column
+        self.sort_column = column
+        self.sort_reverse = reverse
+        if resort:
+            self._rebuild()
+
+    def set_filter(self, text):
+        """Shows only rows whose ticker or sector contains `text` (case-insensitive)."""
+        self.filter_text = (text or "").strip().lower()
+        self._rebuild()
+
+    def rows(self, start, stop):
+        """Returns the visible rows [start, stop) as tuples in column order."""
+        if self.sort_column is not None and self.sort_reverse:
+            n = len(self.order)
+            start, stop = max(0, n - stop), max(0, n - start)
+            selected = reversed(self.order[start:stop])
+        else:
+            selected = self.order[start:stop]
+        return [tuple(self.data[column][row] for column in self.columns) for row in selected]
+
+    def records(self):
+        """Returns every row (ignoring sort and filter) as save_progress dicts, in insertion order."""
+        return [dict(zip(self.columns, values)) for values in zip(*(self.data[c] for c in self.columns))]
+
+    def load_records(self, records):
+        """Replaces the contents with saved rows, keeping the current sort and filter."""
+        sort_column, sort_reverse, filter_text = self.sort_column, self.sort_reverse, self.filter_text
+        self.clear()
+        self.sort_column, self.sort_reverse, self.filter_text = sort_column, sort_reverse, filter_text
+        self.add_rows(records)
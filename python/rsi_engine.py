@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+
+# --- Vectorized RSI Engine ---
+# Computes RSI for many tickers at once over an aligned (time x ticker) close
+# matrix. Results match pandas_ta's rsi() (without TA-Lib), which smooths gains
+# and losses with ewm(alpha=1/length, adjust=True, min_periods=length).
+#
+# Histories may be ragged: a NaN close means "no bar for this ticker on this
+# date" (not listed yet, suspended, or missing data). Each column is computed
+# as if its NaN rows had been dropped, exactly like the per-ticker path
+# dropna(subset=['Close']) + hist.ta.rsi(...).
+
+
+def build_close_matrix(histories, column='Close'):
+    """
+    Aligns the closes of many tickers on the union of their dates.
+
+    Args:
+        histories: Dict {ticker: DataFrame with a `column` column, or Series}
+    Returns:
+        (tickers, dates, closes) where closes is a float array of shape (len(dates), len(tickers))
+    """
+    series = {}
+    for ticker, hist in histories.items():
+        if hist is None or len(hist) == 0:
+            continue
+        s = hist[column] if isinstance(hist, pd.DataFrame) else hist
+        s = pd.to_numeric(s, errors='coerce')
+        index = pd.to_datetime(s.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        s = pd.Series(s.values, index=index)
+        series[ticker] = s[~s.index.duplicated(keep='last')]
+    if not series:
+        return [], pd.DatetimeIndex([]), np.empty((0, 0))
+    frame = pd.DataFrame(series).sort_index()
+    return list(frame.columns), frame.index, frame.to_numpy(dtype=float)
+
+
+def warmup_bars(length=14, tolerance=1e-3):
+    """
+    Bars after which the smoothed RSI no longer depends on what came before:
+    the `length` seed bars plus enough bars for the weight left on older ones,
+    (1 - 1/length) ** n, to fall below `tolerance`.
+    """
+    return int(np.ceil(np.log(tolerance) / np.log(1.0 - 1.0 / length))) + length
+
+
+def new_state(n_cols):
+    """
+    Returns an empty smoothing state for n_cols tickers. The state holds the
+    exponentially weighted gain/loss sums, their weight total (avg = sum / weight),
+    the number of price changes seen and the last close.
+    """
+    return {
+        "gain_sum": np.zeros(n_cols),
+        "loss_sum": np.zeros(n_cols),
+        "weight": np.zeros(n_cols),
+        "count": np.zeros(n_cols, dtype=np.int64),
+        "last_close": np.full(n_cols, np.nan),
+    }
+
+
+def _wilder_pass(closes, length, keep_history=False, state=None, record_states=None):
+    """
+    Single pass over the rows of a (T, N) close matrix, optionally continuing
+    from a previous state. Returns (rsi_history or None, latest_rsi, state)
+    where latest_rsi holds each column's most recent non-NaN RSI. If a dict is
+    passed as record_states, it is filled with the state after every row.
+    """
+    closes = np.asarray(closes, dtype=float)
+    if closes.ndim == 1:
+        closes = closes[:, None]
+    n_rows, n_cols = closes.shape
+    decay = 1.0 - 1.0 / length
+
+    state = new_state(n_cols) if state is None else state
+    prev_close = state["last_close"]
+    gain_sum = state["gain_sum"] # The weight total cancels in RSI = gains / (gains + losses)
+    loss_sum = state["loss_sum"]
+    weight = state["weight"]
+    count = state["count"].copy() # Number of price changes seen
+    latest = np.full(n_cols, np.nan)
+    history = np.full((n_rows, n_cols), np.nan) if keep_history else None
+    if record_states is not None:
+        for key, value in state.items():
+            record_states[key] = np.empty((n_rows, n_cols), dtype=value.dtype)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for t in range(n_rows):
+            row = closes[t]
+            valid = ~np.isnan(row)
+            step = valid & ~np.isnan(prev_close)
+            delta = np.where(step, row - prev_close, 0.0)
+            gain_sum = np.where(step, decay * gain_sum + np.maximum(delta, 0.0), gain_sum)
+            loss_sum = np.where(step, decay * loss_sum + np.maximum(-delta, 0.0), loss_sum)
+            weight = np.where(step, decay * weight + 1.0, weight)
+            count += step
+            prev_close = np.where(valid, row, prev_close)
+
+            ready = step & (count >= length)
+            rsi = np.where(ready, 100.0 * gain_sum / (gain_sum + loss_sum), np.nan)
+            has_rsi = ~np.isnan(rsi)
+            latest = np.where(has_rsi, rsi, latest)
+            if keep_history:
+                history[t] = rsi
+            if record_states is not None:
+                for key, value in (("gain_sum", gain_sum), ("loss_sum", loss_sum), ("weight", weight),
+                                   ("count", count), ("last_close", prev_close)):
+                    record_states[key][t] = value
+
+    state = {"gain_sum": gain_sum, "loss_sum": loss_sum, "weight": weight,
+             "count": count, "last_close": prev_close}
+    return history, latest, state
+
+
+def advance_state(state, closes, length=14):
+    """Feeds new closes (rows) into a state in O(rows). Returns (latest_rsi, new_state)."""
+    _, latest, state = _wilder_pass(closes, length, state=state)
+    return latest, state
+
+
+def state_rsi(state, length=14):
+    """RSI implied by a state (NaN where fewer than `length` price changes were seen)."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = 100.0 * state["gain_sum"] / (state["gain_sum"] + state["loss_sum"])
+    return np.where(state["count"] >= length, rsi, np.nan)
+
+
+def provisional_rsi(state, price, length=14):
+    """RSI if the next close were `price`, without modifying the state."""
+    price = np.asarray(price, dtype=float)
+    decay = 1.0 - 1.0 / length
+    delta = price - state["last_close"]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gains = decay * state["gain_sum"] + np.maximum(delta, 0.0)
+        losses = decay * state["loss_sum"] + np.maximum(-delta, 0.0)
+        rsi = 100.0 * gains / (gains + losses)
+    return np.where((state["count"] + 1 >= length) & ~np.isnan(delta), rsi, np.nan)
+
+
+def trigger_price(state, threshold, length=14):
+    """
+    Inverse of provisional_rsi: the next close at which the RSI would equal
+    `threshold`. RSI rises with the price, so RSI <= threshold exactly when the
+    close is <= this price. NaN where the RSI is undefined or the price would be <= 0.
+    """
+    decay = 1.0 - 1.0 / length
+    gains = decay * state["gain_sum"]
+    losses = decay * state["loss_sum"]
+    last_close = state["last_close"]
+    ratio = threshold / (100.0 - threshold) # gains / losses at the threshold
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Up move: (gains + d) / losses = ratio. Down move: gains / (losses + d) = ratio
+        price = np.where(gains <= ratio * losses,
+                         last_close + ratio * losses - gains,
+                         last_close + losses - gains / ratio)
+    valid = (state["count"] + 1 >= length) & ~np.isnan(last_close) & (gains + losses > 0) & (price > 0)
+    return np.where(valid, price, np.nan)
+
+
+def rsi_matrix(closes, length=14):
+    """Returns the RSI of every column of a (T, N) close matrix, NaN where undefined."""
+    history, _, _ = _wilder_pass(closes, length, keep_history=True)
+    return history
+
+
+def rsi_state_history(closes, length=14):
+    """
+    Returns the state after every row of a (T, N) close matrix, as a dict of
+    (T, N) arrays with the new_state() keys. Row t can be passed to
+    provisional_rsi() to evaluate a forming bar on top of bars 0..t.
+    """
+    states = {}
+    _wilder_pass(closes, length, record_states=states)
+    return states
+
+
+def latest_rsi(closes, length=14):
+    """Returns each column's most recent RSI (NaN if it never had enough bars)."""
+    _, latest, _ = _wilder_pass(closes, length)
+    return latest
+
+
+def multi_period_latest_rsi(closes, lengths):
+    """
+    Latest RSI of every column of a (T, N) close matrix for several RSI lengths
+    in one pass: the price changes and gain/loss arrays are computed once and
+    shared, and the smoothing runs on a (len(lengths), N) state.
+    Returns a (len(lengths), N) array (NaN where a column has too few bars).
+    """
+    closes = np.asarray(closes, dtype=float)
+    if closes.ndim == 1:
+        closes = closes[:, None]
+    lengths = np.asarray(lengths, dtype=float)[:, None]
+    decay = 1.0 - 1.0 / lengths
+
+    prev_close = pd.DataFrame(closes).ffill().shift(1).to_numpy() # Last close before each row, across gaps
+    step = ~np.isnan(closes) & ~np.isnan(prev_close)
+    delta = np.where(step, closes - prev_close, 0.0)
+    gains = np.maximum(delta, 0.0)
+    losses = np.maximum(-delta, 0.0)
+
+    gain_sum = np.zeros((len(lengths), closes.shape[1]))
+    loss_sum = np.zeros_like(gain_sum)
+    for t in np.flatnonzero(step.any(axis=1)):
+        gain_sum = np.where(step[t], decay * gain_sum + gains[t], gain_sum)
+        loss_sum = np.where(step[t], decay * loss_sum + losses[t], loss_sum)
+    count = step.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = 100.0 * gain_sum / (gain_sum + loss_sum)
+    return np.where(count >= lengths, rsi, np.nan)
+
+
+def add_rsi_column(hist, length=14):
+    """
+    Appends an RSI_{length} column to a single ticker's history (like hist.ta.rsi(append=True)).
+    One series needs no row loop: pandas' ewm gives the same smoothing as the matrix engine.
+    """
+    closes = pd.to_numeric(hist['Close'], errors='coerce')
+    valid = closes.dropna() # NaN rows are skipped, as in the matrix engine
+    delta = valid.diff()
+    gains = delta.clip(lower=0.0).ewm(alpha=1.0 / length, adjust=True, min_periods=length).mean()
+    losses = (-delta).clip(lower=0.0).ewm(alpha=1.0 / length, adjust=True, min_periods=length).mean()
+    hist[f'RSI_{length}'] = (100.0 * gains / (gains + losses)).reindex(closes.index)
+    return hist
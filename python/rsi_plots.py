@@ -0,0 +1,53 @@
+import os
+
+# --- RSI Plot Rendering ---
+# Renders the D/W/M RSI figure of one ticker. Kept free of the scanner's
+# imports so plot worker processes start quickly; run_china_scan_and_plot
+# submits one job per signal as soon as it is found.
+
+
+def trim_for_plot(history, rsi_column):
+    """Reduces {timeframe: history DataFrame} to the RSI series the plot draws."""
+    return {name: hist[rsi_column].dropna() for name, hist in history.items() if rsi_column in hist.columns}
+
+
+def render_rsi_plot(ticker_symbol, rsi_series, rsi_period, oversold_threshold, overbought_threshold,
+                    intervals, output_dir=None):
+    """
+    Saves a figure with one RSI panel per timeframe using the Agg backend.
+
+    Args:
+        ticker_symbol: Ticker shown in the title and file name
+        rsi_series: {timeframe name: RSI Series indexed by date}
+        intervals: {timeframe name: interval label for the panel title, e.g. '1d'}
+        output_dir: Directory for the PNG (default: the working directory)
+    Returns:
+        Path of the saved PNG
+    """
+    import matplotlib
+    matplotlib.use("Agg") # No display needed; safe in worker processes
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(len(intervals), 1, figsize=(12, 8), sharex=False, squeeze=False)
+    fig.suptitle(f'RSI ({rsi_period}) for {ticker_symbol} (Oversold on D/W/M)', fontsize=16)
+    try:
+        for i, (name, rsi) in enumerate(rsi_series.items()):
+            ax = axes[i][0]
+            ax.plot(rsi.index, rsi.values, label=f'{name} RSI')
+            ax.axhline(oversold_threshold, color='red', linestyle='--', linewidth=1, label=f'Oversold ({oversold_threshold})')
+            ax.axhline(overbought_threshold, color='green', linestyle=':', linewidth=1, label=f'Overbought ({overbought_threshold})')
+            ax.set_title(f'{name} Chart ({intervals.get(name, "")})')
+            ax.set_ylabel('RSI')
+            ax.legend()
+            ax.grid(True)
+            plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
+
+        plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+        plot_filename = f"{ticker_symbol}_rsi_plot.png"
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            plot_filename = os.path.join(output_dir, plot_filename)
+        plt.savefig(plot_filename)
+        return plot_filename
+    finally:
+        plt.close(fig)
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+from rsi_engine import new_state, advance_state, provisional_rsi
+
+# --- Incremental RSI State ---
+# Persists the RSI smoothing state per (ticker, timeframe, period) so re-scans
+# only feed the bars that arrived since the last run. The newest bar is never
+# committed: it may still be forming (today's session, the current week or
+# month), so it is applied provisionally on top of the stored state.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rsi_state (
+    ticker TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    period INTEGER NOT NULL,
+    gain_sum REAL, loss_sum REAL, weight REAL,
+    count INTEGER,
+    last_close REAL,
+    last_ts TEXT,          -- date of the last committed bar
+    PRIMARY KEY (ticker, timeframe, period)
+);
+"""
+
+ADJUSTMENT_TOLERANCE = 1e-6 # Relative change of the last committed close that forces a full recompute
+
+
+class RSIStateStore:
+    """SQLite-backed store of per-ticker, per-timeframe RSI smoothing state."""
+
+    def __init__(self, path):
+        self.path = path
+        self.write_lock = threading.Lock()
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL") # Losing the last few updates only costs a recompute
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        """Returns this thread's connection (sqlite connections are per-thread)."""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self.local.conn = conn
+        return conn
+
+    def get(self, ticker, timeframe, period):
+        """Returns (state, last_ts) for one series, or (None, None) if nothing is stored."""
+        row = self._conn().execute(
+            "SELECT gain_sum, loss_sum, weight, count, last_close, last_ts FROM rsi_state "
+            "WHERE ticker=? AND timeframe=? AND period=?", (ticker, timeframe, period)).fetchone()
+        if row is None:
+            return None, None
+        state = {
+            "gain_sum": np.array([row[0]]),
+            "loss_sum": np.array([row[1]]),
+            "weight": np.array([row[2]]),
+            "count": np.array([row[3]], dtype=np.int64),
+            "last_close": np.array([row[4]]),
+        }
+        return state, pd.Timestamp(row[5])
+
+    def put(self, ticker, timeframe, period, state, last_ts):
+        """Stores the state of one series (1-element state arrays)."""
+        with self.write_lock:
+            conn = self._conn()
+            conn.execute("INSERT OR REPLACE INTO rsi_state VALUES (?,?,?,?,?,?,?,?,?)",
+                         (ticker, timeframe, period,
+                          float(state["gain_sum"][0]), float(state["loss_sum"][0]), float(state["weight"][0]),
+                          int(state["count"][0]), float(state["last_close"][0]),
+                          pd.Timestamp(last_ts).strftime('%Y-%m-%d')))
+            conn.commit()
+
+    def latest_rsi(self, ticker, timeframe, hist, period):
+        """
+        Returns the RSI at the last bar of `hist`, updating the stored state with
+        any newly completed bars. Falls back to a full recompute when there is no
+        state, or when the close of the last committed bar changed (a split or
+        dividend re-adjusted the history). Returns NaN if there are too few bars.
+        """
+        closes = pd.to_numeric(hist['Close'], errors='coerce').dropna()
+        if len(closes) < 2:
+            return float('nan')
+        dates = pd.to_datetime(closes.index)
+        if dates.tz is not None:
+            dates = dates.tz_localize(None)
+        dates = dates.normalize()
+        values = closes.to_numpy(dtype=float)
+        committed_dates, committed = dates[:-1], values[:-1]
+
+        state, last_ts = self.get(ticker, timeframe, period)
+        new_rows = None
+        if state is not None:
+            position = committed_dates.searchsorted(last_ts)
+            if position < len(committed_dates) and committed_dates[position] == last_ts:
+                stored_close = state["last_close"][0]
+                if abs(committed[position] - stored_close) <= ADJUSTMENT_TOLERANCE * abs(stored_close):
+                    new_rows = committed[position + 1:]
+        if new_rows is None:
+            state, new_rows = new_state(1), committed # Full recompute
+
+        if len(new_rows):
+            _, state = advance_state(state, new_rows, period)
+            self.put(ticker, timeframe, period, state, committed_dates[-1])
+        return float(provisional_rsi(state, values[-1], period)[0])
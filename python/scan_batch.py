@@ -0,0 +1,365 @@
+import json
+import csv
+import glob
+import hashlib
+import os
+import socket
+import sys
+import time
+import zlib
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import main_china
+from main_china import (
+    get_ticker_universe, load_scan_tickers, configure_data_sources, get_fundamentals_store,
+    SOURCE_GUARDS, MAX_WORKERS
+)
+from progress_journal import PROGRESS_TABLES, empty_progress
+from result_table import RESULT_COLUMNS
+from scan_pipeline import run_staged_scan
+from trading_calendar import now_market
+from universe import EXCHANGE_PREFIXES
+
+# --- Headless Batch Scan ---
+# Runs the GUI's staged scan without Tk. The universe is split into shards,
+# each scanned by its own process (with MAX_WORKERS fetch threads inside), and
+# the partial results are merged into one deterministic file in the
+# save_progress schema, so it can also be opened with the GUI's "Load Progress".
+#
+# Several hosts can split one run: each scans the slice of the universe given
+# by --shard-index/--shard-count (by ticker hash or exchange prefix) and writes
+# a partial file plus a manifest into a shared directory (any mounted or synced
+# folder; a local directory works for testing). `scan_batch.py merge` then
+# combines the partials of a run into one result file.
+
+DEFAULT_PROCESSES = 4
+DEFAULT_OUTPUT = "scan_results.json"
+
+EXIT_OK = 0
+EXIT_SHARD_FAILED = 1 # At least one shard crashed or is missing; the output holds the others
+EXIT_INTERRUPTED = 130
+
+# Exchange prefixes in a fixed order, so prefix sharding does not depend on the universe
+SHARD_PREFIXES = sorted(prefix for prefixes in EXCHANGE_PREFIXES.values() for prefix in prefixes)
+
+
+def shard_tickers(tickers, shard_count):
+    """Splits tickers into shard_count deterministic shards (round-robin over sorted order)."""
+    tickers = sorted(set(tickers))
+    return [tickers[i::shard_count] for i in range(shard_count)]
+
+
+def shard_of(ticker, shard_count, shard_by="hash"):
+    """
+    Returns the host shard a ticker belongs to. Both schemes only look at the
+    ticker itself, so hosts agree on the split even if their listings differ.
+        hash:   crc32 of the symbol (balanced)
+        prefix: exchange prefix (600, 000, 300, ...), keeping each board on one host
+    """
+    if shard_by == "prefix" and ticker[:3] in SHARD_PREFIXES:
+        return SHARD_PREFIXES.index(ticker[:3]) % shard_count
+    return zlib.crc32(ticker.encode("utf-8")) % shard_count
+
+
+def host_slice(tickers, shard_index, shard_count, shard_by="hash"):
+    """Returns the tickers scanned by host shard `shard_index` of `shard_count`."""
+    return [t for t in tickers if shard_of(t, shard_count, shard_by) == shard_index]
+
+
+def merge_progress(states):
+    """
+    Merges save_progress dicts into one: processed tickers are unioned and each
+    table keeps one row per ticker. Everything is sorted, so the same inputs
+    always produce the same output regardless of completion order.
+    """
+    processed = set()
+    sectors = set()
+    tables = {key: {} for key in PROGRESS_TABLES}
+    for state in states:
+        processed.update(state.get("processed_tickers", []))
+        sectors.update(state.get("selected_sectors", []))
+        for key in PROGRESS_TABLES:
+            for row in state.get(key, []):
+                tables[key].setdefault(row["ticker"], row)
+    merged = {"processed_tickers": sorted(processed)}
+    merged.update({key: [rows[t] for t in sorted(rows)] for key, rows in tables.items()})
+    merged["selected_sectors"] = sorted(sectors)
+    return merged
+
+
+def write_json(path, state):
+    """Writes a save_progress dict (atomically)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def partial_paths(shared_dir, run_id, shard_index, shard_count):
+    """Returns (partial file, manifest file) for one host shard of a run."""
+    stem = os.path.join(shared_dir, run_id, f"part-{shard_index:03d}-of-{shard_count:03d}")
+    return stem + ".json", stem + ".manifest.json"
+
+
+def write_partial(shared_dir, run_id, shard_index, shard_count, shard_by, state, status, started_at, tickers):
+    """
+    Writes a host shard's results and then its manifest. The manifest is written
+    last, so a partial without one (host died mid-write) is ignored by merge.
+    """
+    partial_path, manifest_path = partial_paths(shared_dir, run_id, shard_index, shard_count)
+    write_json(partial_path, state)
+    manifest = {
+        "run_id": run_id,
+        "shard_index": shard_index,
+        "shard_count": shard_count,
+        "shard_by": shard_by,
+        "status": status,
+        "host": socket.gethostname(),
+        "tickers": tickers,
+        "processed": len(state["processed_tickers"]),
+        "partial_file": os.path.basename(partial_path),
+        "sha256": file_sha256(partial_path),
+        "started_at": started_at,
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    write_json(manifest_path, manifest)
+    return partial_path
+
+
+def write_csv(path, state):
+    """Writes every table row as CSV with a leading 'table' column."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(("table",) + RESULT_COLUMNS)
+        for key in PROGRESS_TABLES:
+            for row in state[key]:
+                writer.writerow([key] + [row.get(column, "") for column in RESULT_COLUMNS])
+    os.replace(tmp_path, path)
+
+
+def _init_worker(processes, replay_dir):
+    """Process setup: split each source's rate limit across the processes and apply --replay."""
+    for guard in SOURCE_GUARDS.values():
+        guard.set_max_rate(guard.max_rate / processes)
+    if replay_dir:
+        configure_data_sources("replay", local_dir=replay_dir)
+        main_china.USE_OHLCV_CACHE = False # Replays read straight from the snapshot
+        main_china.USE_BATCH_DOWNLOAD = False
+
+
+def scan_shard(shard_index, tickers, selected_sectors=(), show_all_sectors=True, threads=MAX_WORKERS):
+    """
+    Scans one shard in the current process. Returns a dict with 'shard',
+    'progress' (save_progress schema), 'dead' (tickers without data) and 'errors'.
+    """
+    progress = empty_progress(selected_sectors)
+    dead = []
+    errors = 0
+    for event, ticker_symbol, result, error in run_staged_scan(
+            tickers, selected_sectors, show_all_sectors, max_workers=threads):
+        if event == "screened":
+            if error is not None or result["fetch_error"]:
+                errors += 1
+            if error is None and result["no_data"] and not result["fetch_error"]:
+                dead.append(ticker_symbol)
+            if error is not None or not result["survivor"]:
+                progress["processed_tickers"].append(ticker_symbol)
+        elif event == "checked":
+            progress["processed_tickers"].append(ticker_symbol)
+            if error is not None:
+                errors += 1
+                print(f"  Error processing {ticker_symbol}: {error}")
+                continue
+            for key, row in result["rows"].items():
+                progress[key].append(row)
+    get_fundamentals_store().save()
+    return {"shard": shard_index, "progress": progress, "dead": dead, "errors": errors}
+
+
+def run_batch_scan(processes=DEFAULT_PROCESSES, shards=None, threads=MAX_WORKERS, selected_sectors=(),
+                   output=None, csv_output=None, replay_dir=None, shard_index=None, shard_count=None,
+                   shard_by="hash", shared_dir=None, run_id=None):
+    """
+    Scans the live universe (or this host's slice of it) on a process pool and
+    writes the merged results. Returns an exit code.
+
+    Args:
+        shard_index, shard_count: Scan only host shard shard_index of shard_count
+        shard_by: 'hash' or 'prefix' (see shard_of)
+        shared_dir: Write the partial file and manifest under shared_dir/run_id/
+        run_id: Name of the run shared by all hosts (default: today's date)
+    """
+    universe = get_ticker_universe()
+    tickers = load_scan_tickers()
+    started_at = datetime.now().isoformat(timespec="seconds")
+    if shard_count:
+        tickers = host_slice(tickers, shard_index, shard_count, shard_by)
+        print(f"Host shard {shard_index + 1}/{shard_count} (by {shard_by}): {len(tickers)} tickers")
+    if output is None and shared_dir is None:
+        output = DEFAULT_OUTPUT
+    shards = shards or processes
+    show_all_sectors = not selected_sectors
+    print(f"Scanning {len(tickers)} live tickers (source: {universe.source}) in {shards} shards "
+          f"on {processes} processes x {threads} threads...")
+
+    start_time = time.monotonic()
+    partials = []
+    failed_shards = []
+    exit_code = EXIT_OK
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(processes, replay_dir)) as pool:
+            futures = {pool.submit(scan_shard, i, shard, sorted(selected_sectors), show_all_sectors, threads): i
+                       for i, shard in enumerate(shard_tickers(tickers, shards))}
+            for future in as_completed(futures):
+                pool_shard = futures[future]
+                try:
+                    partial = future.result()
+                except Exception as e:
+                    print(f"Shard {pool_shard} FAILED: {e}")
+                    failed_shards.append(pool_shard)
+                    continue
+                partials.append(partial)
+                print(f"Shard {pool_shard} done: {len(partial['progress']['processed_tickers'])} tickers, "
+                      f"{len(partial['progress']['oversold_signals'])} oversold, {partial['errors']} errors")
+    except KeyboardInterrupt:
+        print("Interrupted, writing the shards that finished.")
+        exit_code = EXIT_INTERRUPTED
+
+    for partial in partials:
+        for ticker_symbol in partial["dead"]:
+            universe.mark_dead(ticker_symbol)
+    universe.save_dead()
+
+    merged = merge_progress([partial["progress"] for partial in partials])
+    merged["selected_sectors"] = sorted(selected_sectors)
+    outputs = []
+    if shared_dir:
+        status = "complete" if exit_code == EXIT_OK and not failed_shards else "incomplete"
+        outputs.append(write_partial(shared_dir, run_id or now_market().strftime('%Y%m%d'),
+                                     shard_index or 0, shard_count or 1, shard_by, merged, status,
+                                     started_at, len(tickers)))
+    if output:
+        write_json(output, merged)
+        outputs.append(output)
+    if csv_output:
+        write_csv(csv_output, merged)
+        outputs.append(csv_output)
+
+    elapsed = time.monotonic() - start_time
+    processed = len(merged["processed_tickers"])
+    print(f"\n--- Batch Scan Complete --- {processed} tickers in {elapsed:.1f}s "
+          f"({processed / elapsed if elapsed else 0:.1f} tickers/s)")
+    print(f"Oversold: {len(merged['oversold_signals'])} ({len(merged['filtered_oversold_signals'])} filtered), "
+          f"Overbought: {len(merged['overbought_signals'])} ({len(merged['filtered_overbought_signals'])} filtered), "
+          f"Errors: {sum(partial['errors'] for partial in partials)}")
+    print(f"Results written to {', '.join(outputs)}")
+    if failed_shards and exit_code == EXIT_OK:
+        print(f"{len(failed_shards)} shard(s) failed: {sorted(failed_shards)}")
+        exit_code = EXIT_SHARD_FAILED
+    return exit_code
+
+
+def merge_run(shared_dir, run_id, output=DEFAULT_OUTPUT, csv_output=None):
+    """
+    Merges the partial files of a multi-host run into one result file. Partials
+    without a manifest, or whose checksum does not match it, are ignored. When a
+    shard was written more than once (e.g. re-run on another host), the latest
+    complete one wins. Returns EXIT_SHARD_FAILED if any shard is missing.
+    """
+    run_dir = os.path.join(shared_dir, run_id)
+    chosen = {} # shard_index -> manifest
+    shard_counts = set()
+    for manifest_path in sorted(glob.glob(os.path.join(run_dir, "*.manifest.json"))):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable manifest {manifest_path}: {e}")
+            continue
+        partial_path = os.path.join(run_dir, manifest["partial_file"])
+        if not os.path.exists(partial_path) or file_sha256(partial_path) != manifest["sha256"]:
+            print(f"Skipping {manifest['partial_file']}: missing or checksum mismatch")
+            continue
+        shard_counts.add(manifest["shard_count"])
+        current = chosen.get(manifest["shard_index"])
+        rank = (manifest["status"] == "complete", manifest["finished_at"])
+        if current is None or rank > (current["status"] == "complete", current["finished_at"]):
+            chosen[manifest["shard_index"]] = manifest
+
+    if len(shard_counts) > 1:
+        print(f"Run {run_id} mixes different shard counts {sorted(shard_counts)}; merging anyway.")
+    shard_count = max(shard_counts) if shard_counts else 0
+    states = []
+    for shard_index in sorted(chosen):
+        manifest = chosen[shard_index]
+        with open(os.path.join(run_dir, manifest["partial_file"]), 'r', encoding='utf-8') as f:
+            states.append(json.load(f))
+        print(f"  Shard {shard_index}: {manifest['processed']}/{manifest['tickers']} tickers from "
+              f"{manifest['host']} ({manifest['status']})")
+
+    merged = merge_progress(states)
+    write_json(output, merged)
+    if csv_output:
+        write_csv(csv_output, merged)
+
+    missing = sorted(set(range(shard_count)) - set(chosen))
+    incomplete = sorted(i for i, m in chosen.items() if m["status"] != "complete")
+    print(f"Merged {len(chosen)}/{shard_count} shards of run {run_id}: {len(merged['processed_tickers'])} tickers, "
+          f"{len(merged['oversold_signals'])} oversold, {len(merged['overbought_signals'])} overbought -> {output}")
+    if missing or incomplete or not chosen:
+        print(f"Missing shards: {missing}, incomplete shards: {incomplete}")
+        return EXIT_SHARD_FAILED
+    return EXIT_OK
+
+
+# --- Guard for Direct Execution ---
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Headless Daily-first RSI scan of Chinese A-shares on a process pool.")
+    parser.add_argument("command", nargs="?", choices=["scan", "merge"], default="scan",
+                        help="'scan' (default) or 'merge' the partial files of a multi-host run")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES, help="Number of scan processes")
+    parser.add_argument("--shards", type=int, help="Number of ticker shards per host (default: one per process)")
+    parser.add_argument("--threads", type=int, default=MAX_WORKERS, help="Fetch threads per process")
+    parser.add_argument("--sectors", default="", help="Comma-separated sector keys for the filtered tables (default: all sectors)")
+    parser.add_argument("--output", help=f"Merged results in the GUI's save_progress JSON format (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--csv", help="Also write the merged rows as CSV")
+    parser.add_argument("--refresh-universe", action="store_true", help="Re-download the listed-symbol snapshot from akshare")
+    parser.add_argument("--universe-file", help="Load the listed-symbol snapshot from a local CSV/TXT/JSON file")
+    parser.add_argument("--replay", metavar="DIR", help="Read bars only from a recorded local snapshot (no network, no cache)")
+    parser.add_argument("--shard-index", type=int, default=0, help="This host's shard (0-based)")
+    parser.add_argument("--shard-count", type=int, help="Number of hosts splitting the universe")
+    parser.add_argument("--shard-by", choices=["hash", "prefix"], default="hash", help="How tickers are split across hosts")
+    parser.add_argument("--shared-dir", help="Shared directory for partial files and manifests")
+    parser.add_argument("--run-id", help="Run name shared by all hosts (default: today's date)")
+    args = parser.parse_args()
+
+    if args.command == "merge":
+        if not args.shared_dir:
+            parser.error("merge needs --shared-dir")
+        sys.exit(merge_run(args.shared_dir, args.run_id or now_market().strftime('%Y%m%d'),
+                           output=args.output or DEFAULT_OUTPUT, csv_output=args.csv))
+    if args.shard_count and not 0 <= args.shard_index < args.shard_count:
+        parser.error("--shard-index must be between 0 and --shard-count - 1")
+
+    if args.universe_file:
+        print(f"Loaded {len(get_ticker_universe().load_file(args.universe_file))} tickers from {args.universe_file}")
+    elif args.refresh_universe:
+        print(f"Refreshed listing: {len(get_ticker_universe().refresh())} tickers")
+    sectors = {s.strip() for s in args.sectors.split(",") if s.strip()}
+    sys.exit(run_batch_scan(processes=max(1, args.processes), shards=args.shards, threads=args.threads,
+                            selected_sectors=sectors, output=args.output, csv_output=args.csv,
+                            replay_dir=args.replay, shard_index=args.shard_index, shard_count=args.shard_count,
+                            shard_by=args.shard_by, shared_dir=args.shared_dir, run_id=args.run_id))
@@ -0,0 +1,214 @@
+import pandas as pd
+
+import main_china
+from fetch_engine import run_concurrent_batches
+from main_china import (
+    TimeframeData, compute_latest_rsi, prefetch_histories, get_fundamentals_store, get_scan_stats,
+    fetch_status, FETCH_NO_DATA,
+    RSI_PERIOD, OVERSOLD_THRESHOLD, OVERBOUGHT_THRESHOLD, MAX_WORKERS, BATCH_SIZE
+)
+
+# --- Staged Scan Pipeline ---
+# The Daily-first oversold/overbought scan used by the GUI (gui_china.py) and
+# the headless batch CLI (scan_batch.py).
+#   Stage 1 screens the Daily RSI of every ticker.
+#   Stage 2 checks Weekly/Monthly RSI and fundamentals for the tickers whose
+#   Daily RSI is oversold (<= OVERSOLD_THRESHOLD) or overbought (> OVERBOUGHT_THRESHOLD).
+# Stage 1 only downloads the Daily RSI window; in derived mode (DERIVE_FROM_DAILY)
+# survivors are then fetched again with the long window their Weekly/Monthly
+# resampling needs, which the OHLCV cache extends in place.
+# Result rows use the save_progress schema (see progress_journal.PROGRESS_TABLES).
+
+
+def clean_history(hist):
+    """Returns hist with a datetime index and numeric, non-NaN closes (None if too short)."""
+    if hist is None or hist.empty or len(hist) < RSI_PERIOD:
+        return None
+    hist.index = pd.to_datetime(hist.index)
+    hist['Close'] = pd.to_numeric(hist['Close'], errors='coerce')
+    hist.dropna(subset=['Close'], inplace=True)
+    return hist if not hist.empty else None
+
+
+def screen_daily(ticker_symbol, prefetched=None):
+    """
+    Stage 1: computes the Daily RSI of one ticker.
+    Returns a dict with 'fetch_error', 'no_data' (only set when every source
+    answered without bars, never on errors), 'rsi' and 'survivor' (Daily RSI
+    oversold or overbought).
+    """
+    timeframe_data = TimeframeData(ticker_symbol, prefetched=prefetched, timeframes=["Daily"])
+    hist = timeframe_data.get("Daily")
+    no_data = fetch_status(hist) == FETCH_NO_DATA # Every source answered without bars (not an error)
+    result = {"fetch_error": not no_data, "no_data": no_data,
+              "rsi": None, "survivor": False}
+    with get_scan_stats().time("clean", "Daily"):
+        hist = clean_history(hist)
+    if hist is None:
+        return result
+
+    latest_rsi = compute_latest_rsi(ticker_symbol, "Daily", hist)
+    if pd.isna(latest_rsi):
+        return result
+    result["fetch_error"] = False
+    result["rsi"] = float(latest_rsi)
+    result["survivor"] = bool(latest_rsi <= OVERSOLD_THRESHOLD or latest_rsi > OVERBOUGHT_THRESHOLD)
+    return result
+
+
+def _signal_row(ticker_symbol, info, daily, weekly, monthly):
+    return {
+        "ticker": ticker_symbol,
+        "daily": daily,
+        "weekly": weekly,
+        "monthly": monthly,
+        "market_cap": (info.get('marketCap') or 0) / 100000000, # In 亿
+        "earnings_growth": info.get('earningsGrowth') or 0,
+        "sector": info.get('sector') or ''
+    }
+
+
+def scan_survivor(ticker_symbol, daily_rsi, selected_sectors, show_all_sectors, prefetched=None):
+    """
+    Stage 2: checks Weekly/Monthly RSI for a ticker that passed the Daily screen.
+    Returns a dict with 'oversold', 'rows' ({table key: row}) and 'log' (lines).
+    """
+    weekly_monthly_rsi = {"Weekly": float("nan"), "Monthly": float("nan")} # NaN compares False
+    timeframe_data = TimeframeData(ticker_symbol, prefetched=prefetched, timeframes=["Weekly", "Monthly"])
+    stats = get_scan_stats()
+    for name in weekly_monthly_rsi:
+        hist = timeframe_data.get(name)
+        with stats.time("clean", name):
+            hist = clean_history(hist)
+        if hist is not None:
+            weekly_monthly_rsi[name] = compute_latest_rsi(ticker_symbol, name, hist)
+
+    fundamentals = get_fundamentals_store()
+    result = {"oversold": False, "rows": {}, "log": []}
+
+    if daily_rsi <= OVERSOLD_THRESHOLD:
+        result["oversold"] = True
+        result["log"].append(f"  -> Found signal: {ticker_symbol}")
+        info = fundamentals.get(ticker_symbol)
+        row = _signal_row(ticker_symbol, info, True,
+                          bool(weekly_monthly_rsi["Weekly"] <= OVERSOLD_THRESHOLD),
+                          bool(weekly_monthly_rsi["Monthly"] <= OVERSOLD_THRESHOLD))
+        result["rows"]["oversold_signals"] = row
+        # Check if the stock meets the filter criteria
+        if filter_stock_by_market_cap_and_earnings(info, selected_sectors, show_all_sectors):
+            result["rows"]["filtered_oversold_signals"] = row
+
+    # Check for overbought conditions
+    if daily_rsi > OVERBOUGHT_THRESHOLD:
+        result["log"].append(f"  -> Found overbought signal: {ticker_symbol}")
+        info = fundamentals.get(ticker_symbol)
+        row = _signal_row(ticker_symbol, info, True,
+                          bool(weekly_monthly_rsi["Weekly"] > OVERBOUGHT_THRESHOLD),
+                          bool(weekly_monthly_rsi["Monthly"] > OVERBOUGHT_THRESHOLD))
+        result["rows"]["overbought_signals"] = row
+        if filter_stock_by_market_cap_and_earnings(info, selected_sectors, show_all_sectors):
+            result["rows"]["filtered_overbought_signals"] = row
+
+    return result
+
+
+def run_staged_scan(tickers, selected_sectors=(), show_all_sectors=True, max_workers=MAX_WORKERS,
+                    should_stop=None, is_paused=None):
+    """
+    Runs both stages over `tickers` and yields (event, ticker, result, error) tuples:
+        ("screened", ticker, screen_daily result, error)   once per ticker
+        ("stage2", None, number of survivors, None)        when stage 1 has finished
+        ("checked", ticker, scan_survivor result, error)   once per survivor
+    A ticker is finished after its "screened" event unless result["survivor"]
+    is set, in which case it finishes with its "checked" event.
+    """
+    selected_sectors = set(selected_sectors)
+    should_stop = should_stop or (lambda: False)
+    # Switches are read from main_china at call time (--replay turns batching off)
+    batch_size = BATCH_SIZE if main_china.USE_BATCH_DOWNLOAD else 1
+    survivors = {} # ticker -> stage 1 result
+
+    def daily_batch_worker(batch):
+        prefetched = prefetch_histories(batch, ["Daily"])
+        results = {}
+        for ticker_symbol in batch:
+            try:
+                results[ticker_symbol] = screen_daily(ticker_symbol, prefetched.get(ticker_symbol))
+            except Exception as e:
+                results[ticker_symbol] = e
+        return results
+
+    for ticker_symbol, result, error in run_concurrent_batches(
+            tickers, daily_batch_worker, batch_size, max_workers=max_workers,
+            should_stop=should_stop, is_paused=is_paused):
+        if error is None and result["survivor"]:
+            survivors[ticker_symbol] = result
+        yield "screened", ticker_symbol, result, error
+
+    if should_stop() or not survivors:
+        return
+    yield "stage2", None, len(survivors), None
+
+    def survivor_batch_worker(batch):
+        prefetched = prefetch_histories(batch, ["Weekly", "Monthly"]) # Derived mode: the long Daily window
+        results = {}
+        for ticker_symbol in batch:
+            try:
+                results[ticker_symbol] = scan_survivor(
+                    ticker_symbol, survivors[ticker_symbol]["rsi"], selected_sectors,
+                    show_all_sectors, prefetched.get(ticker_symbol))
+            except Exception as e:
+                results[ticker_symbol] = e
+        return results
+
+    for ticker_symbol, result, error in run_concurrent_batches(
+            list(survivors), survivor_batch_worker, batch_size, max_workers=max_workers,
+            should_stop=should_stop, is_paused=is_paused):
+        yield "checked", ticker_symbol, result, error
+
+
+def filter_stock_by_market_cap_and_earnings(info, selected_sectors=None, show_all_sectors=False):
+    """
+    Filter stocks based on market cap (100-300亿), earnings growth, and sector.
+    Returns True if the stock meets the criteria, False otherwise.
+
+    Args:
+        info: Fundamentals dict (marketCap, earningsGrowth, sector) from the fundamentals store
+        selected_sectors: Set of selected sector keys
+        show_all_sectors: Boolean indicating whether to show all sectors without filtering
+    """
+    try:
+        market_cap = info.get('marketCap') or 0
+        # Convert market cap to 亿 (100 million)
+        market_cap_billion = market_cap / 100000000
+        if not (100 <= market_cap_billion <= 300):
+            return False
+        # Check for earnings growth (assuming 'earningsGrowth' is available)
+        earnings_growth = info.get('earningsGrowth') or 0
+        if earnings_growth <= 0:
+            return False
+
+        # Skip sector filtering if show_all_sectors is True
+        if show_all_sectors:
+            return True
+
+        # Check sector if sectors are selected
+        if selected_sectors:
+            sector = (info.get('sector') or '').lower()
+            # Map sector to yfinance sector key
+            sector_mapping = {
+                'consumer cyclical': 'consumer-cyclical',
+                'consumer defensive': 'consumer-defensive',
+                'financial services': 'financial-services',
+                'communication services': 'communication-services',
+                'basic materials': 'basic-materials',
+                'real estate': 'real-estate'
+            }
+            sector_key = sector_mapping.get(sector, sector.replace(' ', '-'))
+            if sector_key not in selected_sectors:
+                return False
+
+        return True
+    except Exception as e:
+        print(f"Error filtering stock: {e}")
+        return False
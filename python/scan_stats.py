@@ -0,0 +1,168 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# --- Scan Statistics ---
+# Counters and latency histograms for each stage of a scan, keyed by
+# (stage, label), e.g. ("fetch", "yfinance/1d"), ("info", "yfinance"),
+# ("clean", "Daily") or ("rsi", "Weekly"), plus scan progress for the
+# throughput and ETA. Recording is one perf_counter() pair and a short lock,
+# so it stays on in production runs. The GUI shows summary_lines() in its
+# "Scan Stats" tab and both scanners dump snapshot() as JSON at scan end.
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000) # Upper bounds
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # Last bucket: above the largest bound
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (capped at max_ms)."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(float(self.buckets[i]), self.max_ms) if i < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets_ms": list(self.buckets),
+            "bucket_counts": list(self.counts),
+        }
+
+
+class ScanStats:
+    """Thread-safe per-stage counters, latency histograms and scan progress."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, total=0):
+        """Clears everything and starts a scan of `total` tickers."""
+        with self.lock:
+            self.histograms = {} # (stage, label) -> LatencyHistogram
+            self.counters = {} # name -> int
+            self.total = total
+            self.done = 0
+            self.started_at = time.monotonic()
+            self.started_wall = time.time()
+
+    def observe(self, stage, label, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get((stage, label))
+            if histogram is None:
+                histogram = self.histograms[(stage, label)] = LatencyHistogram()
+            histogram.observe(seconds * 1000)
+
+    def time(self, stage, label):
+        """Context manager recording the duration of the block under (stage, label)."""
+        return self._timed(stage, label) if self.enabled else nullcontext()
+
+    @contextmanager
+    def _timed(self, stage, label):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, label, time.perf_counter() - started)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def advance(self, n=1):
+        """Marks n tickers as finished (drives throughput and ETA)."""
+        with self.lock:
+            self.done += n
+
+    def _progress(self):
+        elapsed = time.monotonic() - self.started_at
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, self.total - self.done)
+        eta = remaining / rate if rate > 0 else None
+        return elapsed, rate, eta
+
+    def fallback_rate(self):
+        """Share of per-ticker remote fetches that needed a source other than the first one."""
+        with self.lock:
+            requests = self.counters.get("remote.requests", 0)
+            return self.counters.get("remote.fallback", 0) / requests if requests else 0.0
+
+    def snapshot(self):
+        """Returns all statistics as a JSON-serializable dict."""
+        fallback_rate = self.fallback_rate()
+        with self.lock:
+            elapsed, rate, eta = self._progress()
+            stages = {}
+            for (stage, label), histogram in sorted(self.histograms.items()):
+                stages.setdefault(stage, {})[label] = histogram.to_dict()
+            return {
+                "started_at": self.started_wall,
+                "elapsed_seconds": round(elapsed, 3),
+                "total": self.total,
+                "done": self.done,
+                "tickers_per_second": round(rate, 3),
+                "eta_seconds": round(eta, 1) if eta is not None else None,
+                "fallback_rate": round(fallback_rate, 4),
+                "counters": dict(sorted(self.counters.items())),
+                "stages": stages,
+            }
+
+    def summary_lines(self):
+        """Short human-readable summary (progress line, then one line per stage/label by total time)."""
+        snapshot = self.snapshot()
+        eta = snapshot["eta_seconds"]
+        lines = [f"Done {snapshot['done']}/{snapshot['total']} in {snapshot['elapsed_seconds']:.0f}s, "
+                 f"{snapshot['tickers_per_second']:.1f} tickers/s, "
+                 f"ETA {'-' if eta is None else time.strftime('%H:%M:%S', time.gmtime(eta))}, "
+                 f"fallback {snapshot['fallback_rate']:.1%}"]
+        rows = [(stage, label, h) for stage, labels in snapshot["stages"].items() for label, h in labels.items()]
+        for stage, label, h in sorted(rows, key=lambda row: -row[2]["total_ms"]):
+            lines.append(f"{stage:<8} {label:<18} n={h['count']:<7} total={h['total_ms'] / 1000:8.1f}s "
+                         f"p50={h['p50_ms']:.0f}ms p99={h['p99_ms']:.0f}ms max={h['max_ms']:.0f}ms")
+        counters = ", ".join(f"{name}={value}" for name, value in snapshot["counters"].items())
+        if counters:
+            lines.append(counters)
+        return lines
+
+    def dump(self, path):
+        """Writes snapshot() to `path` as JSON (atomically)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,210 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+import main_china
+from main_china import (
+    TimeframeData, get_ticker_universe, load_scan_tickers, configure_data_sources, prefetch_histories,
+    history_period, RSI_PERIOD, OVERSOLD_THRESHOLD, OVERBOUGHT_THRESHOLD, MAX_WORKERS, BATCH_SIZE
+)
+from fetch_engine import run_concurrent_batches
+from rsi_engine import build_close_matrix, multi_period_latest_rsi, warmup_bars
+from scan_pipeline import clean_history
+
+# --- Parameter Sweep ---
+# Evaluates a grid of RSI periods and oversold/overbought thresholds in one
+# scan. Each ticker's history is fetched once (through the same cache and
+# sources as the scan). The closes are then stacked into (dates x tickers)
+# matrices per timeframe. multi_period_latest_rsi() computes the latest RSI for
+# every period in one pass that shares the price changes and gain/loss arrays.
+# History windows are widened to the warm-up of the longest period swept.
+# Thresholds are only comparisons on those RSI values. The result is a
+# signal-count matrix (period x threshold) for each signal:
+#   oversold_daily / oversold_dwm      Daily (and Weekly, Monthly) RSI <= threshold
+#   overbought_daily / overbought_dwm  Daily (and Weekly, Monthly) RSI > threshold
+#
+#   python python/sweep.py
+#   python python/sweep.py --periods 6 9 14 21 --oversold 20 25 30 --overbought 70 80 --json sweep.json
+
+SWEEP_PERIODS = (6, 9, 14, 21)
+SWEEP_OVERSOLD = (20, 25, 30, 35)
+SWEEP_OVERBOUGHT = (65, 70, 75, 80)
+SWEEP_CHUNK_SIZE = 500 # Tickers whose closes are held in memory before their RSI is computed
+TIMEFRAMES = ("Daily", "Weekly", "Monthly")
+
+
+def size_history_windows(periods):
+    """Widens main_china's history windows so the longest period swept converges too."""
+    length = max(max(periods), RSI_PERIOD)
+    for params in main_china.TIME_PERIODS.values():
+        params["period"] = history_period(params["interval"], length)
+    main_china.DAILY_HISTORY_PERIOD = history_period("1mo", length)
+
+
+def load_closes_batch(batch):
+    """Fetches one batch like the scan does. Returns {ticker: {timeframe: close Series}}."""
+    prefetched = prefetch_histories(batch)
+    results = {}
+    for ticker_symbol in batch:
+        timeframe_data = TimeframeData(ticker_symbol, prefetched=prefetched.get(ticker_symbol))
+        closes = {}
+        for name in TIMEFRAMES:
+            hist = clean_history(timeframe_data.get(name))
+            if hist is not None:
+                closes[name] = hist['Close']
+        results[ticker_symbol] = closes
+    return results
+
+
+def sweep_rsi(tickers, periods=SWEEP_PERIODS, chunk_size=SWEEP_CHUNK_SIZE, max_workers=MAX_WORKERS):
+    """
+    Fetches each ticker once and computes its latest RSI for every period and timeframe.
+
+    Returns:
+        (tickers, {timeframe: (len(periods), len(tickers)) RSI array}, {timeframe: bars per ticker}),
+        RSI NaN where unavailable
+    """
+    order = []
+    parts = {name: [] for name in TIMEFRAMES}
+    bar_counts = {name: [] for name in TIMEFRAMES}
+    pending = {}
+
+    def flush():
+        chunk = list(pending)
+        for name in TIMEFRAMES:
+            columns, _, closes = build_close_matrix({t: pending[t][name] for t in chunk if name in pending[t]})
+            rsi = np.full((len(periods), len(chunk)), np.nan)
+            bars = np.zeros(len(chunk), dtype=int)
+            if columns:
+                position = [chunk.index(t) for t in columns]
+                rsi[:, position] = multi_period_latest_rsi(closes, periods)
+                bars[position] = (~np.isnan(closes)).sum(axis=0)
+            parts[name].append(rsi)
+            bar_counts[name].append(bars)
+        order.extend(chunk)
+        pending.clear()
+
+    batch_size = BATCH_SIZE if main_china.USE_BATCH_DOWNLOAD else 1
+    processed = 0
+    for ticker_symbol, result, error in run_concurrent_batches(tickers, load_closes_batch, batch_size,
+                                                               max_workers=max_workers):
+        processed += 1
+        if error is not None:
+            print(f"  Error processing {ticker_symbol}: {error}")
+        elif result:
+            pending[ticker_symbol] = result
+        if len(pending) >= chunk_size:
+            flush()
+        if processed % 100 == 0:
+            print(f" Processed {processed}/{len(tickers)} tickers...")
+    if pending:
+        flush()
+    return (order,
+            {name: np.hstack(arrays) if arrays else np.empty((len(periods), 0)) for name, arrays in parts.items()},
+            {name: np.concatenate(counts) if counts else np.empty(0, dtype=int) for name, counts in bar_counts.items()})
+
+
+def report_short_histories(bar_counts, periods):
+    """Prints, per timeframe and period, how many tickers have fewer bars than the RSI warm-up."""
+    lines = []
+    for name in TIMEFRAMES:
+        for period in periods:
+            needed = warmup_bars(period, main_china.RSI_CONVERGENCE_TOLERANCE)
+            short = int(((bar_counts[name] > 0) & (bar_counts[name] < needed)).sum())
+            if short:
+                lines.append(f"  {name} RSI({period}): {short} tickers below the {needed}-bar warm-up")
+    if lines:
+        print("\nNot fully converged (recently listed or long suspensions):")
+        for line in lines:
+            print(line)
+
+
+def signal_counts(rsi, oversold=SWEEP_OVERSOLD, overbought=SWEEP_OVERBOUGHT):
+    """
+    Counts the signals of every (period, threshold) pair.
+
+    Args:
+        rsi: {timeframe: (periods, tickers) RSI array} from sweep_rsi()
+    Returns:
+        {signal: (periods, thresholds) int array}, {signal: (periods, thresholds, tickers) bool array}
+    """
+    daily, weekly, monthly = (rsi[name][:, None, :] for name in TIMEFRAMES)
+    low = np.asarray(oversold, dtype=float)[None, :, None]
+    high = np.asarray(overbought, dtype=float)[None, :, None]
+    with np.errstate(invalid='ignore'): # NaN compares False, as in the scan
+        masks = {
+            "oversold_daily": daily <= low,
+            "oversold_dwm": (daily <= low) & (weekly <= low) & (monthly <= low),
+            "overbought_daily": daily > high,
+            "overbought_dwm": (daily > high) & (weekly > high) & (monthly > high),
+        }
+    return {signal: mask.sum(axis=2) for signal, mask in masks.items()}, masks
+
+
+def print_counts(counts, periods, oversold, overbought):
+    for signal, matrix in counts.items():
+        thresholds, op = (oversold, "<=") if signal.startswith("oversold") else (overbought, ">")
+        print(f"\n{signal}")
+        print("  period " + "".join(f"{op + format(th, 'g'):>8}" for th in thresholds))
+        for period, row in zip(periods, matrix):
+            marker = "*" if period == RSI_PERIOD else " "
+            print(f"  {period:>5}{marker} " + "".join(f"{count:>8}" for count in row))
+    print(f"\n* current RSI_PERIOD; current thresholds: oversold <= {OVERSOLD_THRESHOLD}, "
+          f"overbought > {OVERBOUGHT_THRESHOLD}")
+
+
+# --- Guard for Direct Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Signal counts for a grid of RSI periods and thresholds in one scan.")
+    parser.add_argument("--periods", type=int, nargs="+", default=list(SWEEP_PERIODS), help="RSI periods")
+    parser.add_argument("--oversold", type=float, nargs="+", default=list(SWEEP_OVERSOLD), help="Oversold thresholds")
+    parser.add_argument("--overbought", type=float, nargs="+", default=list(SWEEP_OVERBOUGHT), help="Overbought thresholds")
+    parser.add_argument("--chunk-size", type=int, default=SWEEP_CHUNK_SIZE, help="Tickers per RSI matrix")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Number of tickers fetched in parallel")
+    parser.add_argument("--universe-file", help="Load the listed-symbol snapshot from a local CSV/TXT/JSON file")
+    parser.add_argument("--replay", metavar="DIR", help="Read bars only from a recorded local snapshot (no network, no cache)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the counts and the D/W/M signal tickers as JSON")
+    args = parser.parse_args()
+
+    if args.replay:
+        configure_data_sources("replay", local_dir=args.replay)
+        main_china.USE_OHLCV_CACHE = False # Replays read straight from the snapshot
+        main_china.USE_BATCH_DOWNLOAD = False
+    if args.universe_file:
+        print(f"Loaded {len(get_ticker_universe().load_file(args.universe_file))} tickers from {args.universe_file}")
+
+    size_history_windows(args.periods)
+    started = time.perf_counter()
+    tickers = load_scan_tickers()
+    print(f"Sweeping {len(tickers)} tickers: periods {args.periods}, oversold {args.oversold}, "
+          f"overbought {args.overbought}...")
+    order, rsi, bar_counts = sweep_rsi(tickers, args.periods, args.chunk_size, args.workers)
+    if not order:
+        print("No histories could be loaded.")
+        sys.exit(1)
+    counts, masks = signal_counts(rsi, args.oversold, args.overbought)
+    print(f"\n{len(order)} tickers with data, {time.perf_counter() - started:.1f}s")
+    print_counts(counts, args.periods, args.oversold, args.overbought)
+    report_short_histories(bar_counts, args.periods)
+
+    if args.json:
+        data = {
+            "periods": args.periods,
+            "oversold_thresholds": args.oversold,
+            "overbought_thresholds": args.overbought,
+            "tickers_with_data": len(order),
+            "counts": {signal: matrix.tolist() for signal, matrix in counts.items()},
+            "signals": {}, # "period/threshold" -> tickers, for the D/W/M signals
+        }
+        for signal in ("oversold_dwm", "overbought_dwm"):
+            thresholds = args.oversold if signal.startswith("oversold") else args.overbought
+            data["signals"][signal] = {
+                f"{period}/{threshold:g}": [order[i] for i in np.flatnonzero(masks[signal][p, k])]
+                for p, period in enumerate(args.periods) for k, threshold in enumerate(thresholds)
+            }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        print(f"\nSweep written to {args.json}")
@@ -0,0 +1,156 @@
+import json
+import os
+from datetime import datetime, date, time, timedelta, timezone
+
+# --- A-Share Trading Calendar ---
+# China has no daylight saving time, so a fixed UTC+8 offset is exact.
+MARKET_TZ = timezone(timedelta(hours=8))
+SESSION_OPEN = time(9, 30)
+SESSION_CLOSE = time(15, 0)
+
+# Exchange holidays (weekdays with no trading). holidays.txt next to this file
+# ships the SSE/SZSE closures (one YYYY-MM-DD per line, '#' for comments);
+# refresh_trade_calendar() derives the other years from the akshare trade
+# calendar and caches them. Years covered by neither are treated as weekdays
+# only, with a warning.
+HOLIDAYS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "holidays.txt")
+TRADE_CALENDAR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "trade_calendar.json")
+TRADE_CALENDAR_TTL_DAYS = 30
+MARKET_HOLIDAYS = set()
+COVERED_YEARS = set() # Years whose holidays are known
+_warned_years = set()
+
+def load_holidays(path=HOLIDAYS_FILE):
+    """Loads exchange holidays from a text file into MARKET_HOLIDAYS."""
+    if not os.path.exists(path):
+        return MARKET_HOLIDAYS
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                day = datetime.strptime(line, '%Y-%m-%d').date()
+                MARKET_HOLIDAYS.add(day)
+                COVERED_YEARS.add(day.year)
+    return MARKET_HOLIDAYS
+
+def _apply_trade_dates(trade_dates):
+    """Adds the weekdays missing from a complete list of trading days as holidays."""
+    trade_dates = sorted(trade_dates)
+    if not trade_dates:
+        return
+    traded = set(trade_dates)
+    first, last = trade_dates[0], trade_dates[-1]
+    day = first
+    while day <= last:
+        if day.weekday() < 5 and day not in traded:
+            MARKET_HOLIDAYS.add(day)
+        day += timedelta(days=1)
+    # Only whole years count as covered
+    COVERED_YEARS.update(year for year in range(first.year, last.year + 1)
+                         if first <= date(year, 1, 5) and date(year, 12, 31) <= last + timedelta(days=3))
+
+def load_trade_calendar(path=TRADE_CALENDAR_PATH):
+    """Loads the cached trade calendar. Returns its fetched_at time, or None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        _apply_trade_dates(datetime.strptime(d, '%Y-%m-%d').date() for d in data["trade_dates"])
+        return data.get("fetched_at", 0)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Could not read trade calendar {path}: {e}")
+        return None
+
+def refresh_trade_calendar(path=TRADE_CALENDAR_PATH, ttl_days=TRADE_CALENDAR_TTL_DAYS):
+    """
+    Downloads the exchange trade calendar from akshare when the cached copy is
+    missing, older than ttl_days, or does not cover the current year. Failures
+    keep the cached copy (and holidays.txt).
+    """
+    fetched_at = load_trade_calendar(path)
+    now = datetime.now().timestamp()
+    if (fetched_at is not None and now - fetched_at < ttl_days * 86400
+            and now_market().year in COVERED_YEARS):
+        return False
+    try:
+        import akshare as ak
+        frame = ak.tool_trade_date_hist_sina()
+        trade_dates = sorted({d if isinstance(d, date) else datetime.strptime(str(d)[:10], '%Y-%m-%d').date()
+                              for d in frame["trade_date"]})
+    except Exception as e:
+        print(f"Could not download the trade calendar: {e}")
+        return False
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"fetched_at": now, "trade_dates": [d.strftime('%Y-%m-%d') for d in trade_dates]}, f)
+    os.replace(tmp_path, path)
+    _apply_trade_dates(trade_dates)
+    return True
+
+load_holidays()
+load_trade_calendar()
+
+def now_market():
+    """Returns the current time in exchange local time."""
+    return datetime.now(MARKET_TZ)
+
+def is_trading_day(day):
+    """True if the exchange trades on the given date."""
+    if day.year not in COVERED_YEARS and day.year not in _warned_years:
+        _warned_years.add(day.year)
+        print(f"Warning: no exchange holidays known for {day.year}; treating every weekday as a trading day "
+              f"(add them to {HOLIDAYS_FILE} or run a scan with akshare available)")
+    return day.weekday() < 5 and day not in MARKET_HOLIDAYS
+
+def previous_trading_day(day):
+    """Returns the last trading day strictly before the given date."""
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+def next_trading_day(day):
+    """Returns the first trading day strictly after the given date."""
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
+
+def session_close(day):
+    """Returns the (timezone-aware) closing time of the session on the given date."""
+    return datetime.combine(day, SESSION_CLOSE, tzinfo=MARKET_TZ)
+
+def last_completed_session(now=None):
+    """Returns the date of the most recent session that has already closed."""
+    now = now or now_market()
+    now = now.astimezone(MARKET_TZ)
+    today = now.date()
+    if is_trading_day(today) and now.time() >= SESSION_CLOSE:
+        return today
+    return previous_trading_day(today)
+
+def is_session_open(now=None):
+    """True while the exchange is in its trading session (lunch break included)."""
+    now = (now or now_market()).astimezone(MARKET_TZ)
+    return is_trading_day(now.date()) and SESSION_OPEN <= now.time() < SESSION_CLOSE
+
+def provisional_session_day(now=None):
+    """
+    Date of the bar the spot prices stand for: today during the session, else the
+    last session that closed (the snapshot then repeats its close).
+    """
+    now = now or now_market()
+    return now.date() if is_session_open(now) else last_completed_session(now)
+
+def next_session_day(now=None):
+    """
+    Date of the next bar to form: today until the close of a trading day, else the
+    next trading day. Every session that has closed by then is a completed bar.
+    """
+    now = (now or now_market()).astimezone(MARKET_TZ)
+    today = now.date()
+    if is_trading_day(today) and now.time() < SESSION_CLOSE:
+        return today
+    return next_trading_day(today)
@@ -0,0 +1,202 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from fetch_engine import run_concurrent
+from rsi_engine import new_state, advance_state, state_rsi, trigger_price
+
+# --- RSI Trigger Price Index ---
+# For each ticker and timeframe, the price at which the bar of the current
+# session (or the forming week/month) would put the RSI exactly on the
+# oversold / overbought threshold. It is solved in closed form from the Wilder
+# state of the completed bars (rsi_engine.trigger_price), so a live price or a
+# spot snapshot finds crossers by comparing prices instead of recomputing RSI:
+#   RSI <= oversold    <=>  price <= oversold trigger
+#   RSI >  overbought  <=>  price >  overbought trigger
+# An index is only valid for the session it was built for (session_day); once
+# another bar completes it has to be rebuilt. main_china rebuilds it after every
+# scan for trading_calendar.next_session_day(), so a scan after the close
+# includes that session's bar and serves the whole next session.
+
+INDEX_COLUMNS = ("last_close", "rsi", "oversold", "overbought")
+
+
+def completed_closes(closes, session_day, frequency=None):
+    """
+    Closes of the bars completed before `session_day`: Daily closes, or the last
+    close of every week/month (pandas period alias `frequency`) before the one
+    containing session_day. Indexed by bar date (Daily) or period start.
+    """
+    closes = closes[closes.index < session_day]
+    if frequency is None or closes.empty:
+        return closes
+    periods = closes.index.to_period(frequency)
+    bars = closes.groupby(periods).last()
+    bars = bars[bars.index < pd.Timestamp(session_day).to_period(frequency)]
+    bars.index = bars.index.to_timestamp()
+    return bars
+
+
+class TriggerIndex:
+    """Per-ticker, per-timeframe RSI trigger prices with sorted range lookups."""
+
+    def __init__(self, session_day, length, oversold_threshold, overbought_threshold, tables=None, built_at=None):
+        """
+        Args:
+            session_day: Date of the bar the trigger prices apply to
+            length: RSI period
+            tables: {timeframe: DataFrame indexed by ticker with INDEX_COLUMNS}
+        """
+        self.session_day = pd.Timestamp(session_day).normalize()
+        self.length = length
+        self.oversold_threshold = oversold_threshold
+        self.overbought_threshold = overbought_threshold
+        self.tables = tables or {}
+        self.built_at = built_at or time.time()
+        self._sorted = {} # (timeframe, side) -> (sorted distances, tickers)
+
+    @classmethod
+    def build(cls, tickers, load_closes, session_day, length, oversold_threshold, overbought_threshold,
+              frequencies, min_bars=0, chunk_size=500, max_workers=8):
+        """
+        Builds the index from Daily closes.
+
+        Args:
+            tickers: Tickers to index
+            load_closes: Callable returning a ticker's Daily closes (Series indexed by date)
+            session_day: Date of the bar the trigger prices apply to
+            frequencies: {timeframe: pandas period alias} for the timeframes besides Daily
+            min_bars: Completed bars a ticker needs in a timeframe to be indexed there
+                      (fewer on disk, e.g. only the Daily screening window, would give an unconverged RSI)
+            chunk_size: Tickers whose closes are held in memory at once
+        """
+        session_day = pd.Timestamp(session_day).normalize()
+        timeframes = {"Daily": None, **frequencies}
+        parts = {name: [] for name in timeframes}
+        tickers = list(tickers)
+        for i in range(0, len(tickers), chunk_size):
+            chunk = tickers[i:i + chunk_size]
+            closes = {t: result for t, result, error in run_concurrent(chunk, load_closes, max_workers=max_workers)
+                      if error is None and result is not None and len(result)}
+            order = [t for t in chunk if t in closes]
+            if not order:
+                continue
+            for name, frequency in timeframes.items():
+                bars = {t: completed_closes(closes[t], session_day, frequency) for t in order}
+                frame = pd.DataFrame({t: s for t, s in bars.items() if len(s)})
+                state = new_state(len(order))
+                bar_counts = np.zeros(len(order), dtype=int)
+                if not frame.empty:
+                    matrix = frame.sort_index().reindex(columns=order).to_numpy(dtype=float)
+                    _, state = advance_state(state, matrix, length) # One pass for the whole chunk
+                    bar_counts = (~np.isnan(matrix)).sum(axis=0)
+                table = pd.DataFrame({
+                    "last_close": state["last_close"],
+                    "rsi": state_rsi(state, length),
+                    "oversold": trigger_price(state, oversold_threshold, length),
+                    "overbought": trigger_price(state, overbought_threshold, length),
+                }, index=pd.Index(order, name="ticker"))
+                table.loc[bar_counts < min_bars, ["rsi", "oversold", "overbought"]] = np.nan
+                parts[name].append(table)
+
+        tables = {}
+        for name, frames in parts.items():
+            table = pd.concat(frames) if frames else pd.DataFrame(columns=INDEX_COLUMNS)
+            tables[name] = table.dropna(subset=["oversold", "overbought"], how="all")
+        return cls(session_day, length, oversold_threshold, overbought_threshold, tables)
+
+    # --- Persistence ---
+    def save(self, path):
+        """Writes the index to a JSON file (atomically)."""
+        data = {
+            "session_day": self.session_day.strftime('%Y-%m-%d'),
+            "built_at": self.built_at,
+            "length": self.length,
+            "oversold_threshold": self.oversold_threshold,
+            "overbought_threshold": self.overbought_threshold,
+            "timeframes": {
+                name: {"tickers": list(table.index),
+                       **{column: [None if np.isnan(v) else float(v) for v in table[column].to_numpy(dtype=float)]
+                          for column in INDEX_COLUMNS}}
+                for name, table in self.tables.items()
+            },
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Loads an index saved with save(). Returns None if the file is missing or unreadable."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            tables = {
+                name: pd.DataFrame({column: np.array(columns[column], dtype=float) for column in INDEX_COLUMNS},
+                                   index=pd.Index(columns["tickers"], name="ticker"))
+                for name, columns in data["timeframes"].items()
+            }
+            return cls(data["session_day"], data["length"], data["oversold_threshold"],
+                       data["overbought_threshold"], tables, built_at=data.get("built_at"))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Could not read trigger index {path}: {e}")
+            return None
+
+    # --- Lookups ---
+    def is_current(self, session_day):
+        """True if the index was built for the bar of `session_day`."""
+        return self.session_day == pd.Timestamp(session_day).normalize()
+
+    def triggers(self, ticker, timeframe="Daily"):
+        """Returns {last_close, rsi, oversold, overbought} for one ticker, or None."""
+        table = self.tables.get(timeframe)
+        if table is None or ticker not in table.index:
+            return None
+        return table.loc[ticker].to_dict()
+
+    def crossers(self, prices, timeframe="Daily", tolerance=0.0):
+        """
+        Returns (oversold, overbought) ticker lists for the given prices: the tickers
+        whose RSI would be <= the oversold threshold or > the overbought threshold.
+
+        Args:
+            prices: Series or dict of current prices by ticker
+            tolerance: Relative widening of both triggers, so a caller that recomputes
+                       the RSI of the crossers does not miss prices right at a trigger
+        """
+        table = self.tables.get(timeframe)
+        if table is None or table.empty:
+            return [], []
+        prices = pd.Series(prices, dtype=float)
+        prices = prices[prices.index.isin(table.index)]
+        rows = table.loc[prices.index]
+        oversold = prices.index[prices.to_numpy() <= rows["oversold"].to_numpy() * (1 + tolerance)]
+        overbought = prices.index[prices.to_numpy() > rows["overbought"].to_numpy() * (1 - tolerance)]
+        return list(oversold), list(overbought)
+
+    def within(self, fraction, side="oversold", timeframe="Daily"):
+        """
+        Tickers whose trigger is within `fraction` of their last close (e.g. 0.03:
+        a fall of at most 3% makes them oversold), nearest first. Tickers already
+        beyond the threshold at an unchanged price have a distance <= 0.
+        """
+        key = (timeframe, side)
+        if key not in self._sorted:
+            table = self.tables.get(timeframe, pd.DataFrame(columns=INDEX_COLUMNS))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                if side == "oversold":
+                    distance = 1.0 - table["oversold"].to_numpy(dtype=float) / table["last_close"].to_numpy(dtype=float)
+                else:
+                    distance = table["overbought"].to_numpy(dtype=float) / table["last_close"].to_numpy(dtype=float) - 1.0
+            valid = ~np.isnan(distance)
+            order = np.argsort(distance[valid], kind="stable")
+            self._sorted[key] = (distance[valid][order], table.index.to_numpy()[valid][order])
+        distances, tickers = self._sorted[key]
+        return list(tickers[:np.searchsorted(distances, fraction, side="right")])
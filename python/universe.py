@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+
+# --- A-Share Universe ---
+# Loads the real set of listed A-share symbols from a cached listing snapshot
+# (refreshed from akshare, or loaded from a local file) and keeps a negative
+# cache of codes that returned no data, so scans only touch live symbols.
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+LISTING_SNAPSHOT_PATH = os.path.join(CACHE_DIR, "listing.json")
+DEAD_TICKERS_PATH = os.path.join(CACHE_DIR, "dead_tickers.json")
+LISTING_MAX_AGE_DAYS = 1 # Refresh the listing snapshot from akshare after this many days
+DEAD_TICKER_TTL_DAYS = 7 # Dead codes are retried after this many days (relistings, new IPOs)
+
+# Code prefixes traded on each exchange (Beijing Stock Exchange codes are not scanned)
+EXCHANGE_PREFIXES = {
+    ".SS": ("600", "601", "603", "605", "688", "689"),
+    ".SZ": ("000", "001", "002", "003", "300", "301"),
+}
+
+
+def code_to_ticker(code):
+    """Converts a 6-digit A-share code to a yfinance-style ticker, or None if not scanned."""
+    code = str(code).strip().split('.')[0].zfill(6)
+    for suffix, prefixes in EXCHANGE_PREFIXES.items():
+        if code.startswith(prefixes):
+            return f"{code}{suffix}"
+    return None
+
+
+class TickerUniverse:
+    """Listed-symbol snapshot plus a negative cache of dead codes."""
+
+    def __init__(self, snapshot_path=LISTING_SNAPSHOT_PATH, dead_path=DEAD_TICKERS_PATH,
+                 max_age_days=LISTING_MAX_AGE_DAYS, dead_ttl_days=DEAD_TICKER_TTL_DAYS):
+        self.snapshot_path = snapshot_path
+        self.dead_path = dead_path
+        self.max_age_days = max_age_days
+        self.dead_ttl_days = dead_ttl_days
+        self.lock = threading.Lock()
+        self.dead = self._load_dead()
+        self.source = None # Where the current listing came from, for logging
+
+    # --- Listing Snapshot ---
+    def _read_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read listing snapshot {self.snapshot_path}: {e}")
+            return None
+
+    def _write_snapshot(self, tickers):
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"fetched_at": time.time(), "tickers": sorted(tickers)}, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def refresh(self):
+        """Downloads the current listing from akshare and saves it as the snapshot."""
+        import akshare as ak
+        listing = ak.stock_info_a_code_name()
+        tickers = {code_to_ticker(code) for code in listing['code']}
+        tickers.discard(None)
+        if not tickers:
+            raise ValueError("akshare returned an empty listing")
+        self._write_snapshot(tickers)
+        return sorted(tickers)
+
+    def load_file(self, path):
+        """
+        Loads a listing from a local file and saves it as the snapshot.
+        Accepts a JSON snapshot, or a text/CSV file with one code or ticker per line
+        (the first column is used).
+        """
+        if path.endswith(".json"):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            codes = data["tickers"] if isinstance(data, dict) else data
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                codes = [line.split(',')[0].strip() for line in f if line.strip()]
+        tickers = {code_to_ticker(code) for code in codes if code[:6].isdigit()}
+        tickers.discard(None)
+        self._write_snapshot(tickers)
+        return sorted(tickers)
+
+    def listed(self, refresh=False):
+        """
+        Returns the listed tickers: from a fresh snapshot if there is one,
+        otherwise refreshed from akshare, falling back to a stale snapshot.
+        Returns None if no listing is available at all.
+        """
+        snapshot = self._read_snapshot()
+        is_fresh = snapshot and time.time() - snapshot.get("fetched_at", 0) < self.max_age_days * 86400
+        if is_fresh and not refresh:
+            self.source = "snapshot"
+            return snapshot["tickers"]
+        try:
+            tickers = self.refresh()
+            self.source = "akshare"
+            return tickers
+        except Exception as e:
+            print(f"Could not refresh listing from akshare: {e}")
+        if snapshot:
+            self.source = "stale snapshot"
+            return snapshot["tickers"]
+        return None
+
+    # --- Negative Cache ---
+    def _load_dead(self):
+        if not os.path.exists(self.dead_path):
+            return {}
+        try:
+            with open(self.dead_path, 'r', encoding='utf-8') as f:
+                dead = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        cutoff = time.time() - self.dead_ttl_days * 86400
+        return {ticker: marked_at for ticker, marked_at in dead.items() if marked_at >= cutoff}
+
+    def is_dead(self, ticker):
+        return ticker in self.dead
+
+    def mark_dead(self, ticker):
+        """Records a ticker that returned no data from any source."""
+        with self.lock:
+            self.dead[ticker] = time.time()
+
+    def save_dead(self):
+        """Persists the negative cache."""
+        with self.lock:
+            dead = dict(self.dead)
+        os.makedirs(os.path.dirname(self.dead_path), exist_ok=True)
+        tmp_path = self.dead_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dead, f)
+        os.replace(tmp_path, self.dead_path)
+
+    def live(self, fallback_tickers, refresh=False):
+        """Returns the tickers worth scanning: listed (or fallback) minus known-dead codes."""
+        tickers = self.listed(refresh=refresh)
+        if tickers is None:
+            self.source = "generated"
+            tickers = fallback_tickers()
+        return [t for t in tickers if t not in self.dead]